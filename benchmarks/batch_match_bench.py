@@ -0,0 +1,43 @@
+# batch_match_bench.py
+# So sánh blocked_topk (matmul theo tile + argpartition) với vòng lặp 1 query / lần trên dữ liệu giả lập,
+# kiểm tra kết quả giống hệt và đo bộ nhớ tile.
+# Chạy: python -m benchmarks.batch_match_bench [n_jd] [n_cv]  (từ thư mục gốc repo)
+import sys, time
+import numpy as np
+from logics.batchMatcher import blocked_topk
+
+
+def _normalized(rng, n, dim):
+    x = rng.standard_normal((n, dim)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+
+def run(n_jd: int = 2000, n_cv: int = 50000, dim: int = 384, k: int = 20):
+    rng = np.random.default_rng(0)
+    jds, cvs = _normalized(rng, n_jd, dim), _normalized(rng, n_cv, dim)
+
+    t0 = time.perf_counter()
+    idx, dist = blocked_topk(jds, cvs, k, row_block=512, col_block=8192)
+    blocked_s = time.perf_counter() - t0
+
+    # baseline: mỗi JD 1 lần tính khoảng cách tới toàn bộ CV (giống gọi query_topk từng JD, bỏ qua overhead Chroma)
+    n_check = min(n_jd, 200)
+    t0 = time.perf_counter()
+    ref = []
+    for q in jds[:n_check]:
+        d = ((cvs - q) ** 2).sum(axis=1)
+        ref.append(np.argsort(d, kind="stable")[:k])
+    loop_s = (time.perf_counter() - t0) * n_jd / n_check
+
+    same = all(set(ref[i].tolist()) == set(idx[i].tolist()) for i in range(n_check))
+    print(f"JD={n_jd} CV={n_cv} dim={dim} k={k}")
+    print(f"  blocked_topk : {blocked_s:.2f}s")
+    print(f"  per-query    : {loop_s:.2f}s (ước lượng từ {n_check} JD)")
+    print(f"  speedup      : {loop_s / blocked_s:.1f}x, top-k khớp: {same}")
+    print(f"  tile memory  : ~{512 * 8192 * (4 + 8) / 2 ** 20:.0f} MB (score float32 + argpartition int64)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,67 @@
+# embed_bench.py
+# So sánh backend embedding (logics/embeddingBackends.py): throughput ingest (encode cả lô CV, theo batch)
+# và latency 1 query (encode 1 text — đường đi của mỗi request matching), kèm cosine so với backend torch
+# để biết vector có dùng lẫn được với collection đã index không.
+# Text giả lập có độ dài lệch nhau như CV thật (summary ngắn / experience dài) để thấy tác dụng của
+# length bucketing.
+# Chạy: python -m benchmarks.embed_bench [n_texts] [backend ...]   vd. python -m benchmarks.embed_bench 2000 torch onnx
+import sys, time, random
+import numpy as np
+from config import EMBED_BATCH_SIZE, EMBED_THREADS
+from logics.embeddingBackends import create_backend
+
+SKILLS = ["python", "java", "react", "docker", "kubernetes", "aws", "sql", "django", "spring", "go",
+          "terraform", "pytorch", "nlp", "figma", "flutter", "kotlin", "redis", "kafka", "spark", "linux"]
+ROLES = ["Backend Engineer", "Data Scientist", "Frontend Developer", "DevOps Engineer", "Mobile Developer",
+         "QA Engineer", "ML Engineer", "Product Designer"]
+N_QUERIES = 50
+
+
+def synthetic_texts(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        parts = [f"Summary: {rng.choice(ROLES)} with {rng.randint(1, 12)} years of experience."]
+        parts.append("Skills: " + ", ".join(rng.sample(SKILLS, rng.randint(2, 10))))
+        for _ in range(rng.choice([0, 1, 1, 2, 4])):
+            parts.append(f"{rng.choice(ROLES)} at Company{rng.randint(1, 99)} ({rng.randint(1, 5)} yrs) - "
+                         + "; ".join(f"built {rng.choice(SKILLS)} service for {rng.choice(SKILLS)} pipeline"
+                                     for _ in range(rng.randint(1, 6))))
+        texts.append("\n".join(parts))
+    return texts
+
+
+def run(n: int, names):
+    texts = synthetic_texts(n)
+    queries = synthetic_texts(N_QUERIES, seed=1)
+    print(f"\n=== n={n:,}  batch={EMBED_BATCH_SIZE}  threads={EMBED_THREADS or 'auto'} ===")
+    print(f"{'backend':<10}{'load s':>8}{'texts/s':>10}{'query ms p50':>14}{'p95':>8}{'min cos':>10}{'mean cos':>10}")
+    reference = None
+    for name in names:
+        t0 = time.perf_counter()
+        backend = create_backend(name)
+        load_s = time.perf_counter() - t0
+        backend.encode(texts[:EMBED_BATCH_SIZE])  # warm-up
+
+        t0 = time.perf_counter()
+        emb = backend.encode(texts, batch_size=EMBED_BATCH_SIZE)
+        tput = n / (time.perf_counter() - t0)
+
+        lat = []
+        for q in queries:
+            t0 = time.perf_counter()
+            backend.encode([q], batch_size=1)
+            lat.append((time.perf_counter() - t0) * 1000)
+
+        if reference is None:
+            reference = emb
+        cos = np.einsum("ij,ij->i", reference, emb)
+        print(f"{name:<10}{load_s:>8.1f}{tput:>10.0f}{np.percentile(lat, 50):>14.2f}{np.percentile(lat, 95):>8.2f}"
+              f"{cos.min():>10.4f}{cos.mean():>10.4f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    n = int(args[0]) if args and args[0].isdigit() else 1000
+    names = [a for a in args if not a.isdigit()] or ["torch", "onnx"]
+    run(n, names)
@@ -0,0 +1,69 @@
+# embed_server_bench.py
+# Embedding server (logics/embeddingServer.py) vs mỗi worker tự encode: C client đồng thời, mỗi client gửi
+# các request 1 text (đường đi của 1 request matching / 1 post Mastodon).
+#   direct : C thread gọi thẳng backend, mỗi request 1 lần forward (như mỗi worker giữ model riêng)
+#   server : C thread gọi encode_remote → server gom micro-batch (EMBED_SERVER_MAX_WAIT_MS) + LRU cache
+# Lượt "server (repeat)" gửi lại đúng các text cũ → đo đường cache hit.
+# Chạy: python -m benchmarks.embed_server_bench [clients] [requests_per_client]
+import sys, time, threading
+import numpy as np
+from logics.embeddingBackends import create_backend
+from logics.embeddingServer import MicroBatcher, make_server, encode_remote
+from benchmarks.embed_bench import synthetic_texts
+
+
+def run_clients(fn, texts_per_client):
+    lat, lock = [], threading.Lock()
+
+    def client(texts):
+        mine = []
+        for t in texts:
+            t0 = time.perf_counter()
+            fn([t])
+            mine.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            lat.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(t,)) for t in texts_per_client]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return len(lat) / (time.perf_counter() - t0), np.percentile(lat, 50), np.percentile(lat, 95)
+
+
+def main(clients: int, per_client: int):
+    backend = create_backend()
+    backend.encode(["warmup"])
+    texts = synthetic_texts(clients * per_client, seed=2)
+    per = [texts[i::clients] for i in range(clients)]
+
+    batcher = MicroBatcher(backend)
+    server = make_server(batcher, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"\n=== backend={backend.name}  clients={clients}  requests={clients * per_client} ===")
+    print(f"{'mode':<18}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    rows = {
+        "direct": lambda t: backend.encode(t, batch_size=1),
+        "server": lambda t: encode_remote(t, url),
+        "server (repeat)": lambda t: encode_remote(t, url),
+    }
+    for name, fn in rows.items():
+        rps, p50, p95 = run_clients(fn, per)
+        print(f"{name:<18}{rps:>8.0f}{p50:>9.2f}{p95:>9.2f}")
+
+    ref = backend.encode(texts[:8])
+    got = encode_remote(texts[:8], url)
+    stats = batcher.snapshot_stats()
+    print(f"avg micro-batch={stats['avg_batch']}  cache hit rate={stats['cache_hit_rate']:.2%}  "
+          f"max |Δ| vs direct={np.abs(ref - got).max():.2e}")
+    server.shutdown()
+    batcher.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 16, args[1] if len(args) > 1 else 20)
@@ -0,0 +1,79 @@
+# listener_bench.py
+# Micro-benchmark: replay 1 stream status (ghi lại dạng JSONL, hoặc tự sinh) qua RecruitmentListener
+# với fake Mastodon client (me() có độ trễ giả lập) → đo latency on_update và số lần gọi mạng.
+# Chạy: python -m benchmarks.listener_bench [statuses.jsonl] [--me-latency 0.05]
+import argparse, json, os, random, tempfile, time
+
+# queue tạm, không đụng job_queue.sqlite thật (phải set trước khi import config)
+os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "bench_queue.sqlite"))
+os.environ.setdefault("JOB_QUEUE_MAX_PENDING", "1000000000")
+
+from listeners.postJDListener import RecruitmentListener  # noqa: E402
+
+HASHTAG = "tuyendungAI"
+BOT = {"id": "1", "username": "jobbot", "acct": "jobbot"}
+
+
+class FakeMastodon:
+    def __init__(self, me_latency: float):
+        self.me_latency = me_latency
+        self.calls = {"me": 0, "status_post": 0}
+
+    def me(self):
+        self.calls["me"] += 1
+        time.sleep(self.me_latency)  # giả lập 1 HTTP round-trip
+        return dict(BOT)
+
+    def status_post(self, *args, **kwargs):
+        self.calls["status_post"] += 1
+        return {"id": str(random.randint(1, 10**9))}
+
+
+def synth_statuses(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    tags_pool = [HASHTAG, "python", "hiring", "cv", "news"]
+    for i in range(n):
+        own = rnd.random() < 0.05
+        acc = BOT if own else {"id": str(1000 + rnd.randint(0, 300)), "username": f"u{i}", "acct": f"u{i}@ex.org"}
+        tags = rnd.sample(tags_pool, rnd.randint(0, 3))
+        yield {
+            "id": str(10**6 + i),
+            "account": acc,
+            "tags": [{"name": t} for t in tags],
+            "content": f"<p>#{HASHTAG} Hiring backend dev Node.js SQL {i}</p>",
+        }
+
+
+def load_statuses(path: str):
+    with open(path, "r", encoding="utf8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def run(statuses, me_latency: float):
+    statuses = list(statuses)
+    client = FakeMastodon(me_latency)
+    listener = RecruitmentListener(client, HASHTAG)
+    lat = []
+    for st in statuses:
+        t0 = time.perf_counter()
+        listener.on_update(st)
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+    print(f"\n=== 📡 LISTENER BENCH ({len(statuses)} statuses, me() latency {me_latency * 1000:.0f} ms) ===")
+    print(f"total        {sum(lat):.3f}s")
+    print(f"p50 / p99    {pct(0.5):.3f} / {pct(0.99):.3f} ms")
+    print(f"max          {lat[-1] * 1000:.3f} ms")
+    print(f"network calls {client.calls}  (me() per status trước đây = {len(statuses)})")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("recorded", nargs="?", help="JSONL các status ghi lại từ stream")
+    ap.add_argument("-n", type=int, default=5000)
+    ap.add_argument("--me-latency", type=float, default=0.05)
+    args = ap.parse_args()
+    src = load_statuses(args.recorded) if args.recorded else synth_statuses(args.n)
+    run(src, args.me_latency)
@@ -0,0 +1,68 @@
+# quant_bench.py
+# Recall@k / bộ nhớ / latency của tìm kiếm trên vector nén (db/quantization.py) so với quét float32 chính xác,
+# trên corpus CV giả lập (vector MiniLM-like: 384 chiều, phân cụm, chuẩn hoá). Ma trận float32 ghi ra memmap tạm
+# nên chạy được tới 1M vector mà RAM không phải giữ toàn bộ.
+# Chạy: python -m benchmarks.quant_bench [n ...]   vd. python -m benchmarks.quant_bench 10000 100000 1000000
+import os, sys, time, tempfile
+import numpy as np
+from db.quantization import QuantizedCodes, hamming_shortlist, rescore
+
+DIM, K, N_QUERIES, N_CLUSTERS = 384, 10, 100, 256
+
+
+def synthetic_corpus(n: int, path: str, seed: int = 0):
+    """Vector = tâm cụm (ngành nghề / stack) + nhiễu, chuẩn hoá L2 — gần phân bố embedding CV thật hơn nhiễu thuần."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((N_CLUSTERS, DIM)).astype(np.float32)
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, DIM))
+    for k in range(0, n, 65536):
+        m = min(65536, n - k)
+        x = centers[rng.integers(0, N_CLUSTERS, m)] + 0.8 * rng.standard_normal((m, DIM)).astype(np.float32)
+        matrix[k:k + m] = x / np.linalg.norm(x, axis=1, keepdims=True)
+    matrix.flush()
+    q = centers[rng.integers(0, N_CLUSTERS, N_QUERIES)] + 0.8 * rng.standard_normal((N_QUERIES, DIM)).astype(np.float32)
+    return np.load(path, mmap_mode="r"), q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def exact_topk(matrix, sq_norms, q, k):
+    return rescore(matrix, sq_norms, q, np.arange(len(matrix)), k)[0]
+
+
+def run(n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        matrix, queries = synthetic_corpus(n, os.path.join(tmp, "emb.npy"))
+        sq = np.empty(n, dtype=np.float32)
+        for k in range(0, n, 65536):
+            b = np.asarray(matrix[k:k + 65536])
+            sq[k:k + len(b)] = np.einsum("ij,ij->i", b, b)
+        t0 = time.perf_counter()
+        codes = QuantizedCodes.build(matrix)
+        build_s = time.perf_counter() - t0
+        truth = [set(exact_topk(matrix, sq, q, K).tolist()) for q in queries]
+
+        modes = {
+            "float32 exact": lambda q: exact_topk(matrix, sq, q, K),
+            "binary only": lambda q: hamming_shortlist(codes.binary, q, K),
+            "binary→int8→f32 x4": lambda q: codes.search(matrix, sq, q, K, "binary", rescore_factor=4)[0],
+            "binary→int8→f32 x10": lambda q: codes.search(matrix, sq, q, K, "binary", rescore_factor=10)[0],
+            "binary→int8→f32 x10/40": lambda q: codes.search(matrix, sq, q, K, "binary", rescore_factor=10,
+                                                             hamming_factor=40)[0],
+            "int8→f32 x4": lambda q: codes.search(matrix, sq, q, K, "int8", rescore_factor=4)[0],
+        }
+        hot = {"float32 exact": matrix.nbytes, "binary only": codes.binary.nbytes,
+               "int8→f32 x4": codes.nbytes()["int8"]}
+        print(f"\n=== n={n:,}  dim={DIM}  k={K}  queries={N_QUERIES}  (build codes {build_s:.1f}s) ===")
+        print(f"{'mode':<25}{'recall@k':>10}{'ms/query':>11}{'resident MB':>13}")
+        for name, fn in modes.items():
+            fn(queries[0])  # warm page cache
+            t0 = time.perf_counter()
+            found = [fn(q) for q in queries]
+            ms = (time.perf_counter() - t0) * 1000 / N_QUERIES
+            recall = np.mean([len(truth[i] & set(f.tolist())) / K for i, f in enumerate(found)])
+            scan = hot.get(name, codes.binary.nbytes + (codes.nbytes()["int8"] if "int8" in name else 0))
+            print(f"{name:<25}{recall:>10.3f}{ms:>11.2f}{scan / 2 ** 20:>13.1f}")
+
+
+if __name__ == "__main__":
+    for size in [int(a) for a in sys.argv[1:]] or [10_000, 100_000]:
+        run(size)
@@ -0,0 +1,54 @@
+# startup_bench.py
+# Đo cold start: thời gian import matchingLogic, RSS sau import, và sau vector đầu tiên (lúc model thực sự load).
+# Chạy: python -m benchmarks.startup_bench  (từ thư mục gốc repo)
+import json, subprocess, sys
+
+_PROBE = r"""
+import json, resource, sys, time
+
+def rss_mb():
+    # ru_maxrss: KB trên Linux, bytes trên macOS
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1024 * 1024) if sys.platform == "darwin" else r / 1024
+
+out = {"rss_start_mb": rss_mb()}
+t0 = time.perf_counter()
+import logics.matchingLogic  # noqa: F401
+out["import_s"] = time.perf_counter() - t0
+out["rss_after_import_mb"] = rss_mb()
+
+from logics.embedder import embed_json
+t1 = time.perf_counter()
+embed_json({"skills": ["Python"], "summary": "warmup"})
+out["first_vector_s"] = time.perf_counter() - t1
+out["rss_after_first_vector_mb"] = rss_mb()
+
+from llama_index.core import Settings
+t2 = time.perf_counter()
+Settings.embed_model.get_query_embedding("Backend developer Node.js")
+out["llamaindex_query_embed_s"] = time.perf_counter() - t2
+out["rss_final_mb"] = rss_mb()
+print("BENCH " + json.dumps(out))
+"""
+
+
+def run(repeats: int = 3):
+    rows = []
+    for i in range(repeats):
+        # mỗi lần 1 process mới → đo đúng cold start
+        proc = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True)
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("BENCH ")), None)
+        if line is None:
+            print(proc.stdout[-2000:], proc.stderr[-2000:])
+            raise SystemExit("❌ Probe failed")
+        rows.append(json.loads(line[len("BENCH "):]))
+
+    print(f"\n=== 🚀 STARTUP BENCH ({repeats} cold runs) ===")
+    for key in rows[0]:
+        vals = sorted(r[key] for r in rows)
+        unit = "MB" if key.endswith("_mb") else "s"
+        print(f"{key:<28} median={vals[len(vals) // 2]:8.2f} {unit}   min={vals[0]:8.2f}   max={vals[-1]:8.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
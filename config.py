@@ -6,3 +6,136 @@ MASTODON_API_BASE_URL = os.getenv("MASTODON_API_BASE_URL")
 MASTODON_ACCESS_TOKEN = os.getenv("MASTODON_ACCESS_TOKEN")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# --- Matching / re-ranking ---
+RERANK_MAX_WORKERS = int(os.getenv("RERANK_MAX_WORKERS", "4"))
+RERANK_TIMEOUT = float(os.getenv("RERANK_TIMEOUT", "60"))
+EVAL_BATCH_MODE = os.getenv("EVAL_BATCH_MODE", "0") == "1"
+EVAL_BATCH_TOKEN_BUDGET = int(os.getenv("EVAL_BATCH_TOKEN_BUDGET", "12000"))
+
+# --- LLM response cache (SQLite, dùng chung giữa bot và indexer) ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# --- Embedding ---
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")  # torch | onnx (logics/embeddingBackends.py)
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "models/onnx-minilm")
+EMBED_ONNX_QUANTIZE = os.getenv("EMBED_ONNX_QUANTIZE", "1") == "1"  # quantize dynamic int8
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 = để runtime tự chọn
+EMBED_MAX_SEQ_LENGTH = int(os.getenv("EMBED_MAX_SEQ_LENGTH", "256"))
+EMBED_COMPAT_MIN_COSINE = float(os.getenv("EMBED_COMPAT_MIN_COSINE", "0.99"))
+
+# --- Embedding server dùng chung (logics/embeddingServer.py) ---
+EMBED_SERVER_URL = os.getenv("EMBED_SERVER_URL", "")  # vd. http://127.0.0.1:8765; rỗng = load model trong process
+EMBED_SERVER_HOST = os.getenv("EMBED_SERVER_HOST", "127.0.0.1")
+EMBED_SERVER_PORT = int(os.getenv("EMBED_SERVER_PORT", "8765"))
+EMBED_SERVER_MAX_WAIT_MS = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", "5"))  # cửa sổ gom micro-batch
+EMBED_SERVER_CACHE_SIZE = int(os.getenv("EMBED_SERVER_CACHE_SIZE", "20000"))  # số vector trong LRU
+EMBED_SERVER_TIMEOUT = float(os.getenv("EMBED_SERVER_TIMEOUT", "30"))
+EMBED_SERVER_PAD_WASTE = float(os.getenv("EMBED_SERVER_PAD_WASTE", "0.3"))  # tỉ lệ pad tối đa / nhóm độ dài
+EMBED_SERVER_FALLBACK = os.getenv("EMBED_SERVER_FALLBACK", "1") == "1"  # server không phản hồi → load model local
+EMBED_SERVER_RETRY = float(os.getenv("EMBED_SERVER_RETRY", "30"))  # giây trước khi thử lại server sau lỗi
+
+# --- Incremental folder indexing ---
+INDEX_MANIFEST_DIR = os.getenv("INDEX_MANIFEST_DIR", "index_manifests")
+INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "10"))
+
+# --- Batch resume parsing pipeline ---
+PARSE_CPU_WORKERS = int(os.getenv("PARSE_CPU_WORKERS", str(os.cpu_count() or 2)))
+PARSE_LLM_WORKERS = int(os.getenv("PARSE_LLM_WORKERS", "4"))
+PARSE_QUEUE_SIZE = int(os.getenv("PARSE_QUEUE_SIZE", "16"))
+PARSE_INDEX_BATCH = int(os.getenv("PARSE_INDEX_BATCH", "64"))
+
+# --- OCR ---
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))
+# Giới hạn ký tự text đưa vào prompt LLM; đủ rồi thì dừng OCR các trang sau
+OCR_MAX_CHARS = int(os.getenv("OCR_MAX_CHARS", "20000"))
+
+# --- Mastodon bot ---
+MASTODON_CLIENT_KEY = os.getenv("MASTODON_CLIENT_KEY")
+MASTODON_CLIENT_SECRET = os.getenv("MASTODON_CLIENT_SECRET")
+
+# --- Job queue (listener → worker processes) ---
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "job_queue.sqlite")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "900"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "30"))
+JOB_QUEUE_MAX_PENDING = int(os.getenv("JOB_QUEUE_MAX_PENDING", "500"))
+BOT_IDENTITY_REFRESH = float(os.getenv("BOT_IDENTITY_REFRESH", "3600"))
+
+# --- Outbound DM dispatcher ---
+DM_DEFAULT_CHAR_LIMIT = int(os.getenv("DM_DEFAULT_CHAR_LIMIT", "500"))
+DM_RATE_LIMIT = int(os.getenv("DM_RATE_LIMIT", "300"))          # requests / window (mặc định Mastodon)
+DM_RATE_WINDOW = float(os.getenv("DM_RATE_WINDOW", "300"))      # giây
+DM_MAX_RETRIES = int(os.getenv("DM_MAX_RETRIES", "3"))
+DM_OUTBOX_PATH = os.getenv("DM_OUTBOX_PATH", JOB_QUEUE_PATH)   # outbox DM bền vững (mặc định chung file job queue)
+DM_SEND_LEASE = float(os.getenv("DM_SEND_LEASE", "120"))       # giây; sender chết giữa chừng → process khác gửi lại
+
+# --- CV intake (#cv) ---
+CV_HASHTAG = os.getenv("CV_HASHTAG", "cv")
+CV_MAX_BYTES = int(os.getenv("CV_MAX_BYTES", str(10 * 1024 * 1024)))
+CV_DOWNLOAD_TIMEOUT = float(os.getenv("CV_DOWNLOAD_TIMEOUT", "30"))
+CV_DOWNLOAD_WORKERS = int(os.getenv("CV_DOWNLOAD_WORKERS", "4"))
+CV_DOWNLOAD_DIR = os.getenv("CV_DOWNLOAD_DIR", "/tmp/cv_intake")
+
+# --- Hybrid retrieval (structured filter + vector) ---
+HYBRID_POOL_SIZE = int(os.getenv("HYBRID_POOL_SIZE", "20"))
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "0.6"))
+HYBRID_SKILL_WEIGHT = float(os.getenv("HYBRID_SKILL_WEIGHT", "0.3"))
+HYBRID_YEARS_WEIGHT = float(os.getenv("HYBRID_YEARS_WEIGHT", "0.1"))
+HYBRID_AUTO_YEARS_FILTER = os.getenv("HYBRID_AUTO_YEARS_FILTER", "1") == "1"
+
+# --- Inverted skill index (CV) ---
+SKILL_INDEX_PATH = os.getenv("SKILL_INDEX_PATH", "skill_index.sqlite")
+# must_have giao ra ≤ N CV → chỉ tìm vector trong các CV đó (ids=); nhiều hơn thì để Chroma `where` tự lọc
+SKILL_PRESCREEN_MAX_IDS = int(os.getenv("SKILL_PRESCREEN_MAX_IDS", "5000"))
+
+# --- Local pre-ranker (giữa retrieval và Gemini) ---
+PRERANK_MODE = os.getenv("PRERANK_MODE", "none")  # none | features | cross-encoder
+PRERANK_POOL_SIZE = int(os.getenv("PRERANK_POOL_SIZE", "50"))
+PRERANK_CROSS_ENCODER_MODEL = os.getenv("PRERANK_CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# --- Adaptive top_k + budget cho mỗi request matching ---
+ADAPTIVE_MAX_K = int(os.getenv("ADAPTIVE_MAX_K", "10"))          # top_k tối đa khi điểm sát nhau
+ADAPTIVE_MIN_SCORE = float(os.getenv("ADAPTIVE_MIN_SCORE", "0"))  # sàn điểm retrieval (0 = tắt)
+ADAPTIVE_REL_GAP = float(os.getenv("ADAPTIVE_REL_GAP", "0"))      # dừng khi điểm < top * (1 - gap) (0 = tắt, vd. 0.5)
+ADAPTIVE_CLUSTER_EPS = float(os.getenv("ADAPTIVE_CLUSTER_EPS", "0.01"))  # "sát nhau": chênh <= eps so với hit thứ top_k
+MATCH_MAX_LLM_CALLS = int(os.getenv("MATCH_MAX_LLM_CALLS", "0"))   # 0 = không giới hạn
+MATCH_MAX_WALL_TIME = float(os.getenv("MATCH_MAX_WALL_TIME", "0"))  # giây / request, 0 = không giới hạn
+
+# --- Batch JD×CV matcher (nightly) ---
+BATCH_MATCH_ROW_BLOCK = int(os.getenv("BATCH_MATCH_ROW_BLOCK", "512"))    # số JD mỗi tile
+BATCH_MATCH_COL_BLOCK = int(os.getenv("BATCH_MATCH_COL_BLOCK", "8192"))   # số CV mỗi tile
+
+# --- Snapshot embedding read-only (mmap) cho query worker ---
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") == "1"  # retrieval đọc snapshot nếu có và còn mới
+SNAPSHOT_IDLE_REFRESH = float(os.getenv("SNAPSHOT_IDLE_REFRESH", "30"))  # giây giữa 2 lần worker rảnh refresh snapshot cũ
+
+# --- Bảng match JD → top-N CV đã tính sẵn ---
+MATCH_TABLE_ENABLED = os.getenv("MATCH_TABLE_ENABLED", "1") == "1"
+MATCH_TABLE_PATH = os.getenv("MATCH_TABLE_PATH", "match_table.sqlite")
+MATCH_TABLE_TOP_N = int(os.getenv("MATCH_TABLE_TOP_N", "10"))
+MATCH_ADHOC_TTL = float(os.getenv("MATCH_ADHOC_TTL", str(7 * 24 * 3600)))  # giây; JD ad-hoc (bài Mastodon) quá hạn → xoá
+
+# --- Multi-vector theo field (skills / experience / projects / summary) ---
+MULTIVECTOR_ENABLED = os.getenv("MULTIVECTOR_ENABLED", "0") == "1"
+MULTIVECTOR_AGG = os.getenv("MULTIVECTOR_AGG", "weighted")  # weighted | max
+MULTIVECTOR_WEIGHTS = {
+    k.strip(): float(v)
+    for k, v in (p.split(":") for p in os.getenv(
+        "MULTIVECTOR_WEIGHTS", "skills:0.4,experience:0.3,projects:0.1,summary:0.2").split(",") if ":" in p)
+}
+
+# --- Vector nén trong snapshot (int8 / binary + chấm lại float32) ---
+SNAPSHOT_QUANT = os.getenv("SNAPSHOT_QUANT", "none")  # none | int8 | binary
+QUANT_RESCORE_FACTOR = int(os.getenv("QUANT_RESCORE_FACTOR", "10"))  # shortlist = top_k * factor
+QUANT_HAMMING_FACTOR = int(os.getenv("QUANT_HAMMING_FACTOR", "10"))  # binary: shortlist Hamming = shortlist * factor
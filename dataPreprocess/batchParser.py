@@ -0,0 +1,221 @@
+# batchParser.py
+# Pipeline parse CV theo lô, 3 stage nối bằng queue có giới hạn (bộ nhớ phẳng):
+#   [1] process pool: extract text (PyMuPDF / Tesseract, CPU-bound); file không đổi (source_hash) → bỏ qua
+#   [2] thread pool : extract_with_gemini (I/O-bound, giới hạn concurrency)
+#   [3] 1 thread    : validate_json + index (bulk upsert theo lô)
+import os, sys, time, queue, threading, traceback, multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from config import PARSE_CPU_WORKERS, PARSE_LLM_WORKERS, PARSE_QUEUE_SIZE, PARSE_INDEX_BATCH
+from dataPreprocess.resumeParser import extract_text, extract_with_gemini, validate_json, RESUME_EXTS
+from db.sourceFiles import hash_file, source_path
+
+_DONE = object()  # sentinel kết thúc stage
+
+
+class _StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.failed = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool = True):
+        with self._lock:
+            self.busy += seconds
+            if ok:
+                self.count += 1
+            else:
+                self.failed += 1
+
+    def report(self, wall: float) -> Dict[str, Any]:
+        return {
+            "stage": self.name,
+            "ok": self.count,
+            "failed": self.failed,
+            "busy_s": round(self.busy, 3),
+            "items_per_s": round(self.count / wall, 2) if wall > 0 else 0.0,
+        }
+
+
+def _extract_job(path: str, src_hash: str) -> Tuple[str, str, str, float]:
+    # chạy trong process con → phải là hàm top-level (pickle được)
+    t0 = time.perf_counter()
+    text = extract_text(path, workers=1)  # pool này đã song song theo document → không OCR song song lồng bên trong
+    return path, text, src_hash, time.perf_counter() - t0
+
+
+def _pool_context():
+    # Process con không fork từ process này: kiểm tra source_hash đã mở Chroma (thread tokio/sqlx không sống qua fork,
+    # GC của process con gọi finalizer chờ runtime đó → treo). forkserver khởi động từ process sạch.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
+
+
+def _cv_meta(path: str, src_hash: str) -> Dict[str, Any]:
+    return {"type": "cv", "filename": os.path.basename(path), "path": source_path(path), "source_hash": src_hash}
+
+
+def _default_unchanged_fn(metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    from db.LlamaIndexAdapter import load_if_unchanged
+    return load_if_unchanged("cv_collection", metadata, metadata["source_hash"])
+
+
+def _default_index_fn(items: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+    from db.LlamaIndexAdapter import upsert_json_docs
+    upsert_json_docs("cv_collection", items)
+
+
+# ------------------ Pipeline ------------------
+def parse_resumes_pipelined(
+    paths: List[str],
+    index_fn: Optional[Callable[[List[Tuple[Dict[str, Any], Dict[str, Any]]]], None]] = _default_index_fn,
+    cpu_workers: int = None,
+    llm_workers: int = None,
+    queue_size: int = None,
+    index_batch: int = None,
+    unchanged_fn: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = _default_unchanged_fn,
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Parse nhiều CV song song theo pipeline. Trả về ({path: cv_json}, stage_stats).
+    index_fn nhận list (data, metadata) theo lô; None → chỉ parse, không index.
+    unchanged_fn(metadata) → JSON đã index nếu file nguồn không đổi (source_hash khớp, như index_all_cvs):
+    file đó không extract / gọi Gemini / index lại. Chỉ dùng khi có index_fn.
+    """
+    cpu_workers = cpu_workers or PARSE_CPU_WORKERS
+    llm_workers = llm_workers or PARSE_LLM_WORKERS
+    queue_size = queue_size or PARSE_QUEUE_SIZE
+    index_batch = index_batch or PARSE_INDEX_BATCH
+
+    text_q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    json_q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    st_extract, st_llm, st_index = _StageStats("extract"), _StageStats("llm"), _StageStats("validate+index")
+    results: Dict[str, Dict[str, Any]] = {}
+    skipped: List[str] = []
+    if index_fn is None:
+        unchanged_fn = None
+
+    # --- Stage 1: CPU ---
+    def _stage_extract():
+        handled = 0  # file đã submit / bỏ qua / lỗi — phần còn lại bị tính fail nếu stage dừng giữa chừng
+        try:
+            with ProcessPoolExecutor(max_workers=cpu_workers, mp_context=_pool_context()) as pool:
+                inflight: deque = deque()
+
+                def _drain_one():
+                    fut, path = inflight.popleft()
+                    try:
+                        path, text, src_hash, took = fut.result()
+                        st_extract.record(took)
+                        text_q.put((path, text, src_hash))  # block khi stage 2 chậm → backpressure
+                    except Exception as e:
+                        st_extract.record(0.0, ok=False)
+                        print(f"❌ Extract failed {path}: {e}")
+
+                for path in paths:
+                    try:
+                        src_hash = hash_file(path)
+                        stored = unchanged_fn(_cv_meta(path, src_hash)) if unchanged_fn else None
+                    except Exception as e:
+                        handled += 1
+                        st_extract.record(0.0, ok=False)
+                        print(f"❌ Extract failed {path}: {e}")
+                        continue
+                    if stored is not None:
+                        handled += 1
+                        print(f"⏭️ Unchanged CV, skipped: {path}")
+                        results[path] = stored
+                        skipped.append(path)
+                        continue
+                    inflight.append((pool.submit(_extract_job, path, src_hash), path))
+                    handled += 1
+                    if len(inflight) >= cpu_workers * 2:
+                        _drain_one()
+                while inflight:
+                    _drain_one()
+        except Exception as e:
+            # vd. tạo pool lỗi / BrokenProcessPool khi submit: các file chưa submit coi như fail
+            print(f"❌ Extract stage aborted: {e}")
+            traceback.print_exc()
+            for _ in range(len(paths) - handled):
+                st_extract.record(0.0, ok=False)
+        finally:
+            # luôn gửi sentinel, không thì stage 2/3 chờ mãi và join() không bao giờ trả về
+            for _ in range(llm_workers):
+                text_q.put(_DONE)
+
+    # --- Stage 2: I/O ---
+    def _stage_llm():
+        while True:
+            item = text_q.get()
+            if item is _DONE:
+                json_q.put(_DONE)
+                return
+            path, text, src_hash = item
+            t0 = time.perf_counter()
+            try:
+                llm_data = extract_with_gemini(text)
+                st_llm.record(time.perf_counter() - t0)
+                json_q.put((path, llm_data, src_hash))
+            except Exception as e:
+                st_llm.record(time.perf_counter() - t0, ok=False)
+                print(f"❌ Gemini failed {path}: {e}")
+
+    # --- Stage 3: validate + index ---
+    def _stage_index():
+        finished, buffer = 0, []
+
+        def _flush():
+            if buffer and index_fn is not None:
+                t0 = time.perf_counter()
+                try:
+                    index_fn(list(buffer))
+                except Exception as e:
+                    print(f"❌ Indexing batch failed: {e}")
+                    traceback.print_exc()
+                st_index.busy += time.perf_counter() - t0
+            buffer.clear()
+
+        while finished < llm_workers:
+            item = json_q.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            path, llm_data, src_hash = item
+            t0 = time.perf_counter()
+            data = validate_json(llm_data)
+            results[path] = data
+            buffer.append((data, _cv_meta(path, src_hash)))
+            st_index.record(time.perf_counter() - t0)
+            if len(buffer) >= index_batch:
+                _flush()
+        _flush()
+
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=_stage_extract, name="parse-extract")]
+    threads += [threading.Thread(target=_stage_llm, name=f"parse-llm-{i}") for i in range(llm_workers)]
+    threads.append(threading.Thread(target=_stage_index, name="parse-index"))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t_start
+
+    stats = [s.report(wall) for s in (st_extract, st_llm, st_index)]
+    print(f"\n=== ⏱️ PIPELINE DONE: {len(results)}/{len(paths)} CVs ({len(skipped)} unchanged) in {wall:.2f}s ===")
+    for s in stats:
+        print(f"  {s['stage']:<15} ok={s['ok']:<5} failed={s['failed']:<4} busy={s['busy_s']:>8}s  {s['items_per_s']} items/s")
+    return results, stats
+
+
+# ------------------ Run ------------------
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else "cv_folder"
+    files = [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+             if f.lower().endswith(RESUME_EXTS)]
+    parse_resumes_pipelined(files)
+    from db.embeddingSnapshot import refresh_existing
+    refresh_existing(("cv_collection",))
@@ -2,17 +2,30 @@
 import re
 import google.generativeai as gemini
 from config import GEMINI_API_KEY
+from db.llmCache import cached_call
 import os
 import json
 
 # --- Cấu hình ---
 gemini.configure(api_key=GEMINI_API_KEY)
+_MODEL_NAME = "gemini-2.5-flash"
+_PROMPT_VERSION = "jd-v1"  # đổi khi sửa prompt để bỏ qua cache cũ
+
 
 def parse_job_description(jd_text: str) -> dict:
     """
     Chuẩn hóa (normalize) và trích xuất thông tin quan trọng từ JD bằng Gemini.
     Trả về đối tượng JSON chuẩn gồm các trường chính.
+    Kết quả được cache theo (model, prompt version, jd_text) — JD trùng không gọi lại Gemini.
     """
+    return cached_call(
+        _MODEL_NAME, _PROMPT_VERSION, (jd_text,),
+        lambda: _parse_job_description(jd_text),
+        should_cache=lambda r: "raw_text" not in r,
+    )
+
+
+def _parse_job_description(jd_text: str) -> dict:
     prompt = f"""
     You are a precise JD parser. Read the following Job Description and extract key info.
     Return VALID JSON ONLY with these fields:
@@ -31,7 +44,7 @@ def parse_job_description(jd_text: str) -> dict:
     --- JD ---
     {jd_text}
     """
-    response = gemini.GenerativeModel("gemini-2.5-flash").generate_content(prompt)
+    response = gemini.GenerativeModel(_MODEL_NAME).generate_content(prompt)
     text = response.text.strip()
 
     # Tìm và trích JSON trong phần text trả về
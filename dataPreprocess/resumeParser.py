@@ -1,33 +1,143 @@
 import google.generativeai as gemini
 import fitz
 import pytesseract
-from PIL import Image
-from config import GEMINI_API_KEY
+from PIL import Image, ImageSequence
+from config import GEMINI_API_KEY, OCR_DPI, OCR_WORKERS, OCR_LANG, OCR_MIN_PAGE_CHARS, OCR_MAX_CHARS
+from db.llmCache import cached_call
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional
+from io import BytesIO
 import json
 import os
 import re
+import threading
 from datetime import datetime
 
 # ---------- Setup Gemini ----------
 gemini.configure(api_key=GEMINI_API_KEY)
+_MODEL_NAME = "gemini-2.5-flash"
+_PROMPT_VERSION = "resume-v1"  # đổi khi sửa prompt để bỏ qua cache cũ
 
 
 # ---------- STEP 1: Extract text ----------
-def extract_text_from_pdf(path):
-    doc = fitz.open(path)
-    text = ""
+def _ocr_png(png_bytes: bytes, lang: str) -> str:
+    return pytesseract.image_to_string(Image.open(BytesIO(png_bytes)), lang=lang)
+
+
+# pytesseract gọi binary tesseract qua subprocess → thread pool vẫn OCR song song thật (GIL nhả khi chờ),
+# dùng được trong worker process daemon (không được tạo process con) và không lồng process pool
+# khi bị gọi từ pool extract của batchParser. 1 pool / process, dùng chung cho mọi document.
+_ocr_pool: Optional[ThreadPoolExecutor] = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool() -> ThreadPoolExecutor:
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ThreadPoolExecutor(max_workers=max(1, OCR_WORKERS), thread_name_prefix="ocr")
+        return _ocr_pool
+
+
+def _stream_pages(page_sources, max_chars: int, workers: int, lang: str):
+    """
+    page_sources: iterator trả về ("text", str) hoặc ("png", bytes) theo thứ tự trang.
+    OCR song song (tối đa `workers` trang đang chờ) trên pool OCR dùng chung, yield text từng trang ĐÚNG thứ tự,
+    dừng khi tổng ký tự đạt max_chars (trang phía sau không bị rasterise/OCR nữa).
+    """
+    pending = deque()
+    lookahead = max(1, workers) * 2
+    used = 0
+
+    def _fill():
+        while len(pending) < lookahead:
+            src = next(page_sources, None)
+            if src is None:
+                return
+            kind, payload = src
+            if kind == "text" or workers <= 1:
+                pending.append(payload if kind == "text" else _ocr_png(payload, lang))
+                continue
+            pending.append(_get_ocr_pool().submit(_ocr_png, payload, lang))
+
+    try:
+        _fill()
+        while pending:
+            item = pending.popleft()
+            text = item.result() if isinstance(item, Future) else item
+            yield text
+            used += len(text)
+            if max_chars and used >= max_chars:
+                return
+            _fill()
+    finally:
+        for item in pending:
+            if isinstance(item, Future):
+                item.cancel()
+
+
+def _pdf_page_sources(doc, dpi: int):
     for page in doc:
-        text += page.get_text("text") + "\n"
-    return text
+        text = page.get_text("text")
+        if len(text.strip()) >= OCR_MIN_PAGE_CHARS:
+            yield "text", text
+        else:
+            # trang chỉ có ảnh (scan) → rasterise để OCR
+            yield "png", page.get_pixmap(dpi=dpi).tobytes("png")
+
+
+def _img_page_sources(img):
+    for frame in ImageSequence.Iterator(img):  # TIFF nhiều trang → mỗi frame 1 trang
+        buf = BytesIO()
+        frame.convert("RGB").save(buf, format="PNG")
+        yield "png", buf.getvalue()
+
+
+def iter_pdf_text(path, dpi=None, max_chars=None, workers=None, lang=None):
+    """Stream text từng trang PDF; trang scan được OCR song song theo DPI cấu hình."""
+    doc = fitz.open(path)
+    try:
+        yield from _stream_pages(
+            _pdf_page_sources(doc, dpi or OCR_DPI),
+            OCR_MAX_CHARS if max_chars is None else max_chars,
+            OCR_WORKERS if workers is None else workers,
+            lang or OCR_LANG,
+        )
+    finally:
+        doc.close()
+
+
+def iter_img_text(path, max_chars=None, workers=None, lang=None):
+    """Stream text OCR từng trang/frame của file ảnh."""
+    with Image.open(path) as img:
+        yield from _stream_pages(
+            _img_page_sources(img),
+            OCR_MAX_CHARS if max_chars is None else max_chars,
+            OCR_WORKERS if workers is None else workers,
+            lang or OCR_LANG,
+        )
+
+
+def extract_text_from_pdf(path):
+    return "\n".join(iter_pdf_text(path)) + "\n"
 
 
 def extract_text_from_img(path):
-    img = Image.open(path)
-    return pytesseract.image_to_string(img)
+    return "\n".join(iter_img_text(path))
 
 
 # ---------- STEP 2: Use LLM to Extract info ----------
 def extract_with_gemini(text):
+    # Cache theo nội dung text → chạy lại initdb.py không parse lại CV cũ
+    return cached_call(
+        _MODEL_NAME, _PROMPT_VERSION, (text,),
+        lambda: _extract_with_gemini(text),
+        should_cache=lambda r: bool(r),
+    )
+
+
+def _extract_with_gemini(text):
     prompt = f'''
 You are a STRICT resume parser.
 Your job is to extract ONLY information that is explicitly written in the resume text. 
@@ -115,7 +225,7 @@ Strict rules you MUST follow:
 Resume text:
 {text}
 '''
-    model = gemini.GenerativeModel("gemini-2.5-flash")
+    model = gemini.GenerativeModel(_MODEL_NAME)
     response = model.generate_content(prompt)
 
     raw_output = ""
@@ -305,15 +415,23 @@ def validate_json(data):
 
 
 # ---------- Wrapper ----------
-def parse_resume(file_path: str):
+RESUME_EXTS = (".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+
+def extract_text(file_path: str, workers: Optional[int] = None) -> str:
+    """workers: số trang OCR song song cho document này (None = OCR_WORKERS; 1 = tuần tự)."""
     ext = os.path.splitext(file_path)[1].lower()
     if ext == ".pdf":
-        raw_text = extract_text_from_pdf(file_path)
-    elif ext in [".png", ".jpg", ".jpeg"]:
-        raw_text = extract_text_from_img(file_path)
+        return "\n".join(iter_pdf_text(file_path, workers=workers)) + "\n"
+    elif ext in RESUME_EXTS:
+        return "\n".join(iter_img_text(file_path, workers=workers))  # TIFF nhiều trang: mỗi frame 1 trang
     else:
         raise ValueError(f"Unsupported file format: {ext}")
 
+
+def parse_resume(file_path: str):
+    raw_text = extract_text(file_path)
+
     llm_data = extract_with_gemini(raw_text)
     final_data = validate_json(llm_data)
     return final_data
@@ -1,17 +1,58 @@
 # li_adapter.py  ✅ fix metadata flatten for LlamaIndex >= 0.10.x
 
-from llama_index.core import Document, VectorStoreIndex, StorageContext, Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core import VectorStoreIndex, StorageContext, Settings
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.schema import TextNode, NodeRelationship, RelatedNodeInfo
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
 from llama_index.vector_stores.chroma import ChromaVectorStore
-import chromadb, json
-from typing import Dict, Any
-from logics.embedder import json_to_text_auto
+import chromadb, json, math, hashlib, threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from config import EMBED_MODEL_NAME, EMBED_BATCH_SIZE, SNAPSHOT_ENABLED, MULTIVECTOR_ENABLED
+from logics.embedder import json_to_text_auto, json_to_fields, encode_texts
+from logics.skills import structured_metadata, parse_skills_meta, SKILL_KEY_PREFIX
+from db.skillIndex import sync_upserts as skill_index_upserts, sync_deletes as skill_index_deletes
+from db.embeddingSnapshot import get_snapshot, mark_dirty as mark_snapshot_dirty
+from db.matchTable import mark_pending as mark_match_pending
+from db.sourceFiles import hash_file, source_path  # re-export: caller cũ import từ adapter
+
+# Collection có inverted skill index đi kèm (giữ đồng bộ khi upsert/xoá)
+SKILL_INDEXED_COLLECTIONS = ("cv_collection",)
+# Vector theo field của document cha nằm ở collection "<tên>_fields", id "<parent>#<field>#<n>"
+FIELD_COLLECTION_SUFFIX = "_fields"
+
+# --- Persistent Chroma client (mở lần đầu khi cần; worker đọc snapshot mmap thì không cần mở) ---
+_chroma_client = None
+_chroma_lock = threading.Lock()
 
-# --- Persistent Chroma client ---
-_chroma_client = chromadb.PersistentClient(path="chroma_db")
 
 # --- Embedding model setup ---
-_embed = HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+class SharedEmbedding(BaseEmbedding):
+    """
+    Bọc model dùng chung của logics/embedder cho LlamaIndex, thay vì load thêm HuggingFaceEmbedding.
+    Model chỉ load khi có vector đầu tiên cần tính (lazy).
+    """
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SharedEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return encode_texts([query])[0].tolist()
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return encode_texts([text])[0].tolist()
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return encode_texts(texts).tolist()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
+
+
+_embed = SharedEmbedding(model_name=EMBED_MODEL_NAME)
 
 # --- Global settings ---
 Settings.embed_model = _embed
@@ -19,9 +60,38 @@ Settings.chunk_size = 512
 
 
 # Internal helper
+def _get_client():
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                _chroma_client = chromadb.PersistentClient(path="chroma_db")
+    return _chroma_client
+
+
+def _get_collection(collection_name: str):
+    return _get_client().get_or_create_collection(collection_name)
+
+
 def _get_vector_store(collection_name: str) -> ChromaVectorStore:
-    collection = _chroma_client.get_or_create_collection(collection_name)
-    return ChromaVectorStore(chroma_collection=collection)
+    return ChromaVectorStore(chroma_collection=_get_collection(collection_name))
+
+
+def to_hit(doc_id: str, text: str, meta: Optional[Dict[str, Any]], distance: float) -> Dict[str, Any]:
+    """Gom 1 kết quả Chroma thành dict: id, score, text, metadata, data (_raw_json đã parse)."""
+    meta = dict(meta or {})
+    try:
+        data = json.loads(meta.get("_raw_json") or "{}")
+    except (TypeError, json.JSONDecodeError):
+        data = {}
+    return {
+        "id": doc_id,
+        # cùng công thức với ChromaVectorStore để score không đổi so với query_topk
+        "score": math.exp(-distance) if distance is not None else 0.0,
+        "text": text or "",
+        "metadata": meta,
+        "data": data,
+    }
 
 
 # =======================================================
@@ -33,42 +103,412 @@ def upsert_json_doc(collection_name: str, data: Dict[str, Any], metadata: Dict[s
     Convert JSON → text → embed → upsert vào Chroma (qua LlamaIndex).
     Metadata giờ phải là flat dict (str, int, float, None)
     """
-    text = json_to_text_auto(data)
-    if not text.strip():
+    if not json_to_text_auto(data).strip():
         raise ValueError("Empty text after JSON conversion")
 
-    vector_store = _get_vector_store(collection_name)
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    upsert_json_docs(collection_name, [(data, metadata)])
+    return metadata.get("external_id", "")
+
+
+def make_doc_id(metadata: Dict[str, Any]) -> str:
+    """
+    Id cố định cho 1 document: external_id nếu có, không thì đường dẫn tương đối ("path"),
+    cuối cùng mới tới filename (file cùng tên ở 2 folder khác nhau không được đè nhau).
+    """
+    if metadata.get("external_id"):
+        return f"ext:{metadata['external_id']}"
+    if metadata.get("path"):
+        return f"file:{metadata['path']}"
+    if metadata.get("filename"):
+        return f"file:{metadata['filename']}"
+    raise ValueError("metadata needs 'external_id', 'path' or 'filename' to derive a stable doc id")
+
+
+def get_stored_meta(collection_name: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Metadata hiện có trong Chroma của các id (id không tồn tại thì không có trong dict)."""
+    if not ids:
+        return {}
+    res = _get_collection(collection_name).get(ids=list(ids), include=["metadatas"])
+    return {i: (m or {}) for i, m in zip(res.get("ids", []), res.get("metadatas") or [])}
+
+
+def load_if_unchanged(collection_name: str, metadata: Dict[str, Any], source_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Nếu document (theo make_doc_id) đã được index từ đúng file nguồn này (source_hash khớp)
+    → trả về JSON đã lưu, để caller bỏ qua parse/LLM/embedding. Ngược lại trả về None.
+    """
+    doc_id = make_doc_id(metadata)
+    stored = get_stored_meta(collection_name, [doc_id]).get(doc_id)
+    if not stored or stored.get("source_hash") != source_hash:
+        return None
+    try:
+        return json.loads(stored.get("_raw_json") or "{}")
+    except json.JSONDecodeError:
+        return None
+
+
+def upsert_json_docs(
+    collection_name: str,
+    items: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    batch_size: Optional[int] = None,
+) -> List[str]:
+    """
+    Bulk ingest idempotent: items = [(data, metadata), ...].
+    - id cố định (make_doc_id) + content_hash trong metadata
+    - doc không đổi → bỏ qua, không embed; doc đổi → ghi đè vector cũ tại chỗ (upsert)
+    - nội dung không đổi nhưng metadata của caller đổi (vd. file nguồn sửa mà parse ra cùng JSON → source_hash mới)
+      → chỉ cập nhật metadata, để load_if_unchanged lần sau khớp mà không phải parse / gọi LLM lại
+    - mỗi batch = 1 lần encode + 1 lần upsert vào Chroma
+    Trả về list id đã ghi (mới hoặc thay đổi).
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+
+    pending: Dict[str, Tuple[str, Dict[str, Any], Dict[str, Any]]] = {}  # id → (text, flat_meta, metadata gốc)
+    for data, metadata in items:
+        text = json_to_text_auto(data)
+        if not text.strip():
+            print(f"⚠️ Empty text after JSON conversion, skipped: {metadata.get('filename', 'N/A')}")
+            continue
+        raw_json = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        # ✅ flatten _raw_json để tránh lỗi ValueError
+        flat_meta = metadata.copy()
+        flat_meta["_raw_json"] = raw_json
+        flat_meta.update(structured_metadata(data))  # skill token + số năm KN → lọc bằng `where`
+        flat_meta["content_hash"] = hashlib.sha256(f"{text}\x00{raw_json}".encode("utf8")).hexdigest()
+        pending[make_doc_id(metadata)] = (text, flat_meta, metadata)  # id trùng trong cùng lô → giữ bản cuối
+
+    if not pending:
+        return []
+
+    stored = get_stored_meta(collection_name, list(pending))
+    changed = {i: v for i, v in pending.items() if stored.get(i, {}).get("content_hash") != v[1]["content_hash"]}
+    meta_only = {
+        i: {k: v for k, v in meta.items() if v is not None}
+        for i, (_, _, meta) in pending.items()
+        if i not in changed and any(stored[i].get(k) != v for k, v in meta.items() if v is not None)
+    }
+    skipped = len(pending) - len(changed) - len(meta_only)
+    if skipped:
+        print(f"⏭️ {skipped} unchanged document(s) skipped in '{collection_name}'")
+    if meta_only:
+        _get_collection(collection_name).update(
+            ids=list(meta_only), metadatas=[{**stored[i], **m} for i, m in meta_only.items()]
+        )
+        print(f"📝 {len(meta_only)} document(s) with unchanged content: metadata updated in '{collection_name}'")
+        mark_snapshot_dirty(collection_name)
+    if not changed:
+        return []
+
+    collection = _get_collection(collection_name)
+
+    # Dọn vector trùng do phiên bản cũ ghi với id ngẫu nhiên / id theo filename trần (cùng filename/external_id).
+    # Document đã có "path" là của folder khác (cùng tên file) → giữ nguyên.
+    new_ids = [i for i in changed if i not in stored]
+    legacy_ids = set()
+    for field in ("external_id", "filename"):
+        keys = [changed[i][1][field] for i in new_ids if changed[i][1].get(field)]
+        if keys:
+            res = collection.get(where={field: {"$in": keys}}, include=["metadatas"])
+            legacy_ids.update(i for i, m in zip(res.get("ids", []), res.get("metadatas") or [])
+                              if field == "external_id" or not (m or {}).get("path"))
+    legacy_ids -= set(changed)
+    if legacy_ids:
+        collection.delete(ids=list(legacy_ids))
+        _delete_field_vectors(collection_name, legacy_ids)
+
+    ids = list(changed)
+    for i in range(0, len(ids), batch_size):
+        batch_ids = ids[i:i + batch_size]
+        texts = [changed[d][0] for d in batch_ids]
+        vectors = encode_texts(texts, batch_size=batch_size)
+        # ref_doc_id = id cố định → metadata "doc_id"/"document_id" của LlamaIndex trỏ đúng document
+        nodes = [
+            TextNode(id_=d, text=t, metadata=changed[d][1],
+                     relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=d)})
+            for d, t in zip(batch_ids, texts)
+        ]
+        collection.upsert(
+            ids=batch_ids,
+            embeddings=vectors.tolist(),
+            documents=texts,
+            # cùng format metadata với ChromaVectorStore.add → query_topk vẫn đọc được
+            metadatas=[node_to_metadata_dict(n, remove_text=True, flat_metadata=True) for n in nodes],
+        )
+        if MULTIVECTOR_ENABLED:
+            upsert_field_vectors(collection_name, {d: changed[d][1] for d in batch_ids}, batch_size)
+        print(f"✅ Indexed {min(i + batch_size, len(ids))}/{len(ids)} documents into '{collection_name}'")
 
-    # ✅ flatten _raw_json để tránh lỗi ValueError
-    flat_meta = metadata.copy()
-    flat_meta["_raw_json"] = json.dumps(data, ensure_ascii=False)
+    mark_snapshot_dirty(collection_name)
+    mark_match_pending(collection_name, legacy_ids, "delete")
+    mark_match_pending(collection_name, ids)
+    if collection_name in SKILL_INDEXED_COLLECTIONS:
+        skill_index_deletes(legacy_ids)
+        skill_index_upserts({d: parse_skills_meta(changed[d][1].get("skills_norm")) for d in ids})
+
+    # PersistentClient ghi xuống đĩa sau mỗi lệnh, không cần persist() riêng
+    return ids
+
+
+def backfill_structured_metadata(collection_name: str, page_size: int = 500) -> int:
+    """
+    Bổ sung metadata skill/years cho document đã index trước khi có hybrid retrieval (không re-embed).
+    Đồng bộ luôn skill index và metadata lọc của vector field để `where` / must_have không bỏ sót document cũ.
+    """
+    collection = _get_collection(collection_name)
+    updated, offset = 0, 0
+    while True:
+        res = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        ids = res.get("ids", [])
+        if not ids:
+            break
+        upd_ids, upd_metas = [], []
+        for doc_id, meta in zip(ids, res.get("metadatas") or []):
+            meta = dict(meta or {})
+            if "skills_norm" in meta:
+                continue
+            try:
+                data = json.loads(meta.get("_raw_json") or "{}")
+            except json.JSONDecodeError:
+                continue
+            meta.update(structured_metadata(data))
+            upd_ids.append(doc_id)
+            upd_metas.append(meta)
+        if upd_ids:
+            collection.update(ids=upd_ids, metadatas=upd_metas)
+            _update_field_filter_metadata(collection_name, dict(zip(upd_ids, upd_metas)))
+            if collection_name in SKILL_INDEXED_COLLECTIONS:
+                skill_index_upserts({d: parse_skills_meta(m.get("skills_norm")) for d, m in zip(upd_ids, upd_metas)})
+            updated += len(upd_ids)
+        offset += len(ids)
+    if updated:
+        mark_snapshot_dirty(collection_name)
+    print(f"✅ Backfilled structured metadata for {updated} document(s) in '{collection_name}'")
+    return updated
 
-    doc = Document(text=text, metadata=flat_meta)
 
-    index = VectorStoreIndex.from_documents(
-        [doc],
-        storage_context=storage_context,
-        show_progress=False,
+_backfill_checked: set = set()
+_backfill_lock = threading.Lock()
+
+
+def ensure_structured_metadata(collection_name: str) -> int:
+    """
+    Chạy backfill 1 lần / process / collection nếu còn document thiếu `years`
+    (Chroma `where` loại document thiếu field → lọc số năm tự động sẽ âm thầm bỏ CV cũ).
+    """
+    with _backfill_lock:
+        if collection_name in _backfill_checked:
+            return 0
+        collection = _get_collection(collection_name)
+        total = collection.count()
+        updated = 0
+        if total and len(collection.get(where={"years": {"$gte": 0}}, include=[])["ids"]) < total:
+            updated = backfill_structured_metadata(collection_name)
+        _backfill_checked.add(collection_name)
+        return updated
+
+
+def delete_docs(collection_name: str, ids: List[str]) -> None:
+    """Xoá vector của các document theo id cố định (make_doc_id)."""
+    if ids:
+        _get_collection(collection_name).delete(ids=list(ids))
+        _delete_field_vectors(collection_name, ids)
+        mark_snapshot_dirty(collection_name)
+        mark_match_pending(collection_name, ids, "delete")
+        if collection_name in SKILL_INDEXED_COLLECTIONS:
+            skill_index_deletes(ids)
+        print(f"🗑️ Deleted {len(ids)} document(s) from '{collection_name}'")
+
+
+# =======================================================
+# 🧩 Multi-vector theo field
+# =======================================================
+def _field_collection(collection_name: str):
+    return _get_collection(collection_name + FIELD_COLLECTION_SUFFIX)
+
+
+def _delete_field_vectors(collection_name: str, parent_ids) -> None:
+    parent_ids = list(parent_ids)
+    if parent_ids and MULTIVECTOR_ENABLED:
+        _field_collection(collection_name).delete(where={"parent_id": {"$in": parent_ids}})
+
+
+def _update_field_filter_metadata(collection_name: str, parents: Dict[str, Dict[str, Any]]) -> None:
+    # copy lại metadata lọc của document cha sang vector field đã có (không re-embed)
+    if not parents or not MULTIVECTOR_ENABLED:
+        return
+    fc = _field_collection(collection_name)
+    res = fc.get(where={"parent_id": {"$in": list(parents)}}, include=["metadatas"])
+    ids, metas = [], []
+    for fid, meta in zip(res.get("ids", []), res.get("metadatas") or []):
+        parent = parents.get((meta or {}).get("parent_id"))
+        if parent is None:
+            continue
+        shared = {k: v for k, v in parent.items() if k.startswith(SKILL_KEY_PREFIX) or k in ("years", "skills_norm")}
+        ids.append(fid)
+        metas.append({**meta, **shared})
+    if ids:
+        fc.update(ids=ids, metadatas=metas)
+
+
+def upsert_field_vectors(collection_name: str, parents: Dict[str, Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+    """
+    parents = {parent_id: metadata của document cha (có _raw_json)}. Tách field (json_to_fields),
+    encode toàn bộ text của lô trong 1 lần gọi, thay vector field cũ của các parent.
+    Metadata lọc (sk_*, years, skills_norm) được copy sang từng vector → dùng được cùng `where` với collection cha.
+    """
+    ids, texts, metas = [], [], []
+    for parent_id, meta in parents.items():
+        try:
+            data = json.loads(meta.get("_raw_json") or "{}")
+        except json.JSONDecodeError:
+            continue
+        shared = {k: v for k, v in meta.items() if k.startswith(SKILL_KEY_PREFIX) or k in ("years", "skills_norm", "type")}
+        for field, field_texts in json_to_fields(data).items():
+            for n, t in enumerate(field_texts):
+                ids.append(f"{parent_id}#{field}#{n}")
+                texts.append(t)
+                metas.append({**shared, "parent_id": parent_id, "field": field})
+    fc = _field_collection(collection_name)
+    if parents:
+        fc.delete(where={"parent_id": {"$in": list(parents)}})
+    if not ids:
+        return 0
+    vectors = encode_texts(texts, batch_size=batch_size or EMBED_BATCH_SIZE)
+    fc.upsert(ids=ids, embeddings=vectors.tolist(), documents=texts, metadatas=metas)
+    return len(ids)
+
+
+def query_field_parents(
+    collection_name: str,
+    field: str,
+    query_vecs,
+    n_results: int,
+    where: Optional[Dict[str, Any]] = None,
+    parent_ids: Optional[List[str]] = None,
+) -> List[str]:
+    """Parent id có vector `field` gần các query vector (ứng viên cho bước chấm chính xác)."""
+    conds = [{"field": field}]
+    if where:
+        conds += where["$and"] if list(where) == ["$and"] else [where]
+    if parent_ids is not None:
+        conds.append({"parent_id": {"$in": list(parent_ids)}})
+    res = _field_collection(collection_name).query(
+        query_embeddings=[list(map(float, v)) for v in query_vecs],
+        n_results=n_results,
+        where=conds[0] if len(conds) == 1 else {"$and": conds},
+        include=["metadatas"],
     )
+    parents = []
+    for metas in res.get("metadatas") or []:
+        parents.extend(m["parent_id"] for m in metas or [] if m)
+    return list(dict.fromkeys(parents))
 
-    storage_context.persist()
-    print(f"✅ Indexed document into '{collection_name}' | meta: {metadata.get('filename','N/A')}")
-    return metadata.get("external_id", "")
 
+def get_field_vectors(collection_name: str, parent_ids: List[str]) -> Dict[str, Dict[str, List[Any]]]:
+    """{parent_id: {field: [vector, ...]}} cho các parent."""
+    out: Dict[str, Dict[str, List[Any]]] = {}
+    if not parent_ids:
+        return out
+    res = _field_collection(collection_name).get(where={"parent_id": {"$in": list(parent_ids)}},
+                                                 include=["embeddings", "metadatas"])
+    for emb, meta in zip(res.get("embeddings") if res.get("embeddings") is not None else [],
+                         res.get("metadatas") or []):
+        out.setdefault(meta["parent_id"], {}).setdefault(meta["field"], []).append(emb)
+    return out
 
-def query_topk(collection_name: str, query_text: str, top_k: int = 10):
+
+def count_field_vectors(collection_name: str) -> int:
+    return _field_collection(collection_name).count()
+
+
+def iter_collection(
+    collection_name: str,
+    include: Tuple[str, ...] = ("metadatas",),
+    page_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """Duyệt toàn bộ collection theo trang: mỗi trang là kết quả `collection.get` ({"ids", <include>...})."""
+    collection, offset = _get_collection(collection_name), 0
+    while True:
+        res = collection.get(include=list(include), limit=page_size, offset=offset)
+        ids = res.get("ids", [])
+        if not ids:
+            break
+        yield res
+        offset += len(ids)
+
+
+def get_docs(collection_name: str, ids: List[str], include: Tuple[str, ...] = ("metadatas",)) -> Dict[str, Any]:
+    """`collection.get` theo id cố định (id không tồn tại thì không có trong kết quả)."""
+    return _get_collection(collection_name).get(ids=list(ids), include=list(include))
+
+
+def count_docs(collection_name: str) -> int:
+    return _get_collection(collection_name).count()
+
+
+def retrieve_topk(
+    collection_name: str,
+    query_text: str,
+    top_k: int = 10,
+    where: Optional[Dict[str, Any]] = None,
+    ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
     """
-    Query top-k similar nodes using LlamaIndex + Chroma.
+    Retrieval-only: 1 lần embed query + 1 lần ANN search trên Chroma, không gọi LLM.
+    `where`: pre-filter metadata của Chroma (vd. {"years": {"$gte": 2}}), áp dụng trước khi xếp hạng.
+    `ids`: chỉ tìm trong các document này (vd. kết quả giao skill index), kết hợp AND với `where`.
+    Trả về list dict {id, score, text, metadata, data} theo thứ tự score giảm dần.
+    Có snapshot mmap còn mới (db/embeddingSnapshot.py) → tìm trên snapshot, không mở Chroma.
     """
-    vector_store = _get_vector_store(collection_name)
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    if not query_text or not query_text.strip():
+        return []
+
+    query_vec = Settings.embed_model.get_query_embedding(query_text)
+    snap = get_snapshot(collection_name) if SNAPSHOT_ENABLED else None
+    if snap is not None:
+        found = snap.search(query_vec, top_k, where, ids=ids)
+        if found is not None:  # None: `where` không dịch được → Chroma
+            return [to_hit(i, t, m, d) for i, t, m, d in found]
 
-    index = VectorStoreIndex.from_vector_store(
-        vector_store=vector_store,
-        storage_context=storage_context,
+    collection = _get_collection(collection_name)
+    n = min(top_k, collection.count() if ids is None else len(ids))
+    if n <= 0:
+        return []
+
+    res = collection.query(
+        query_embeddings=[query_vec],
+        ids=ids,
+        n_results=n,
+        where=where or None,
+        include=["documents", "metadatas", "distances"],
     )
 
+    ids = res.get("ids", [[]])[0]
+    docs = (res.get("documents") or [[]])[0]
+    metas = (res.get("metadatas") or [[]])[0]
+    dists = (res.get("distances") or [[]])[0]
+    return [to_hit(i, t, m, d) for i, t, m, d in zip(ids, docs, metas, dists)]
+
+
+_indexes: Dict[str, VectorStoreIndex] = {}
+
+
+def query_topk(collection_name: str, query_text: str, top_k: int = 10):
+    """
+    Query top-k similar nodes using LlamaIndex + Chroma.
+    ⚠️ Chạy thêm bước LLM synthesis của query engine — nếu chỉ cần node, dùng retrieve_topk().
+    """
+    index = _indexes.get(collection_name)
+    if index is None:
+        # dựng 1 lần / process thay vì mỗi query
+        vector_store = _get_vector_store(collection_name)
+        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        index = VectorStoreIndex.from_vector_store(
+            vector_store=vector_store,
+            storage_context=storage_context,
+        )
+        _indexes[collection_name] = index
+
     qe = index.as_query_engine(similarity_top_k=top_k)
     resp = qe.query(query_text)
     return resp.source_nodes  # list[NodeWithScore]
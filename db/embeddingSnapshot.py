@@ -0,0 +1,361 @@
+# embeddingSnapshot.py
+# Snapshot read-only của 1 collection: embeddings.npy (float32, mmap) + sq_norms.npy + bảng id/metadata (SQLite).
+# Nhiều process mmap cùng file → dùng chung page cache của OS, không copy; không cần mở Chroma để retrieve.
+#
+# snapshots/<collection>/CURRENT        → tên thư mục version đang dùng (ghi nguyên tử bằng os.replace)
+# snapshots/<collection>/DIRTY          → chạm vào mỗi khi collection bị ghi; mới hơn CURRENT = snapshot cũ → fallback Chroma
+# snapshots/<collection>/v<timestamp>/  → embeddings.npy, sq_norms.npy, table.sqlite
+#                                          (+ codes_int8.npy, int8_scale.npy, codes_bin.npy cho SNAPSHOT_QUANT)
+import os, json, time, shutil, sqlite3, threading, hashlib
+try:
+    import fcntl
+except ImportError:  # Windows: không khoá, refresh_stale vẫn chạy được
+    fcntl = None
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config import SNAPSHOT_DIR, SNAPSHOT_QUANT, QUANT_RESCORE_FACTOR, QUANT_HAMMING_FACTOR
+from db.quantization import QuantizedCodes
+from logics.skills import SKILL_KEY_PREFIX
+
+_FETCH_CHUNK = 500
+
+
+def _collection_dir(collection_name: str, root: str = None) -> str:
+    return os.path.join(root or SNAPSHOT_DIR, collection_name)
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime_ns / 1e9
+    except FileNotFoundError:
+        return 0.0
+
+
+def mark_dirty(collection_name: str, root: str = None):
+    """Gọi sau mỗi lần ghi collection (chỉ khi đã có snapshot) → reader biết snapshot không còn mới."""
+    d = _collection_dir(collection_name, root)
+    if os.path.isdir(d):
+        with open(os.path.join(d, "DIRTY"), "w") as f:
+            f.write(str(time.time()))
+
+
+def _meta_hash(meta: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(meta, sort_keys=True, ensure_ascii=False).encode("utf8")).hexdigest()
+
+
+def _skill_keys(meta: Dict[str, Any]) -> str:
+    keys = sorted(k for k, v in meta.items() if k.startswith(SKILL_KEY_PREFIX) and v is True)
+    return "|" + "|".join(keys) + "|" if keys else ""
+
+
+# =======================================================
+# 🔎 `where` của Chroma → SQL (chỉ phần build_where sinh ra: sk_* = True, years so sánh)
+# =======================================================
+_OPS = {"$gte": ">=", "$lte": "<=", "$gt": ">", "$lt": "<", "$eq": "="}
+
+
+def where_to_sql(where: Optional[Dict[str, Any]]) -> Optional[Tuple[str, list]]:
+    """("điều kiện SQL", params) hoặc None nếu where có toán tử không hỗ trợ (→ caller fallback Chroma)."""
+    if not where:
+        return "1", []
+    conds = where["$and"] if list(where) == ["$and"] else [where]
+    sql, params = [], []
+    for c in conds:
+        if not isinstance(c, dict) or len(c) != 1:
+            return None
+        (key, val), = c.items()
+        if key.startswith(SKILL_KEY_PREFIX) and val is True:
+            sql.append("instr(skill_keys, ?) > 0")
+            params.append(f"|{key}|")
+        elif key == "years" and isinstance(val, dict) and len(val) == 1 and next(iter(val)) in _OPS:
+            op, v = next(iter(val.items()))
+            sql.append(f"years {_OPS[op]} ?")
+            params.append(v)
+        else:
+            return None
+    return " AND ".join(sql) or "1", params
+
+
+# =======================================================
+# 📖 Reader
+# =======================================================
+class EmbeddingSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.sq_norms = np.load(os.path.join(path, "sq_norms.npy"), mmap_mode="r")
+        self.codes = QuantizedCodes.load(path)  # None với snapshot tạo trước khi có mã nén
+        with open(os.path.join(path, "manifest.json"), encoding="utf8") as f:
+            self.manifest = json.load(f)
+        self._conn = sqlite3.connect(f"file:{os.path.join(path, 'table.sqlite')}?mode=ro", uri=True,
+                                     check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def close(self):
+        self._conn.close()
+
+    def rows(self, row_ids: List[int]) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        """row → (id, document, metadata)."""
+        out = {}
+        with self._lock:
+            for i in range(0, len(row_ids), _FETCH_CHUNK):
+                chunk = row_ids[i:i + _FETCH_CHUNK]
+                q = f"SELECT row, id, document, metadata FROM docs WHERE row IN ({','.join('?' * len(chunk))})"
+                for row, doc_id, doc, meta in self._conn.execute(q, chunk):
+                    out[row] = (doc_id, doc, json.loads(meta or "{}"))
+        return out
+
+    def all_rows(self) -> Dict[str, Tuple[int, str, str]]:
+        """id → (row, content_hash, meta_hash), cho refresh incremental."""
+        with self._lock:
+            return {d: (r, h, mh) for r, d, h, mh in
+                    self._conn.execute("SELECT row, id, content_hash, meta_hash FROM docs")}
+
+    def search(self, query_vec, top_k: int, where: Optional[Dict[str, Any]] = None, quant: str = None,
+               ids: Optional[List[str]] = None):
+        """
+        Search L2² (cùng metric mặc định của Chroma). Trả về list (id, document, metadata, distance)
+        hoặc None nếu `where` không dịch được sang SQL. `ids`: chỉ quét các document này (AND với `where`).
+        quant ("int8" / "binary", mặc định SNAPSHOT_QUANT): quét mã nén → shortlist → chấm lại float32;
+        "none" hoặc snapshot chưa có mã nén → quét float32 chính xác.
+        """
+        cond = where_to_sql(where)
+        if cond is None:
+            return None
+        q = np.asarray(query_vec, dtype=np.float32)
+        if where or ids is not None:
+            sql, params = cond
+            if ids is not None:
+                ids = list(ids)
+                sql, params = f"({sql}) AND id IN ({','.join('?' * len(ids))})", [*params, *ids]
+            with self._lock:
+                rows = np.fromiter((r for (r,) in self._conn.execute(f"SELECT row FROM docs WHERE {sql}", params)),
+                                   dtype=np.int64)
+            rows.sort()  # đọc mmap theo thứ tự tăng dần
+        else:
+            rows = None
+        quant = quant or SNAPSHOT_QUANT
+        if quant != "none" and self.codes is not None:
+            if rows is not None and not len(rows):
+                return []
+            picked, dists = self.codes.search(self.embeddings, self.sq_norms, q, top_k, quant,
+                                              QUANT_RESCORE_FACTOR, rows, QUANT_HAMMING_FACTOR)
+            info = self.rows(picked.tolist())
+            return [(*info[r], float(d)) for r, d in zip(picked.tolist(), dists.tolist()) if r in info]
+
+        if rows is not None:
+            emb, norms = self.embeddings[rows], self.sq_norms[rows]
+        else:
+            emb, norms = self.embeddings, self.sq_norms
+        if not len(emb):
+            return []
+        dist = norms - 2 * (emb @ q) + float(q @ q)
+        k = min(top_k, len(dist))
+        part = np.argpartition(dist, k - 1)[:k]
+        part = part[np.lexsort((part, dist[part]))]
+        picked = (rows[part] if rows is not None else part).tolist()
+        info = self.rows(picked)
+        return [(*info[r], max(float(dist[p]), 0.0)) for r, p in zip(picked, part.tolist()) if r in info]
+
+
+_open: Dict[str, Tuple[str, EmbeddingSnapshot]] = {}
+_open_lock = threading.Lock()
+
+
+def get_snapshot(collection_name: str, root: str = None) -> Optional[EmbeddingSnapshot]:
+    """Snapshot hiện tại của collection nếu có và còn mới (không có DIRTY mới hơn CURRENT), ngược lại None."""
+    d = _collection_dir(collection_name, root)
+    current = os.path.join(d, "CURRENT")
+    cur_mtime = _mtime(current)
+    if not cur_mtime or _mtime(os.path.join(d, "DIRTY")) > cur_mtime:
+        return None
+    with open(current, encoding="utf8") as f:
+        version = f.read().strip()
+    path = os.path.join(d, version)
+    with _open_lock:
+        cached = _open.get(d)
+        if cached and cached[0] == path:
+            return cached[1]
+        try:
+            snap = EmbeddingSnapshot(path)
+        except (FileNotFoundError, sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Snapshot '{collection_name}' unreadable ({e}), falling back to Chroma.")
+            return None
+        _open[d] = (path, snap)  # bản cũ không close: có thể còn thread đang đọc; GC dọn khi hết tham chiếu
+        return snap
+
+
+# =======================================================
+# 🏗️ Build / refresh incremental
+# =======================================================
+def refresh_snapshot(collection_name: str, root: str = None, keep_versions: int = 2) -> Dict[str, int]:
+    """
+    Tạo version snapshot mới từ Chroma. Document có content_hash không đổi → copy vector từ snapshot cũ,
+    chỉ document mới/đổi mới đọc embedding từ Chroma. Không có thay đổi → giữ nguyên version hiện tại.
+    """
+    from db.LlamaIndexAdapter import iter_collection, get_docs
+    d = _collection_dir(collection_name, root)
+    os.makedirs(d, exist_ok=True)
+    # mốc trước khi đọc Chroma: ghi xảy ra trong lúc build sẽ làm DIRTY mới hơn → snapshot này bị coi là cũ
+    started = time.time()
+    mark_dirty(collection_name, root)
+    dirty_mark = _mtime(os.path.join(d, "DIRTY"))
+
+    ids, metas = [], []
+    for res in iter_collection(collection_name, ("metadatas",)):
+        ids.extend(res["ids"])
+        metas.extend(m or {} for m in (res.get("metadatas") or [{}] * len(res["ids"])))
+
+    old = get_snapshot_any(collection_name, root)
+    old_rows = old.all_rows() if old else {}
+    reuse = [(i, old_rows[doc_id][0]) for i, (doc_id, m) in enumerate(zip(ids, metas))
+             if doc_id in old_rows and m.get("content_hash") and old_rows[doc_id][1] == m.get("content_hash")]
+    stats = {"total": len(ids), "reused": len(reuse), "fetched": len(ids) - len(reuse)}
+    if old and stats["fetched"] == 0 and len(old_rows) == len(ids) and \
+            all(old_rows[doc_id][2] == _meta_hash(m) for doc_id, m in zip(ids, metas)):
+        old.close()
+        _write_current(d, os.path.basename(old.path))  # chạm CURRENT → mới hơn DIRTY
+        if _mtime(os.path.join(d, "DIRTY")) > dirty_mark:
+            mark_dirty(collection_name, root)  # có ghi trong lúc đọc Chroma → vẫn coi là cũ
+        print(f"⏭️ Snapshot '{collection_name}' unchanged ({len(ids)} docs)")
+        return stats
+
+    reused_src = dict(reuse)  # vị trí trong ids → row trong snapshot cũ
+    fetched: Dict[str, Tuple[Any, str]] = {}
+    fetch_ids = [doc_id for i, doc_id in enumerate(ids) if i not in reused_src]
+    for k in range(0, len(fetch_ids), _FETCH_CHUNK):
+        res = get_docs(collection_name, fetch_ids[k:k + _FETCH_CHUNK], ("embeddings", "documents"))
+        for doc_id, vec, doc in zip(res["ids"], res["embeddings"], res["documents"]):
+            fetched[doc_id] = (vec, doc)
+    # document bị xoá giữa lúc đọc (không lấy được embedding) → bỏ khỏi snapshot
+    order = [i for i in range(len(ids)) if i in reused_src or ids[i] in fetched]
+    stats["total"] = len(order)
+
+    dim = old.embeddings.shape[1] if old else (len(next(iter(fetched.values()))[0]) if fetched else 0)
+    version = f"v{int(started * 1000)}"
+    path = os.path.join(d, version)
+    os.makedirs(path)
+    emb = np.lib.format.open_memmap(os.path.join(path, "embeddings.npy"), mode="w+", dtype=np.float32,
+                                    shape=(len(order), dim))
+    old_docs = old.rows(list(reused_src.values())) if reuse else {}
+    table, copy_dst, copy_src = [], [], []
+    for row, i in enumerate(order):
+        doc_id, meta = ids[i], metas[i]
+        if i in reused_src:
+            copy_dst.append(row)
+            copy_src.append(reused_src[i])
+            doc = old_docs.get(reused_src[i], ("", "", {}))[1]
+        else:
+            vec, doc = fetched[doc_id]
+            emb[row] = np.asarray(vec, dtype=np.float32)
+        table.append((row, doc_id, meta.get("content_hash"), _meta_hash(meta), doc or "", json.dumps(meta, ensure_ascii=False),
+                      float(meta.get("years") or 0.0), _skill_keys(meta)))
+    for k in range(0, len(copy_dst), 8192):  # copy theo khối, không nạp cả ma trận cũ vào RAM
+        emb[copy_dst[k:k + 8192]] = old.embeddings[copy_src[k:k + 8192]]
+    emb.flush()
+
+    conn = sqlite3.connect(os.path.join(path, "table.sqlite"))
+    conn.execute("CREATE TABLE docs (row INTEGER PRIMARY KEY, id TEXT UNIQUE, content_hash TEXT, "
+                 "meta_hash TEXT, document TEXT, metadata TEXT, years REAL, skill_keys TEXT)")
+    conn.executemany("INSERT INTO docs VALUES (?,?,?,?,?,?,?,?)", table)
+    conn.execute("CREATE INDEX idx_years ON docs(years)")
+    conn.commit()
+    conn.close()
+
+    sq = np.empty(len(order), dtype=np.float32)
+    for k in range(0, len(order), 8192):
+        block = np.asarray(emb[k:k + 8192])
+        sq[k:k + len(block)] = np.einsum("ij,ij->i", block, block)
+    np.save(os.path.join(path, "sq_norms.npy"), sq)
+    if len(order):
+        QuantizedCodes.build(emb).save(path)
+    del emb
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf8") as f:
+        json.dump({"collection": collection_name, "count": len(order), "dim": dim, "created": started, **stats}, f)
+
+    if old:
+        old.close()
+    _write_current(d, version)
+    if _mtime(os.path.join(d, "DIRTY")) > dirty_mark:
+        mark_dirty(collection_name, root)  # có ghi trong lúc build → snapshot mới vẫn bị coi là cũ
+    _prune_versions(d, keep_versions)
+    print(f"✅ Snapshot '{collection_name}' {version}: {stats['total']} docs "
+          f"({stats['reused']} reused, {stats['fetched']} fetched from Chroma)")
+    return stats
+
+
+def get_snapshot_any(collection_name: str, root: str = None) -> Optional[EmbeddingSnapshot]:
+    """Snapshot hiện tại kể cả khi đã cũ (dùng làm nguồn copy khi refresh)."""
+    d = _collection_dir(collection_name, root)
+    try:
+        with open(os.path.join(d, "CURRENT"), encoding="utf8") as f:
+            return EmbeddingSnapshot(os.path.join(d, f.read().strip()))
+    except (FileNotFoundError, sqlite3.Error, ValueError):
+        return None
+
+
+def _write_current(d: str, version: str):
+    tmp = os.path.join(d, "CURRENT.tmp")
+    with open(tmp, "w", encoding="utf8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(d, "CURRENT"))
+
+
+def _prune_versions(d: str, keep: int):
+    # giữ version hiện tại + (keep-1) bản trước cho reader đang mmap bản cũ
+    versions = sorted((v for v in os.listdir(d) if v.startswith("v")), key=lambda v: int(v[1:]))
+    for v in versions[:-keep]:
+        shutil.rmtree(os.path.join(d, v), ignore_errors=True)
+
+
+def refresh_existing(collection_names=("cv_collection", "jd_collection"), root: str = None):
+    """Refresh các snapshot đã được tạo (gọi cuối mỗi lần ingest); collection chưa có snapshot → bỏ qua."""
+    for name in collection_names:
+        if os.path.exists(os.path.join(_collection_dir(name, root), "CURRENT")):
+            try:
+                refresh_snapshot(name, root)
+            except Exception as e:
+                print(f"❌ Snapshot refresh failed for '{name}': {e}")
+
+
+def is_stale(collection_name: str, root: str = None) -> bool:
+    """Đã có snapshot nhưng collection bị ghi sau lần refresh cuối."""
+    d = _collection_dir(collection_name, root)
+    cur_mtime = _mtime(os.path.join(d, "CURRENT"))
+    return bool(cur_mtime) and _mtime(os.path.join(d, "DIRTY")) > cur_mtime
+
+
+def refresh_stale(collection_names=("cv_collection", "jd_collection"), root: str = None) -> int:
+    """
+    Refresh snapshot đã cũ (vd. sau #cv intake của bot). Nhiều worker cùng rảnh → chỉ process giữ được
+    file lock REFRESH.lock build, các process khác bỏ qua. Trả về số snapshot đã refresh.
+    """
+    done = 0
+    for name in collection_names:
+        if not is_stale(name, root):
+            continue
+        lock_path = os.path.join(_collection_dir(name, root), "REFRESH.lock")
+        with open(lock_path, "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # process khác đang refresh
+            try:
+                if is_stale(name, root):
+                    refresh_snapshot(name, root)
+                    done += 1
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    return done
+
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    import sys
+    for name in sys.argv[1:] or ["cv_collection", "jd_collection"]:
+        refresh_snapshot(name)
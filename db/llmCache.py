@@ -0,0 +1,180 @@
+# llmCache.py
+# Cache bền vững (SQLite) cho các call Gemini: key = sha256(model, prompt version, input).
+# Dùng chung được giữa nhiều process (WAL + busy timeout), có TTL, LRU theo tổng dung lượng và đếm hit/miss.
+import sqlite3, hashlib, json, os, time, threading
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES
+
+_local = threading.local()
+
+
+# Internal helper
+def _conn() -> sqlite3.Connection:
+    # 1 connection / thread / process (sqlite3 không share được qua thread hay fork)
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+    conn = sqlite3.connect(LLM_CACHE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+        " created REAL NOT NULL, accessed REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed)")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    # Tổng size giữ sẵn trong 1 dòng, cập nhật cùng transaction với mọi ghi/xoá trên cache → không phải SUM cả bảng.
+    # File cache cũ (chưa có meta) được khởi tạo từ SUM đúng 1 lần.
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO meta(id, bytes) SELECT 1, COALESCE(SUM(size), 0) FROM cache")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _bump(conn: sqlite3.Connection, name: str, n: int = 1):
+    conn.execute(
+        "INSERT INTO stats(name, value) VALUES(?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+        (name, n, n),
+    )
+
+
+@contextmanager
+def _tx(conn: sqlite3.Connection):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _add_bytes(conn: sqlite3.Connection, delta: int):
+    if delta:
+        conn.execute("UPDATE meta SET bytes = bytes + ? WHERE id = 1", (delta,))
+
+
+def _total_bytes(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT bytes FROM meta WHERE id = 1").fetchone()[0]
+
+
+def _evict(conn: sqlite3.Connection, max_bytes: int):
+    """
+    Xoá entry ít được dùng gần đây nhất cho tới khi tổng size <= max_bytes.
+    Tổng đọc từ meta (O(1)); chỉ khi vượt mới đi theo idx_cache_accessed từ cũ nhất và dừng ngay khi đủ dung lượng
+    (không sort cả bảng), rồi xoá đúng số entry đó bằng 1 câu DELETE. Gọi trong transaction của cache_set.
+    """
+    total = _total_bytes(conn)
+    if total <= max_bytes:
+        return
+    excess, freed, n = total - max_bytes, 0, 0
+    for (size,) in conn.execute("SELECT size FROM cache ORDER BY accessed ASC"):
+        n += 1
+        freed += size
+        if freed >= excess:
+            break
+    conn.execute(
+        "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed ASC LIMIT ?)", (n,)
+    )
+    _add_bytes(conn, -freed)
+    _bump(conn, "evictions", n)
+
+
+# =======================================================
+# 🧠 Public API
+# =======================================================
+
+def make_key(model: str, prompt_version: str, *inputs: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, prompt_version, *inputs):
+        h.update(str(part).encode("utf8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def cache_get(key: str, ttl: Optional[float] = None) -> Optional[Any]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    ttl = LLM_CACHE_TTL if ttl is None else ttl
+    try:
+        conn = _conn()
+        row = conn.execute("SELECT value, created, size FROM cache WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (ttl > 0 and now - row[1] > ttl):
+            if row is not None:
+                with _tx(conn):
+                    # created khớp → chưa có process khác ghi đè entry này giữa SELECT và DELETE
+                    if conn.execute("DELETE FROM cache WHERE key = ? AND created = ?", (key, row[1])).rowcount:
+                        _add_bytes(conn, -row[2])
+            _bump(conn, "misses")
+            return None
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        _bump(conn, "hits")
+        return json.loads(row[0])
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache read failed: {e}")
+        return None
+
+
+def cache_set(key: str, value: Any, max_bytes: Optional[int] = None):
+    if not LLM_CACHE_ENABLED:
+        return
+    payload = json.dumps(value, ensure_ascii=False)
+    size = len(payload.encode("utf8"))
+    now = time.time()
+    try:
+        conn = _conn()
+        with _tx(conn):
+            old = conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache(key, value, size, created, accessed) VALUES(?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            _add_bytes(conn, size - (old[0] if old else 0))
+            _evict(conn, LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes)
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache write failed: {e}")
+
+
+def cached_call(
+    model: str,
+    prompt_version: str,
+    inputs: tuple,
+    compute: Callable[[], Any],
+    should_cache: Callable[[Any], bool] = lambda v: True,
+) -> Any:
+    """Trả kết quả từ cache nếu có, ngược lại gọi compute() và lưu lại (nếu should_cache)."""
+    key = make_key(model, prompt_version, *inputs)
+    hit = cache_get(key)
+    if hit is not None:
+        return hit
+    value = compute()
+    if should_cache(value):
+        cache_set(key, value)
+    return value
+
+
+def cache_stats() -> dict:
+    conn = _conn()
+    stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+    entries = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    return {
+        "hits": stats.get("hits", 0),
+        "misses": stats.get("misses", 0),
+        "evictions": stats.get("evictions", 0),
+        "entries": entries,
+        "bytes": _total_bytes(conn),
+    }
+
+
+# ------------------ Test ------------------
+if __name__ == "__main__":
+    k = make_key("gemini-2.5-flash", "demo-v1", "hello")
+    print("get (cold):", cache_get(k))
+    cache_set(k, {"score": 80})
+    print("get (warm):", cache_get(k))
+    for i in range(50):
+        cache_set(make_key("m", "v", str(i)), {"blob": "x" * 1000}, max_bytes=20_000)
+    print("stats:", cache_stats())
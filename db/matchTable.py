@@ -0,0 +1,202 @@
+# matchTable.py
+# Bảng match đã tính sẵn (SQLite): mỗi JD → top-N CV kèm kết quả evaluate_match.
+# Adapter ghi lại CV/JD vừa upsert/xoá vào `pending`; logics/matchMaterializer.py xử lý incremental
+# (CV mới chỉ chấm với các JD đã có, JD mới chỉ chạy 1 lần retrieval + evaluate).
+import sqlite3, hashlib, json, os, time, threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from config import MATCH_TABLE_ENABLED, MATCH_TABLE_PATH
+
+_local = threading.local()
+
+# collection → loại document trong bảng pending
+_KINDS = {"cv_collection": "cv", "jd_collection": "jd"}
+
+
+# Internal helper
+def _conn() -> sqlite3.Connection:
+    # 1 connection / thread / process (sqlite3 không share được qua thread hay fork)
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+    conn = sqlite3.connect(MATCH_TABLE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jds ("
+        " jd_id TEXT PRIMARY KEY, norm_key TEXT NOT NULL, jd_text TEXT NOT NULL, jd_json TEXT NOT NULL,"
+        " vector BLOB, updated REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jds_key ON jds(norm_key)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS matches ("
+        " jd_id TEXT NOT NULL, cv_id TEXT NOT NULL, target TEXT NOT NULL, similarity REAL NOT NULL,"
+        " score REAL NOT NULL, evaluation TEXT NOT NULL, updated REAL NOT NULL, PRIMARY KEY (jd_id, cv_id))"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_cv ON matches(cv_id)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pending ("
+        " kind TEXT NOT NULL, doc_id TEXT NOT NULL, op TEXT NOT NULL, queued REAL NOT NULL, PRIMARY KEY (kind, doc_id))"
+    )
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _tx(fn):
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        out = fn(conn)
+        conn.execute("COMMIT")
+        return out
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _result(row) -> Dict[str, Any]:
+    cv_id, target, similarity, evaluation = row
+    return {"id": cv_id, "target": target, "similarity": similarity, "evaluation": json.loads(evaluation)}
+
+
+# =======================================================
+# 🧠 Public API
+# =======================================================
+
+def norm_key(jd_text_norm: str) -> str:
+    """Key của JD đã chuẩn hoá (json_to_text_auto của JD đã parse): bỏ khác biệt hoa/thường và khoảng trắng."""
+    return hashlib.sha256(" ".join((jd_text_norm or "").lower().split()).encode("utf8")).hexdigest()
+
+
+def find_jd(key: str) -> Optional[str]:
+    row = _conn().execute("SELECT jd_id FROM jds WHERE norm_key = ? ORDER BY updated DESC LIMIT 1", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def get_jd(jd_id: str) -> Optional[Dict[str, Any]]:
+    row = _conn().execute("SELECT norm_key, jd_text, jd_json, vector FROM jds WHERE jd_id = ?", (jd_id,)).fetchone()
+    if row is None:
+        return None
+    return {"jd_id": jd_id, "norm_key": row[0], "jd_text": row[1], "jd_json": json.loads(row[2]),
+            "vector": np.frombuffer(row[3], dtype=np.float32) if row[3] else None}
+
+
+def iter_jds() -> Iterator[Dict[str, Any]]:
+    for jd_id, text, data, vec in _conn().execute("SELECT jd_id, jd_text, jd_json, vector FROM jds").fetchall():
+        yield {"jd_id": jd_id, "jd_text": text, "jd_json": json.loads(data),
+               "vector": np.frombuffer(vec, dtype=np.float32) if vec else None}
+
+
+def put_jd(jd_id: str, key: str, jd_text: str, jd_json: Dict[str, Any], vector) -> None:
+    blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+    _conn().execute(
+        "INSERT OR REPLACE INTO jds(jd_id, norm_key, jd_text, jd_json, vector, updated) VALUES(?, ?, ?, ?, ?, ?)",
+        (jd_id, key, jd_text, json.dumps(jd_json, ensure_ascii=False), blob, time.time()),
+    )
+
+
+def get_matches(jd_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Cùng format / thứ tự với find_best_candidates: LLM score ↓, similarity ↓."""
+    rows = _conn().execute(
+        "SELECT cv_id, target, similarity, evaluation FROM matches WHERE jd_id = ?"
+        " ORDER BY score DESC, similarity DESC, cv_id LIMIT ?",
+        (jd_id, limit),
+    ).fetchall()
+    return [_result(r) for r in rows]
+
+
+def replace_matches(jd_id: str, rows: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """rows = [(cv_id, result của rerank)], thay toàn bộ match của JD."""
+    now = time.time()
+
+    def _do(conn):
+        conn.execute("DELETE FROM matches WHERE jd_id = ?", (jd_id,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO matches VALUES(?, ?, ?, ?, ?, ?, ?)",
+            [(jd_id, cv_id, r["target"], r["similarity"], r["evaluation"].get("score", 0) or 0,
+              json.dumps(r["evaluation"], ensure_ascii=False), now) for cv_id, r in rows],
+        )
+    _tx(_do)
+
+
+def admission_floor(jd_id: str, top_n: int) -> Optional[float]:
+    """Similarity thấp nhất đang giữ nếu JD đã đủ top_n match, ngược lại None (CV nào cũng được chấm)."""
+    count, floor = _conn().execute(
+        "SELECT COUNT(*), MIN(similarity) FROM matches WHERE jd_id = ?", (jd_id,)
+    ).fetchone()
+    return floor if count >= top_n else None
+
+
+def add_match(jd_id: str, cv_id: str, result: Dict[str, Any], top_n: int) -> None:
+    """Thêm 1 match rồi cắt về top_n theo cùng thứ tự get_matches."""
+    def _do(conn):
+        conn.execute(
+            "INSERT OR REPLACE INTO matches VALUES(?, ?, ?, ?, ?, ?, ?)",
+            (jd_id, cv_id, result["target"], result["similarity"], result["evaluation"].get("score", 0) or 0,
+             json.dumps(result["evaluation"], ensure_ascii=False), time.time()),
+        )
+        conn.execute(
+            "DELETE FROM matches WHERE jd_id = ? AND cv_id NOT IN ("
+            " SELECT cv_id FROM matches WHERE jd_id = ? ORDER BY score DESC, similarity DESC, cv_id LIMIT ?)",
+            (jd_id, jd_id, top_n),
+        )
+    _tx(_do)
+
+
+def delete_cv(cv_id: str) -> int:
+    return _conn().execute("DELETE FROM matches WHERE cv_id = ?", (cv_id,)).rowcount
+
+
+def purge_adhoc(older_than: float) -> int:
+    """Xoá JD ad-hoc (bài đăng Mastodon, id "adhoc:") cập nhật trước older_than giây + match của chúng."""
+    cutoff = time.time() - older_than
+
+    def _do(conn):
+        stale = "SELECT jd_id FROM jds WHERE jd_id LIKE 'adhoc:%' AND updated < ?"
+        conn.execute(f"DELETE FROM matches WHERE jd_id IN ({stale})", (cutoff,))
+        return conn.execute("DELETE FROM jds WHERE jd_id LIKE 'adhoc:%' AND updated < ?", (cutoff,)).rowcount
+    return _tx(_do)
+
+
+def delete_jd(jd_id: str) -> None:
+    def _do(conn):
+        conn.execute("DELETE FROM matches WHERE jd_id = ?", (jd_id,))
+        conn.execute("DELETE FROM jds WHERE jd_id = ?", (jd_id,))
+    _tx(_do)
+
+
+# ------------------ Pending (ghi từ adapter) ------------------
+def mark_pending(collection_name: str, ids, op: str = "upsert") -> None:
+    """Ghi nhận document vừa upsert/xoá; rẻ (1 lệnh SQLite), việc tính lại để cho materializer."""
+    kind = _KINDS.get(collection_name)
+    ids = list(ids or [])
+    if not MATCH_TABLE_ENABLED or kind is None or not ids:
+        return
+    now = time.time()
+    try:
+        _conn().executemany(
+            "INSERT OR REPLACE INTO pending(kind, doc_id, op, queued) VALUES(?, ?, ?, ?)",
+            [(kind, i, op, now) for i in ids],
+        )
+    except sqlite3.Error as e:
+        print(f"⚠️ Match table pending write failed: {e}")
+
+
+def take_pending(limit: int = 50) -> List[Tuple[str, str, str]]:
+    """Lấy (và xoá) tối đa `limit` mục pending theo thứ tự cũ nhất trước: [(kind, doc_id, op)]. An toàn giữa nhiều worker."""
+    def _do(conn):
+        rows = conn.execute(
+            "SELECT kind, doc_id, op FROM pending ORDER BY queued, kind DESC LIMIT ?", (limit,)
+        ).fetchall()
+        conn.executemany("DELETE FROM pending WHERE kind = ? AND doc_id = ?", [(k, d) for k, d, _ in rows])
+        return rows
+    return _tx(_do)
+
+
+def table_stats() -> Dict[str, int]:
+    conn = _conn()
+    return {
+        "jds": conn.execute("SELECT COUNT(*) FROM jds").fetchone()[0],
+        "matches": conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0],
+        "pending": conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0],
+    }
@@ -0,0 +1,153 @@
+# quantization.py
+# Lưu vector dạng nén + tìm kiếm 2 tầng: quét nhanh trên mã nén (int8 hoặc bit dấu / Hamming) lấy shortlist,
+# rồi chấm lại chính xác bằng float32 chỉ cho shortlist (float32 nằm trên đĩa qua mmap, chỉ đọc vài hàng).
+# 384 chiều: float32 1536 byte/vector, int8 384 byte (4×), binary 48 byte (32×).
+import os
+from typing import Optional, Tuple
+import numpy as np
+
+_BLOCK = 65536  # số hàng mỗi khối khi quét → bộ nhớ tạm bị chặn
+
+# popcount: numpy >= 2.0 có np.bitwise_count, bản cũ dùng bảng tra 256 phần tử
+_POPCOUNT_LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_LUT[x.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+# =======================================================
+# 🔢 Mã hoá
+# =======================================================
+def fit_int8_scale(matrix: np.ndarray) -> np.ndarray:
+    """Scale đối xứng theo từng chiều: x ≈ q * scale, q ∈ [-127, 127]."""
+    amax = np.zeros(matrix.shape[1], dtype=np.float32)
+    for k in range(0, len(matrix), _BLOCK):
+        amax = np.maximum(amax, np.abs(np.asarray(matrix[k:k + _BLOCK], dtype=np.float32)).max(axis=0))
+    return np.where(amax > 0, amax / 127.0, 1.0).astype(np.float32)
+
+
+def encode_int8(matrix: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    out = np.empty(matrix.shape, dtype=np.int8)
+    for k in range(0, len(matrix), _BLOCK):
+        block = np.asarray(matrix[k:k + _BLOCK], dtype=np.float32) / scale
+        out[k:k + len(block)] = np.clip(np.rint(block), -127, 127).astype(np.int8)
+    return out
+
+
+def encode_binary(matrix: np.ndarray) -> np.ndarray:
+    """Bit dấu của từng chiều, pack 8 chiều / byte → (n, ceil(dim/8)) uint8."""
+    out = np.empty((len(matrix), (matrix.shape[1] + 7) // 8), dtype=np.uint8)
+    for k in range(0, len(matrix), _BLOCK):
+        out[k:k + _BLOCK] = np.packbits(np.asarray(matrix[k:k + _BLOCK]) > 0, axis=1)
+    return out
+
+
+def _as_words(codes: np.ndarray) -> np.ndarray:
+    # XOR/popcount theo uint64 nhanh hơn theo byte khi số byte chia hết cho 8 (384 chiều → 48 byte = 6 word)
+    return codes.view(np.uint64) if codes.shape[1] % 8 == 0 and codes.flags.c_contiguous else codes
+
+
+# =======================================================
+# 🔎 Quét trên mã nén
+# =======================================================
+def _topk_smallest(values: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(values))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    part = np.argpartition(values, k - 1)[:k]
+    return part[np.lexsort((part, values[part]))]
+
+
+def hamming_shortlist(codes: np.ndarray, query: np.ndarray, n: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Chỉ số (trong `codes`, hoặc trong `rows` nếu có) của n mã gần query nhất theo khoảng cách Hamming."""
+    qcode = _as_words(np.packbits(np.asarray(query) > 0)[None, :])
+    dist = np.empty(len(rows) if rows is not None else len(codes), dtype=np.int32)
+    for k in range(0, len(dist), _BLOCK):
+        block = codes[rows[k:k + _BLOCK]] if rows is not None else codes[k:k + _BLOCK]
+        dist[k:k + len(block)] = _popcount_rows(np.bitwise_xor(_as_words(np.ascontiguousarray(block)), qcode))
+    return _topk_smallest(dist, n)
+
+
+def int8_shortlist(
+    codes: np.ndarray, scale: np.ndarray, sq_norms: np.ndarray, query: np.ndarray, n: int,
+    rows: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Xấp xỉ L2² = |d|² - 2·(q_int8·(query*scale)) (bỏ |q|², hằng theo query), lấy n nhỏ nhất."""
+    qs = (np.asarray(query, dtype=np.float32) * scale).astype(np.float32)
+    total = len(rows) if rows is not None else len(codes)
+    dist = np.empty(total, dtype=np.float32)
+    for k in range(0, total, _BLOCK):
+        sel = rows[k:k + _BLOCK] if rows is not None else slice(k, k + _BLOCK)
+        block = np.asarray(codes[sel], dtype=np.float32)
+        dist[k:k + len(block)] = sq_norms[sel] - 2 * (block @ qs)
+    return _topk_smallest(dist, n)
+
+
+def rescore(
+    matrix: np.ndarray, sq_norms: np.ndarray, query: np.ndarray, candidates: np.ndarray, k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Chấm lại chính xác (float32) các hàng `candidates` (chỉ số tuyệt đối). Trả về (rows, L2²) k tốt nhất."""
+    if not len(candidates):
+        return candidates, np.zeros(0, dtype=np.float32)
+    cand = np.sort(candidates)  # đọc mmap theo thứ tự tăng dần
+    q = np.asarray(query, dtype=np.float32)
+    dist = np.asarray(sq_norms[cand], dtype=np.float32) - 2 * (np.asarray(matrix[cand], dtype=np.float32) @ q) + float(q @ q)
+    best = _topk_smallest(dist, k)
+    return cand[best], np.maximum(dist[best], 0.0)
+
+
+# =======================================================
+# 📦 Index nén (dùng trong snapshot)
+# =======================================================
+class QuantizedCodes:
+    """Mã int8 + scale và mã binary của 1 ma trận; lưu / mmap như embeddings.npy."""
+
+    FILES = ("codes_int8.npy", "int8_scale.npy", "codes_bin.npy")
+
+    def __init__(self, int8: np.ndarray, scale: np.ndarray, binary: np.ndarray):
+        self.int8, self.scale, self.binary = int8, scale, binary
+
+    @classmethod
+    def build(cls, matrix: np.ndarray) -> "QuantizedCodes":
+        scale = fit_int8_scale(matrix)
+        return cls(encode_int8(matrix, scale), scale, encode_binary(matrix))
+
+    def save(self, path: str):
+        for name, arr in zip(self.FILES, (self.int8, self.scale, self.binary)):
+            np.save(os.path.join(path, name), arr)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional["QuantizedCodes"]:
+        if not all(os.path.exists(os.path.join(path, f)) for f in cls.FILES):
+            return None
+        mode = "r" if mmap else None
+        return cls(*(np.load(os.path.join(path, f), mmap_mode=mode) for f in cls.FILES))
+
+    def nbytes(self) -> dict:
+        return {"int8": int(self.int8.nbytes + self.scale.nbytes), "binary": int(self.binary.nbytes)}
+
+    def search(
+        self, matrix: np.ndarray, sq_norms: np.ndarray, query: np.ndarray, k: int, mode: str = "binary",
+        rescore_factor: int = 10, rows: Optional[np.ndarray] = None, hamming_factor: int = 10,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        mode "int8": quét int8 → shortlist k*rescore_factor → float.
+        mode "binary": Hamming → k*rescore_factor*hamming_factor → int8 → k*rescore_factor → float.
+        rows: chỉ tìm trong các hàng này (vd. sau pre-filter `where`). Trả về (rows, L2²).
+        """
+        n = max(k, k * rescore_factor)
+        if mode == "binary":
+            short = hamming_shortlist(self.binary, query, n * hamming_factor, rows)
+            short = rows[short] if rows is not None else short
+            if len(short) > n:
+                short = np.sort(short)
+                short = short[int8_shortlist(self.int8, self.scale, sq_norms, query, n, short)]
+        elif mode == "int8":
+            short = int8_shortlist(self.int8, self.scale, sq_norms, query, n, rows)
+            short = rows[short] if rows is not None else short
+        else:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        return rescore(matrix, sq_norms, query, short, k)
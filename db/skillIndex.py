@@ -0,0 +1,244 @@
+# skillIndex.py
+# Inverted index in-process: skill/tech đã chuẩn hoá → posting list CV (mảng int32 đã sort).
+# Giao "Node.js AND SQL" trên hàng trăm nghìn CV chỉ tốn micro-giây.
+# Nguồn chung giữa các process là bảng SQLite doc → skills có seq tăng dần: mỗi upsert/xoá CV ghi O(k) dòng
+# (SQLite tự tuần tự hoá writer, không mất cập nhật của nhau), mỗi process chỉ áp các dòng seq mới vào index RAM.
+import os, json, sqlite3, threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from config import SKILL_INDEX_PATH
+from logics.skills import normalize_skills, parse_skills_meta, doc_skills
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+class SkillIndex:
+    def __init__(self):
+        self._doc_ids: List[Optional[str]] = []          # int → doc id (None = slot đã xoá)
+        self._doc_index: Dict[str, int] = {}              # doc id → int
+        self._doc_terms: Dict[int, List[str]] = {}        # int → skills (để xoá / cập nhật)
+        self._postings: Dict[str, np.ndarray] = {}
+        self._pending_add: Dict[str, set] = {}
+        self._pending_del: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self._seq = 0  # seq lớn nhất trong bảng SQLite đã áp vào index này
+
+    def __len__(self):
+        return len(self._doc_index)
+
+    # ------------------ Mutations ------------------
+    def add(self, doc_id: str, skills: Iterable[str]):
+        """Thêm / cập nhật skill của 1 document (upsert)."""
+        terms = normalize_skills(skills)
+        with self._lock:
+            if doc_id in self._doc_index:
+                self.remove(doc_id)
+            i = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._doc_index[doc_id] = i
+            self._doc_terms[i] = terms
+            for t in terms:
+                self._pending_add.setdefault(t, set()).add(i)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            i = self._doc_index.pop(doc_id, None)
+            if i is None:
+                return
+            self._doc_ids[i] = None
+            for t in self._doc_terms.pop(i, []):
+                if i in self._pending_add.get(t, ()):
+                    self._pending_add[t].discard(i)
+                else:
+                    self._pending_del.setdefault(t, set()).add(i)
+
+    def _posting(self, term: str) -> np.ndarray:
+        """Posting list đã gộp các thay đổi đang chờ (merge lười, chỉ cho term được hỏi)."""
+        arr = self._postings.get(term, _EMPTY)
+        adds, dels = self._pending_add.pop(term, None), self._pending_del.pop(term, None)
+        if adds:
+            arr = np.union1d(arr, np.fromiter(adds, dtype=np.int32, count=len(adds))).astype(np.int32)
+        if dels:
+            arr = arr[~np.isin(arr, np.fromiter(dels, dtype=np.int32, count=len(dels)))]
+        if adds or dels:
+            if arr.size:
+                self._postings[term] = arr
+            else:
+                self._postings.pop(term, None)
+        return arr
+
+    # ------------------ Queries ------------------
+    def intersect_ids(self, skills: Iterable[str]) -> np.ndarray:
+        """Int id của các document có TẤT CẢ skill (AND)."""
+        terms = normalize_skills(skills)
+        if not terms:
+            return _EMPTY
+        with self._lock:
+            lists = sorted((self._posting(t) for t in terms), key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            if not result.size:
+                break
+            # list ngắn tra nhị phân trong list dài: O(s log L)
+            pos = np.searchsorted(other, result)
+            pos[pos == other.size] = 0
+            result = result[other[pos] == result] if other.size else _EMPTY
+        return result
+
+    def intersect(self, skills: Iterable[str]) -> List[str]:
+        ids = self.intersect_ids(skills)
+        return [self._doc_ids[i] for i in ids.tolist()]
+
+    def union(self, skills: Iterable[str]) -> List[str]:
+        """Document có ÍT NHẤT 1 skill (OR)."""
+        with self._lock:
+            arrays = [self._posting(t) for t in normalize_skills(skills)]
+        if not arrays:
+            return []
+        ids = np.unique(np.concatenate(arrays))
+        return [self._doc_ids[i] for i in ids.tolist()]
+
+    def doc_frequency(self, skill: str) -> int:
+        terms = normalize_skills([skill])
+        if not terms:
+            return 0
+        with self._lock:
+            return int(self._posting(terms[0]).size)
+
+    @classmethod
+    def build_from_collection(cls, collection_name: str = "cv_collection", page_size: int = 1000) -> "SkillIndex":
+        idx = cls()
+        for doc_id, skills in _iter_collection_skills(collection_name, page_size):
+            idx.add(doc_id, skills)
+        print(f"✅ Built skill index from '{collection_name}': {len(idx)} docs")
+        return idx
+
+
+def _iter_collection_skills(collection_name: str, page_size: int = 1000) -> Iterator[Tuple[str, List[str]]]:
+    from db.LlamaIndexAdapter import iter_collection
+    for res in iter_collection(collection_name, ("metadatas",), page_size):
+        for doc_id, meta in zip(res["ids"], res.get("metadatas") or []):
+            meta = meta or {}
+            if "skills_norm" in meta:
+                yield doc_id, parse_skills_meta(meta["skills_norm"])
+            else:
+                try:
+                    yield doc_id, doc_skills(json.loads(meta.get("_raw_json") or "{}"))
+                except json.JSONDecodeError:
+                    continue
+
+
+# =======================================================
+# 🗄️ Bảng SQLite dùng chung giữa các process
+# =======================================================
+_local = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+    conn = sqlite3.connect(SKILL_INDEX_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # skills = "|a|b|" (định dạng skills_norm), NULL = document đã xoá
+    conn.execute("CREATE TABLE IF NOT EXISTS skill_docs (doc_id TEXT PRIMARY KEY, skills TEXT, seq INTEGER NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_skill_docs_seq ON skill_docs(seq)")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _write(rows: List[Tuple[str, Optional[str]]], replace: bool = True) -> None:
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM skill_docs").fetchone()[0]
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        conn.executemany(f"{verb} INTO skill_docs(doc_id, skills, seq) VALUES(?, ?, ?)",
+                         [(d, sk, seq) for d, sk in rows])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _ensure_built(conn: sqlite3.Connection) -> None:
+    # lần đầu (user_version = 0): nạp skill của cv_collection; INSERT OR IGNORE để không đè dòng
+    # mà process khác vừa ghi trong lúc đang đọc Chroma
+    if conn.execute("PRAGMA user_version").fetchone()[0]:
+        return
+    rows = [(d, _skills_meta(sk)) for d, sk in _iter_collection_skills("cv_collection")]
+    _write(rows, replace=False)
+    conn.execute("PRAGMA user_version = 1")
+    print(f"✅ Built skill index from 'cv_collection': {len(rows)} docs")
+
+
+def _skills_meta(skills: Iterable[str]) -> str:
+    terms = normalize_skills(skills)
+    return "|" + "|".join(terms) + "|" if terms else ""
+
+
+def _apply_log(idx: SkillIndex, conn: sqlite3.Connection) -> None:
+    for doc_id, skills, seq in conn.execute(
+            "SELECT doc_id, skills, seq FROM skill_docs WHERE seq > ? ORDER BY seq", (idx._seq,)):
+        if skills is None:
+            idx.remove(doc_id)
+        else:
+            idx.add(doc_id, parse_skills_meta(skills))
+        idx._seq = seq
+
+
+# =======================================================
+# 🧠 Shared instance (per process)
+# =======================================================
+_index: Optional[SkillIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_skill_index() -> SkillIndex:
+    """Index RAM của process, bắt kịp các thay đổi mà process khác đã ghi vào bảng SQLite."""
+    global _index
+    with _index_lock:
+        conn = _conn()
+        if _index is None:
+            _ensure_built(conn)
+            _index = SkillIndex()
+        latest = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM skill_docs").fetchone()[0]
+        if latest > _index._seq:
+            _apply_log(_index, conn)
+        return _index
+
+
+def sync_upserts(docs: Dict[str, Iterable[str]]):
+    """Gọi từ adapter sau khi upsert vào cv_collection: {doc_id: skills}."""
+    if docs:
+        _write([(doc_id, _skills_meta(skills)) for doc_id, skills in docs.items()])
+
+
+def sync_deletes(doc_ids: Iterable[str]):
+    doc_ids = list(doc_ids)
+    if doc_ids:
+        _write([(doc_id, None) for doc_id in doc_ids])
+
+
+# ------------------ Test ------------------
+if __name__ == "__main__":
+    import random, time
+    rnd = random.Random(0)
+    vocab = ["node.js", "sql", "python", "java", "react", "docker", "aws", "go", "kubernetes", "postgresql"] + \
+            [f"skill{i}" for i in range(500)]
+    idx = SkillIndex()
+    N = 200_000
+    t0 = time.perf_counter()
+    for i in range(N):
+        idx.add(f"cv{i}", rnd.sample(vocab[:10], 3) + rnd.sample(vocab[10:], 5))
+    print(f"build {N} docs: {time.perf_counter() - t0:.2f}s")
+    idx.intersect_ids(["node.js", "sql"])  # merge pending lần đầu
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        hits = idx.intersect_ids(["node.js", "sql"])
+    print(f"Node.js AND SQL → {hits.size} docs, {(time.perf_counter() - t0) * 1000:.1f} µs/query")
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        hits = idx.intersect_ids(["node.js", "sql", "skill7"])
+    print(f"Node.js AND SQL AND skill7 → {hits.size} docs, {(time.perf_counter() - t0) * 1000:.1f} µs/query")
@@ -0,0 +1,22 @@
+# sourceFiles.py
+# Định danh file nguồn (CV / JD) dùng chung cho adapter, batch parser và folder indexer.
+# Không import Chroma / LlamaIndex → gọi được từ process con của pool extract.
+import os, hashlib
+
+
+def source_path(path: str) -> str:
+    """Đường dẫn tương đối (dấu /) của file nguồn — dùng cho metadata "path" và id document."""
+    try:
+        rel = os.path.relpath(path)
+    except ValueError:  # Windows: khác ổ đĩa
+        rel = os.path.abspath(path)
+    return rel.replace(os.sep, "/")
+
+
+def hash_file(path: str) -> str:
+    """sha256 nội dung file (metadata "source_hash": file không đổi → bỏ qua parse / LLM / embedding)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -1,9 +1,12 @@
 # init_db.py
 import os
 import json
-from dataPreprocess.resumeParser import parse_resume
+from dataPreprocess.resumeParser import parse_resume, RESUME_EXTS
 from dataPreprocess.jobParser import parse_job_description
-from db.LlamaIndexAdapter import upsert_json_doc
+from db.LlamaIndexAdapter import (
+    upsert_json_doc, upsert_json_docs, hash_file, load_if_unchanged, source_path, backfill_structured_metadata,
+)
+from db.embeddingSnapshot import refresh_existing as refresh_snapshots
 
 # ===============================
 # 📁 Setup folders
@@ -39,19 +42,35 @@ print("✅ JD inserted into Chroma\n")
 # ===============================
 print("=== 🚀 Seeding CVs ===")
 
-cv_files = [f for f in os.listdir(CV_FOLDER) if f.lower().endswith((".pdf", ".png", ".jpg", ".jpeg"))]
+cv_files = [f for f in os.listdir(CV_FOLDER) if f.lower().endswith(RESUME_EXTS)]
 if not cv_files:
     print("⚠️ Không tìm thấy CV nào trong thư mục cv_folder/. Hãy đặt file .pdf vào đó trước khi chạy.")
 else:
+    cv_items = []
     for cv_file in cv_files:
         cv_path = os.path.join(CV_FOLDER, cv_file)
         try:
+            meta = {"type": "cv", "filename": cv_file, "path": source_path(cv_path), "source_hash": hash_file(cv_path)}
+            if load_if_unchanged("cv_collection", meta, meta["source_hash"]) is not None:
+                print(f"⏭️ CV không đổi, bỏ qua: {cv_file}")
+                continue
             cv_json = parse_resume(cv_path)
-            upsert_json_doc("cv_collection", cv_json, {"type": "cv", "filename": cv_file})
-            print(f"✅ CV added: {cv_file}")
+            cv_items.append((cv_json, meta))
+            print(f"✅ CV parsed: {cv_file}")
         except Exception as e:
             print(f"❌ Lỗi khi parse {cv_file}: {e}")
 
+    # embed + ghi Chroma theo batch, persist 1 lần
+    upsert_json_docs("cv_collection", cv_items)
+    print(f"✅ {len(cv_items)} CVs added")
+
+# document index từ bản cũ (chưa có years / sk_*) → bổ sung metadata lọc, idempotent
+for name in ("cv_collection", "jd_collection"):
+    backfill_structured_metadata(name)
+
+# snapshot mmap cho query worker (chỉ refresh collection đã có snapshot)
+refresh_snapshots()
+
 print("\n🎉 Database initialization complete!")
 print("Bạn có thể chạy:")
 print("  → find_best_candidates(JD_text)")
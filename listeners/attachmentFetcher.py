@@ -0,0 +1,86 @@
+# attachmentFetcher.py
+# Tải media attachment: stream xuống đĩa theo chunk qua 1 requests.Session dùng chung (connection pool),
+# có timeout, giới hạn dung lượng và kiểm tra content-type; các attachment của 1 status tải song song.
+import os, uuid, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from config import CV_MAX_BYTES, CV_DOWNLOAD_TIMEOUT, CV_DOWNLOAD_WORKERS, CV_DOWNLOAD_DIR
+
+ALLOWED_TYPES = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/tiff": ".tiff",
+}
+_CHUNK = 64 * 1024
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=CV_DOWNLOAD_WORKERS, pool_maxsize=CV_DOWNLOAD_WORKERS * 2)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
+
+
+def download_to_file(url: str, dest_dir: str = None, max_bytes: int = None, timeout: float = None) -> str:
+    """Stream 1 URL xuống file tạm; lỗi content-type / quá dung lượng → DownloadError (file dở bị xoá)."""
+    dest_dir = dest_dir or CV_DOWNLOAD_DIR
+    max_bytes = max_bytes or CV_MAX_BYTES
+    timeout = timeout or CV_DOWNLOAD_TIMEOUT
+    os.makedirs(dest_dir, exist_ok=True)
+
+    with get_session().get(url, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        ctype = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if ctype not in ALLOWED_TYPES:
+            raise DownloadError(f"Unsupported content-type '{ctype}' for {url}")
+        declared = int(r.headers.get("Content-Length") or 0)
+        if declared > max_bytes:
+            raise DownloadError(f"File too large ({declared} > {max_bytes} bytes): {url}")
+
+        path = os.path.join(dest_dir, f"{uuid.uuid4().hex}{ALLOWED_TYPES[ctype]}")
+        written = 0
+        try:
+            with open(path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=_CHUNK):
+                    written += len(chunk)
+                    if written > max_bytes:  # Content-Length có thể thiếu / sai
+                        raise DownloadError(f"File too large (> {max_bytes} bytes): {url}")
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+    return path
+
+
+def download_attachments(attachments: List[Dict], **kwargs) -> List[Dict]:
+    """
+    Tải song song các attachment của 1 status.
+    Trả về list {"attachment", "path" | "error"} theo đúng thứ tự attachment.
+    """
+    if not attachments:
+        return []
+
+    def _one(att):
+        try:
+            return {"attachment": att, "path": download_to_file(att.get("url") or att.get("remote_url"), **kwargs)}
+        except Exception as e:
+            return {"attachment": att, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(CV_DOWNLOAD_WORKERS, len(attachments))) as pool:
+        return list(pool.map(_one, attachments))
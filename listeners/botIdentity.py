@@ -0,0 +1,44 @@
+# botIdentity.py
+import time
+from config import BOT_IDENTITY_REFRESH
+
+
+class BotIdentityMixin:
+    """
+    Cache danh tính bot (id, acct): resolve 1 lần lúc khởi động, refresh định kỳ,
+    để listener lọc bài của chính bot mà không gọi mastodon.me() cho mỗi status.
+    Class dùng mixin phải có self.mastodon.
+    """
+
+    def _init_identity(self, me=None, identity_refresh=None):
+        self._identity_refresh = BOT_IDENTITY_REFRESH if identity_refresh is None else identity_refresh
+        self.bot_id = None
+        self.bot_acct = None
+        self._identity_at = 0.0
+        if me is not None:
+            self._set_identity(me)
+        else:
+            self.refresh_identity()
+
+    def _set_identity(self, me):
+        self.bot_id = str(me['id'])
+        self.bot_acct = me.get('acct') or me['username']
+        self._identity_at = time.monotonic()
+
+    def refresh_identity(self):
+        try:
+            self._set_identity(self.mastodon.me())
+        except Exception as e:
+            print(f"[ERR] Không thể xác thực bot: {e}")
+            # đã có danh tính cũ → giữ, thử lại ở chu kỳ refresh sau; chưa có → thử lại ở status kế tiếp
+            if self.bot_id is not None:
+                self._identity_at = time.monotonic()
+
+    def is_own_status(self, status) -> bool:
+        """True nếu status do bot đăng; chưa xác thực được bot → coi như True để bỏ qua an toàn."""
+        if self._identity_refresh and time.monotonic() - self._identity_at > self._identity_refresh:
+            self.refresh_identity()
+        if self.bot_id is None:
+            print("[ERR] Chưa xác thực được bot, bỏ qua status.")
+            return True
+        return str(status['account']['id']) == self.bot_id
@@ -0,0 +1,307 @@
+# dmDispatcher.py
+# Gửi DM ra ngoài qua 1 sender thread riêng:
+# - gộp nhiều dòng xếp hạng vào ít post nhất vừa giới hạn ký tự của instance
+# - token bucket đồng bộ theo header X-RateLimit-* thay vì sleep cố định
+# - round-robin giữa các recruiter để reply xen kẽ công bằng
+# - hàng gửi là outbox SQLite: job được complete khi DM đã nằm trong outbox, worker chết thì
+#   DM chưa gửi vẫn còn đó và dispatcher của process khác gửi tiếp sau khi hết lease
+import os, sqlite3, time, threading, traceback
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (DM_DEFAULT_CHAR_LIMIT, DM_RATE_LIMIT, DM_RATE_WINDOW, DM_MAX_RETRIES,
+                    DM_OUTBOX_PATH, DM_SEND_LEASE)
+
+IDLE_POLL = 1.0  # giây; bắt DM do process khác thêm / DM retry tới hạn
+
+
+# ------------------ Message packing ------------------
+def pack_messages(prefix: str, blocks: List[str], char_limit: int, sep: str = "\n\n") -> List[str]:
+    """Gộp các block text thành ít post nhất, mỗi post = prefix + ... <= char_limit."""
+    room = char_limit - len(prefix)
+    posts, current = [], ""
+    for block in blocks:
+        if len(block) > room:
+            block = block[:max(0, room - 1)] + "…"
+        candidate = f"{current}{sep}{block}" if current else block
+        if len(candidate) <= room:
+            current = candidate
+        else:
+            posts.append(prefix + current)
+            current = block
+    if current:
+        posts.append(prefix + current)
+    return posts
+
+
+def _parse_reset(value) -> Optional[float]:
+    """X-RateLimit-Reset (ISO8601 hoặc datetime) → epoch seconds."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+# ------------------ Rate limiter ------------------
+class RateLimiter:
+    """Token bucket; capacity/refill lấy theo cấu hình, được hiệu chỉnh bởi header rate-limit của server."""
+
+    def __init__(self, capacity: int = None, window: float = None):
+        self.capacity = capacity or DM_RATE_LIMIT
+        self.rate = self.capacity / (window or DM_RATE_WINDOW)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._refill(now)
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+
+    def update(self, limit=None, remaining=None, reset=None):
+        """Đồng bộ với header: remaining = 0 → chặn tới thời điểm reset của server."""
+        with self._lock:
+            now = time.monotonic()
+            if limit:
+                self.capacity = int(limit)
+            if remaining is not None:
+                self.tokens = min(float(remaining), self.capacity)
+                self._updated = now
+                reset_epoch = _parse_reset(reset)
+                if int(remaining) <= 0 and reset_epoch:
+                    self._blocked_until = now + max(0.0, reset_epoch - time.time())
+
+
+def mastodon_post_fn(mastodon) -> Callable[..., Dict]:
+    """post_fn mặc định: status_post qua Mastodon.py, trả về thông tin rate-limit mà client đã đọc từ header."""
+    def _info() -> Dict:
+        return {
+            "limit": getattr(mastodon, "ratelimit_limit", None),
+            "remaining": getattr(mastodon, "ratelimit_remaining", None),
+            "reset": getattr(mastodon, "ratelimit_reset", None),
+        }
+
+    def _post(text: str, visibility: str = "direct", in_reply_to_id=None) -> Dict:
+        try:
+            mastodon.status_post(text, visibility=visibility, in_reply_to_id=in_reply_to_id)
+        except Exception as e:
+            e.ratelimit = _info()  # 429 vẫn mang header reset → dispatcher chặn limiter tới lúc đó
+            raise
+        return _info()
+    return _post
+
+
+def instance_char_limit(mastodon) -> int:
+    try:
+        info = mastodon.instance()
+        return int(info["configuration"]["statuses"]["max_characters"])
+    except Exception:
+        return DM_DEFAULT_CHAR_LIMIT
+
+
+# ------------------ Dispatcher ------------------
+class DMDispatcher:
+    def __init__(self, post_fn: Callable[..., Optional[Dict]], char_limit: int = None, limiter: RateLimiter = None,
+                 outbox_path: str = None):
+        self.post_fn = post_fn
+        self.char_limit = char_limit or DM_DEFAULT_CHAR_LIMIT
+        self.limiter = limiter or RateLimiter()
+        self.outbox_path = outbox_path or DM_OUTBOX_PATH
+        self._local = threading.local()
+        self._served: Dict[str, int] = {}  # acct → lượt gửi gần nhất (round-robin)
+        self._turn = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.sent = 0
+        self.failed = 0
+        self._conn()  # tạo bảng trước khi sender thread chạy
+        self._thread = threading.Thread(target=self._run, name="dm-sender", daemon=True)
+        self._thread.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.outbox_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS dm_outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " acct TEXT NOT NULL, text TEXT NOT NULL,"
+            " visibility TEXT, in_reply_to_id TEXT,"
+            " status TEXT NOT NULL DEFAULT 'pending',"  # pending | sending | dead (gửi xong thì xoá)
+            " tries INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL, leased_until REAL,"
+            " last_error TEXT, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dm_outbox_acct ON dm_outbox(status, acct, id)")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    # --- producer side ---
+    def submit(self, acct: str, header: str, blocks: List[str], visibility: str = "direct", in_reply_to_id=None):
+        """Đóng gói header + blocks thành ít post nhất rồi ghi vào outbox của recruiter `acct`."""
+        posts = pack_messages(f"@{acct} ", [header] + list(blocks), self.char_limit)
+        now = time.time()
+        reply_to = None if in_reply_to_id is None else str(in_reply_to_id)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO dm_outbox(acct, text, visibility, in_reply_to_id, available_at, created)"
+                " VALUES(?, ?, ?, ?, ?, ?)",
+                [(acct, text, visibility, reply_to, now, now) for text in posts],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        with self._cond:
+            self._cond.notify()
+        return len(posts)
+
+    def pending(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM dm_outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+    def flush(self, timeout: float = None) -> bool:
+        """Chờ outbox gửi hết (dùng khi tắt worker / trong test)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.pending():
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(IDLE_POLL if left is None else min(left, IDLE_POLL))
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+    # --- sender side ---
+    def _claim(self) -> Tuple[Optional[dict], float]:
+        """
+        Round-robin trên outbox: mỗi recruiter chỉ xét post cũ nhất chưa gửi (giữ thứ tự các phần của
+        1 tin nhắn), chọn recruiter lâu chưa được gửi nhất trong số post đã tới hạn.
+        Trả về (item, 0) hoặc (None, số giây tới khi có post tới hạn).
+        """
+        conn = self._conn()
+        now = time.time()
+        heads = conn.execute(
+            "SELECT o.id, o.acct, o.text, o.visibility, o.in_reply_to_id, o.tries, o.status,"
+            "       o.available_at, o.leased_until"
+            " FROM dm_outbox o JOIN (SELECT acct, MIN(id) AS id FROM dm_outbox"
+            "                        WHERE status IN ('pending', 'sending') GROUP BY acct) h ON o.id = h.id"
+        ).fetchall()
+        ready, wake = [], IDLE_POLL
+        for row in heads:
+            due = row[7] if row[6] == "pending" else (row[8] or 0)
+            if due <= now:
+                ready.append(row)
+            else:
+                wake = min(wake, due - now)
+        ready.sort(key=lambda r: (self._served.get(r[1], -1), r[0]))
+        for row in ready:
+            # claim nguyên tử: process khác có thể vừa lấy cùng post
+            cur = conn.execute(
+                "UPDATE dm_outbox SET status = 'sending', leased_until = ?"
+                " WHERE id = ? AND ((status = 'pending' AND available_at <= ?)"
+                "                   OR (status = 'sending' AND leased_until <= ?))",
+                (now + DM_SEND_LEASE, row[0], now, now),
+            )
+            if cur.rowcount == 1:
+                self._turn += 1
+                self._served[row[1]] = self._turn
+                return {"id": row[0], "acct": row[1], "text": row[2], "visibility": row[3],
+                        "in_reply_to_id": row[4], "tries": row[5]}, 0.0
+        return None, wake
+
+    def _next(self):
+        with self._cond:
+            while not self._stopped:
+                item, wake = self._claim()
+                if item is not None:
+                    return item
+                self._cond.wait(wake)
+        return None
+
+    def _run(self):
+        while True:
+            try:
+                item = self._next()
+            except Exception as e:
+                print(f"❌ DM outbox lỗi: {e}")
+                traceback.print_exc()
+                time.sleep(IDLE_POLL)
+                continue
+            if item is None:
+                return
+            acct = item["acct"]
+            try:
+                wait = self.limiter.wait_time()
+                while wait > 0:
+                    time.sleep(min(wait, 1.0))
+                    wait = self.limiter.wait_time()
+                self.limiter.consume()
+                info = self.post_fn(item["text"], visibility=item["visibility"], in_reply_to_id=item["in_reply_to_id"])
+                if info:
+                    self.limiter.update(info.get("limit"), info.get("remaining"), info.get("reset"))
+                self._conn().execute("DELETE FROM dm_outbox WHERE id = ?", (item["id"],))
+                self.sent += 1
+            except Exception as e:
+                info = getattr(e, "ratelimit", None)
+                if info:
+                    self.limiter.update(info.get("limit"), info.get("remaining"), info.get("reset"))
+                tries = item["tries"] + 1
+                if tries < DM_MAX_RETRIES:
+                    # đặt lại vào outbox với mốc not-before; sender tiếp tục gửi cho recruiter khác
+                    print(f"⚠️ Gửi DM tới @{acct} lỗi ({e}), thử lại sau.")
+                    status, available_at = "pending", time.time() + min(30, 2 ** tries)
+                else:
+                    self.failed += 1
+                    print(f"❌ Bỏ DM tới @{acct} sau {tries} lần thử: {e}")
+                    traceback.print_exc()
+                    status, available_at = "dead", time.time()
+                self._conn().execute(
+                    "UPDATE dm_outbox SET status = ?, tries = ?, available_at = ?, leased_until = NULL,"
+                    " last_error = ? WHERE id = ?",
+                    (status, tries, available_at, str(e)[:1000], item["id"]),
+                )
+            finally:
+                with self._cond:
+                    self._cond.notify_all()
+
+
+_dispatcher: Optional[DMDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher(mastodon) -> DMDispatcher:
+    """1 dispatcher (1 sender thread) / worker process."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = DMDispatcher(mastodon_post_fn(mastodon), char_limit=instance_char_limit(mastodon))
+        return _dispatcher
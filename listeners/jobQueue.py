@@ -0,0 +1,130 @@
+# jobQueue.py
+# Hàng đợi bền vững (SQLite) giữa stream listener và worker process.
+# Listener chỉ enqueue (vài ms); worker claim job theo lease, lỗi thì retry với backoff, quá số lần → dead.
+import sqlite3, json, os, time, threading
+from typing import Any, Dict, Optional, Tuple
+from config import JOB_QUEUE_PATH, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS, JOB_RETRY_BACKOFF
+
+_local = threading.local()
+
+
+# Internal helper
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+    conn = sqlite3.connect(JOB_QUEUE_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " kind TEXT NOT NULL, payload TEXT NOT NULL,"
+        " dedupe_key TEXT UNIQUE,"
+        " status TEXT NOT NULL DEFAULT 'pending',"  # pending | running | done | dead
+        " attempts INTEGER NOT NULL DEFAULT 0,"
+        " available_at REAL NOT NULL, leased_until REAL,"
+        " last_error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, available_at)")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+# =======================================================
+# 🧠 Public API
+# =======================================================
+
+def enqueue(kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> bool:
+    """Thêm job. dedupe_key trùng (vd. status id khi stream reconnect) → bỏ qua, trả về False."""
+    now = time.time()
+    cur = _conn().execute(
+        "INSERT OR IGNORE INTO jobs(kind, payload, dedupe_key, available_at, created, updated)"
+        " VALUES(?, ?, ?, ?, ?, ?)",
+        (kind, json.dumps(payload, ensure_ascii=False), dedupe_key, now, now, now),
+    )
+    return cur.rowcount == 1
+
+
+def claim(lease_seconds: float = None, max_attempts: int = None) -> Optional[Tuple[int, str, Dict[str, Any], int]]:
+    """
+    Lấy 1 job sẵn sàng (pending tới hạn, hoặc running đã hết lease do worker chết).
+    Job hết lease mà đã dùng hết lượt (worker chết giữa chừng max_attempts lần) → dead, không claim lại.
+    Trả về (id, kind, payload, attempts) hoặc None nếu queue rỗng.
+    """
+    lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+    max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+    conn = _conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'dead', last_error = 'lease expired after ' || attempts || ' attempts', updated = ?"
+            " WHERE status = 'running' AND leased_until < ? AND attempts >= ?",
+            (now, now, max_attempts),
+        )
+        row = conn.execute(
+            "SELECT id, kind, payload, attempts FROM jobs"
+            " WHERE (status = 'pending' AND available_at <= ?)"
+            "    OR (status = 'running' AND leased_until < ? AND attempts < ?)"
+            " ORDER BY id LIMIT 1",
+            (now, now, max_attempts),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, leased_until = ?, updated = ? WHERE id = ?",
+            (now + lease_seconds, now, row[0]),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row[0], row[1], json.loads(row[2]), row[3] + 1
+
+
+def renew(job_id: int, lease_seconds: float = None) -> bool:
+    """Gia hạn lease cho job đang chạy (heartbeat của worker). False nếu job không còn 'running'."""
+    lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+    now = time.time()
+    cur = _conn().execute(
+        "UPDATE jobs SET leased_until = ?, updated = ? WHERE id = ? AND status = 'running'",
+        (now + lease_seconds, now, job_id),
+    )
+    return cur.rowcount == 1
+
+
+def complete(job_id: int) -> None:
+    _conn().execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (time.time(), job_id))
+
+
+def fail(job_id: int, error: str, max_attempts: int = None) -> str:
+    """Đánh dấu lỗi: còn lượt → pending lại sau backoff luỹ thừa, hết lượt → dead. Trả về status mới."""
+    max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+    conn = _conn()
+    row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    attempts = row[0] if row else max_attempts
+    now = time.time()
+    if attempts >= max_attempts:
+        status, available_at = "dead", now
+    else:
+        status, available_at = "pending", now + JOB_RETRY_BACKOFF * (2 ** (attempts - 1))
+    conn.execute(
+        "UPDATE jobs SET status = ?, available_at = ?, last_error = ?, updated = ? WHERE id = ?",
+        (status, available_at, str(error)[:1000], now, job_id),
+    )
+    return status
+
+
+def pending_count() -> int:
+    return _conn().execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+
+
+def queue_stats() -> Dict[str, int]:
+    return dict(_conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def purge_done(older_than: float = 7 * 24 * 3600) -> int:
+    cur = _conn().execute("DELETE FROM jobs WHERE status = 'done' AND updated < ?", (time.time() - older_than,))
+    return cur.rowcount
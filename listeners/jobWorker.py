@@ -0,0 +1,137 @@
+# jobWorker.py
+# Pool worker process tiêu thụ job queue (SQLite). Mỗi worker có Mastodon client riêng.
+import time, traceback, threading, multiprocessing
+from contextlib import contextmanager
+from typing import List
+from config import JOB_WORKERS, JOB_LEASE_SECONDS, MATCH_TABLE_ENABLED, SNAPSHOT_ENABLED, SNAPSHOT_IDLE_REFRESH
+from listeners.jobQueue import claim, complete, fail, renew
+
+POLL_INTERVAL = 0.5
+SUPERVISE_INTERVAL = 5.0
+
+
+def _handlers():
+    from listeners.postJDListener import handle_jd_job
+    from listeners.postCVListener import handle_cv_job
+    return {"jd": handle_jd_job, "cv": handle_cv_job}
+
+
+def _refresh_matches() -> int:
+    # rảnh việc → cập nhật bảng match cho CV/JD vừa upsert (từng mục 1 để job mới không phải chờ lâu)
+    if not MATCH_TABLE_ENABLED:
+        return 0
+    try:
+        from logics.matchMaterializer import refresh_pending
+        return refresh_pending(limit=1)
+    except Exception as e:
+        print(f"❌ Match table refresh failed: {e}")
+        traceback.print_exc()
+        return 0
+
+
+@contextmanager
+def _heartbeat(job_id: int, lease_seconds: float = None):
+    # gia hạn lease mỗi 1/3 lease trong lúc handler chạy → job dài (OCR nhiều trang, Gemini chậm)
+    # không bị worker khác claim lại khi worker này vẫn sống
+    lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                renew(job_id, lease_seconds)
+            except Exception as e:
+                print(f"⚠️ Lease renew failed for job {job_id}: {e}")
+
+    t = threading.Thread(target=beat, name=f"lease-{job_id}", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        t.join()
+
+
+_last_snapshot_check = 0.0
+
+
+def _refresh_snapshots() -> int:
+    # rảnh việc → refresh snapshot mmap đã bị #cv intake đánh dấu DIRTY (tối đa 1 lần / SNAPSHOT_IDLE_REFRESH giây)
+    global _last_snapshot_check
+    if not SNAPSHOT_ENABLED or time.monotonic() - _last_snapshot_check < SNAPSHOT_IDLE_REFRESH:
+        return 0
+    _last_snapshot_check = time.monotonic()
+    try:
+        from db.embeddingSnapshot import refresh_stale
+        return refresh_stale()
+    except Exception as e:
+        print(f"❌ Snapshot refresh failed: {e}")
+        traceback.print_exc()
+        return 0
+
+
+def worker_loop(worker_id: int, poll_interval: float = POLL_INTERVAL, mastodon=None, max_jobs: int = None):
+    """Vòng claim → handler → complete/fail. max_jobs: dừng sau n job (test / chạy 1 lượt), None = chạy mãi."""
+    if mastodon is None:
+        from listeners.mastodonClient import make_mastodon
+        mastodon = make_mastodon()
+    handlers = _handlers()
+    print(f"👷 Worker {worker_id} started")
+
+    handled = 0
+    while max_jobs is None or handled < max_jobs:
+        job = claim()
+        if job is None:
+            if not _refresh_matches() and not _refresh_snapshots():
+                time.sleep(poll_interval)
+            continue
+
+        job_id, kind, payload, attempt = job
+        handled += 1
+        handler = handlers.get(kind)
+        if handler is None:
+            fail(job_id, f"No handler for job kind '{kind}'", max_attempts=1)
+            continue
+
+        t0 = time.perf_counter()
+        try:
+            with _heartbeat(job_id):
+                handler(mastodon, payload, attempt)
+            complete(job_id)
+            print(f"✅ [worker {worker_id}] job {job_id} ({kind}) done in {time.perf_counter() - t0:.1f}s")
+        except Exception as e:
+            status = fail(job_id, repr(e))
+            print(f"❌ [worker {worker_id}] job {job_id} ({kind}) failed (attempt {attempt}) → {status}: {e}")
+            traceback.print_exc()
+
+
+def _spawn(i: int) -> multiprocessing.Process:
+    p = multiprocessing.Process(target=worker_loop, args=(i,), name=f"job-worker-{i}", daemon=True)
+    p.start()
+    return p
+
+
+def _supervise(procs: List[multiprocessing.Process], interval: float, stop: threading.Event) -> None:
+    # worker chết (OOM, segfault trong native lib...) → spawn lại cùng slot; job đang dở sẽ được
+    # claim lại khi hết lease
+    while not stop.wait(interval):
+        for i, p in enumerate(procs):
+            if not p.is_alive():
+                print(f"⚠️ Worker {i} exited (code {p.exitcode}) → restarting")
+                procs[i] = _spawn(i)
+
+
+def start_workers(n: int = None, supervise_interval: float = SUPERVISE_INTERVAL,
+                  stop: threading.Event = None) -> List[multiprocessing.Process]:
+    """Khởi động n worker + thread giám sát restart worker chết. List trả về được cập nhật tại chỗ."""
+    n = n or JOB_WORKERS
+    procs = [_spawn(i) for i in range(n)]
+    threading.Thread(target=_supervise, args=(procs, supervise_interval, stop or threading.Event()),
+                     name="job-supervisor", daemon=True).start()
+    return procs
+
+
+if __name__ == "__main__":
+    # chạy riêng pool worker (vd. trên máy khác với bot, dùng chung file queue)
+    start_workers()
+    threading.Event().wait()
@@ -0,0 +1,15 @@
+# mastodonClient.py
+from mastodon import Mastodon
+from config import MASTODON_CLIENT_KEY, MASTODON_CLIENT_SECRET, MASTODON_ACCESS_TOKEN, MASTODON_API_BASE_URL
+
+DEFAULT_API_BASE_URL = "https://mastodonuet.duckdns.org/"
+
+
+def make_mastodon() -> Mastodon:
+    """Tạo client Mastodon từ .env (mỗi process / worker tạo client riêng)."""
+    return Mastodon(
+        client_id=MASTODON_CLIENT_KEY,
+        client_secret=MASTODON_CLIENT_SECRET,
+        access_token=MASTODON_ACCESS_TOKEN,
+        api_base_url=MASTODON_API_BASE_URL or DEFAULT_API_BASE_URL,
+    )
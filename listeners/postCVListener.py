@@ -1,26 +1,86 @@
 from mastodon import StreamListener
-from logics.resumeParser import parse_resume
-from db.saveDB import save_to_db
-import requests, os, uuid, json
+import os
+from config import CV_HASHTAG
+from listeners.botIdentity import BotIdentityMixin
+from listeners.jobQueue import enqueue
+
+
+class postCVListener(BotIdentityMixin, StreamListener):
+    """
+    Nhận bài #cv: chỉ lọc + enqueue job "cv" (trả về ngay); worker tải attachment,
+    parse CV và index idempotent vào cv_collection (handle_cv_job).
+    """
+
+    def __init__(self, mastodon, listen_hashtag=CV_HASHTAG, me=None):
+        super().__init__()
+        self.mastodon = mastodon
+        self.LISTEN_HASHTAG = listen_hashtag
+        self._hashtag_lower = listen_hashtag.lower()
+        self._init_identity(me)
 
-class postCVListener(StreamListener):
     def on_update(self, status):
-        hashtags = [t["name"].lower() for t in status["tags"]]
-        if "cv" not in hashtags:
+        if not any(t['name'].lower() == self._hashtag_lower for t in status['tags']):
             return
+        if not status.get('media_attachments'):
+            return
+        if self.is_own_status(status):
+            return
+
+        owner = status['account']['acct']
+        print(f"📥 Bắt được bài #{self.LISTEN_HASHTAG} từ @{owner}")
+        payload = {
+            "status_id": status['id'],
+            "acct": owner,
+            "attachments": [
+                {"id": a['id'], "url": a.get('url'), "remote_url": a.get('remote_url')}
+                for a in status['media_attachments']
+            ],
+        }
+        enqueue("cv", payload, dedupe_key=f"cv:{status['id']}")
+
+
+# =======================================================
+# 🛠️ Job handler (chạy trong worker process)
+# =======================================================
+def handle_cv_job(mastodon, payload, attempt=1):
+    from dataPreprocess.resumeParser import parse_resume
+    from db.LlamaIndexAdapter import upsert_json_docs, hash_file
+    from listeners.attachmentFetcher import download_attachments
+    from listeners.dmDispatcher import get_dispatcher
+
+    owner = payload['acct']
+    downloads = download_attachments(payload['attachments'])
+
+    items, failed = [], []
+    try:
+        for d in downloads:
+            att = d['attachment']
+            if 'error' in d:
+                print(f"⚠️ Bỏ qua attachment {att['id']}: {d['error']}")
+                failed.append(att['id'])
+                continue
+            try:
+                parsed = parse_resume(d['path'])
+            except Exception as e:
+                print(f"❌ Lỗi parse attachment {att['id']}: {e}")
+                failed.append(att['id'])
+                continue
+            meta = {
+                "type": "cv",
+                "filename": f"mastodon_{payload['status_id']}_{att['id']}{os.path.splitext(d['path'])[1]}",
+                "external_id": f"mastodon:{payload['status_id']}:{att['id']}",
+                "uploader": owner,
+                "source_hash": hash_file(d['path']),
+            }
+            items.append((parsed, meta))
+    finally:
+        for d in downloads:
+            if d.get('path') and os.path.exists(d['path']):
+                os.remove(d['path'])
+
+    # idempotent: retry / status trùng không tạo vector trùng
+    upsert_json_docs("cv_collection", items)
+    print(f"✅ Lưu {len(items)} CV của @{owner}")
 
-        owner = status["account"]["acct"]
-        print(f"📥 Bắt được bài #cv từ @{owner}")
-
-        for attachment in status["media_attachments"]:
-            url = attachment["url"]
-            ext = os.path.splitext(url)[1]
-            tmp_path = f"/tmp/{uuid.uuid4().hex[:6]}{ext}"
-            r = requests.get(url)
-            with open(tmp_path, "wb") as f:
-                f.write(r.content)
-
-            parsed = parse_resume(tmp_path)
-            parsed["uploader"] = owner
-            save_to_db("cv", parsed)
-            print(f"✅ Lưu CV của @{owner}")
+    msg = f"✅ Đã nhận {len(items)} CV." + (f" {len(failed)} file không hợp lệ." if failed else "")
+    get_dispatcher(mastodon).submit(owner, msg, [], visibility='direct')
@@ -1,72 +1,105 @@
 from mastodon import StreamListener
-import re, time
-from logics.matchingLogic import find_best_candidates
+import re
+from config import JOB_MAX_ATTEMPTS, JOB_QUEUE_MAX_PENDING
+from listeners.botIdentity import BotIdentityMixin
+from listeners.jobQueue import enqueue, pending_count
+from listeners.dmDispatcher import get_dispatcher
 
-class RecruitmentListener(StreamListener):
-    def __init__(self, mastodon, listen_hashtag):
+
+class RecruitmentListener(BotIdentityMixin, StreamListener):
+    """
+    Chỉ lọc + enqueue status vào job queue rồi trả về ngay (vài ms),
+    việc parse / match / gửi DM do worker process xử lý (listeners/jobWorker.py).
+    Danh tính bot (id, acct) được resolve 1 lần lúc khởi động và refresh định kỳ,
+    không gọi mastodon.me() cho mỗi status.
+    """
+
+    def __init__(self, mastodon, listen_hashtag, me=None, identity_refresh=None):
         super().__init__()
         self.mastodon = mastodon
         self.LISTEN_HASHTAG = listen_hashtag
+        self._hashtag_lower = listen_hashtag.lower()
+        self._init_identity(me, identity_refresh)
 
     def on_update(self, status):
-        try:
-            my_username = self.mastodon.me()['username']
-            if status['account']['username'] == my_username:
-                return
-        except Exception as e:
-            print(f"[ERR] Không thể xác thực bot: {e}")
+        # 1) lọc local rẻ nhất trước: hashtag
+        if not any(tag['name'].lower() == self._hashtag_lower for tag in status['tags']):
             return
 
-        hashtags = [tag['name'].lower() for tag in status['tags']]
-        if self.LISTEN_HASHTAG.lower() not in hashtags:
+        # 2) bỏ qua bài của chính bot (so id đã cache, không gọi mạng)
+        if self.is_own_status(status):
             return
 
         print(f"🔥 Bài đăng mới từ @{status['account']['acct']}")
-        jd_text = re.sub(r'<.*?>', '', status['content']).strip()
-        jd_text = jd_text.replace(f"#{self.LISTEN_HASHTAG}", "").strip()
+        payload = {
+            "status_id": status['id'],
+            "content": status['content'],
+            "acct": status['account']['acct'],
+            "listen_hashtag": self.LISTEN_HASHTAG,
+        }
+
+        if pending_count() >= JOB_QUEUE_MAX_PENDING:
+            # backpressure: queue đầy → từ chối sớm thay vì để recruiter chờ vô hạn
+            print(f"⚠️ Job queue đầy ({JOB_QUEUE_MAX_PENDING}), từ chối bài {status['id']}")
+            try:
+                self.mastodon.status_post(
+                    f"@{payload['acct']} Hệ thống đang quá tải, vui lòng đăng lại sau ít phút.",
+                    in_reply_to_id=status['id']
+                )
+            except Exception as e:
+                print(f"[ERR] Không gửi được thông báo quá tải: {e}")
+            return
+
+        if enqueue("jd", payload, dedupe_key=f"jd:{status['id']}"):
+            print(f"   > Đã đưa vào hàng đợi: status {status['id']}")
+        else:
+            print(f"   > Bỏ qua status trùng (đã có trong hàng đợi): {status['id']}")
+
 
-        poster_account = status['account']
+# =======================================================
+# 🛠️ Job handler (chạy trong worker process)
+# =======================================================
+def handle_jd_job(mastodon, payload, attempt=1):
+    """
+    Parse + match JD rồi xếp kết quả vào DMDispatcher (gửi bất đồng bộ, theo rate-limit),
+    worker không phải chờ gửi xong từng DM.
+    """
+    from logics.matchingLogic import find_best_candidates  # import nặng, chỉ cần ở worker
 
-        self.mastodon.status_post(
-            f"@{poster_account['acct']} Đã nhận yêu cầu tuyển dụng. Vui lòng chờ kết quả trong DM!",
-            in_reply_to_id=status['id']
+    dispatcher = get_dispatcher(mastodon)
+    listen_hashtag = payload['listen_hashtag']
+    jd_text = re.sub(r'<.*?>', '', payload['content']).strip()
+    jd_text = jd_text.replace(f"#{listen_hashtag}", "").strip()
+    acct = payload['acct']
+
+    if attempt == 1:
+        dispatcher.submit(
+            acct, "Đã nhận yêu cầu tuyển dụng. Vui lòng chờ kết quả trong DM!", [],
+            visibility=None, in_reply_to_id=payload['status_id']
         )
 
-        try:
-            print(f"   > Đang xử lý JD: {jd_text[:80]}...")
-            final_ranking = find_best_candidates(jd_text)
+    try:
+        print(f"   > Đang xử lý JD: {jd_text[:80]}...")
+        final_ranking = find_best_candidates(jd_text, raise_errors=True)  # lỗi → raise để worker retry
 
-            if not final_ranking:
-                self.mastodon.status_post(
-                    f"@{poster_account['acct']} Không tìm thấy ứng viên phù hợp.",
-                    visibility='direct'
-                )
-                return
+        if not final_ranking:
+            dispatcher.submit(acct, "Không tìm thấy ứng viên phù hợp.", [])
+            return
 
-            self.mastodon.status_post(
-                f"@{poster_account['acct']} ✅ Dưới đây là bảng xếp hạng ứng viên:",
-                visibility='direct'
-            )
-            time.sleep(1)
-
-            for i, result in enumerate(final_ranking):
-                eval_data = result.get('detailed_evaluation', {})
-                msg = (
-                    f"🏆 HẠNG {i+1}: {result.get('name', 'N/A')}\n"
-                    f"Điểm: {eval_data.get('score', 'N/A')}/100\n"
-                    f"Kinh nghiệm: {eval_data.get('experience_match', 'N/A')}\n\n"
-                    f"Lý do: {eval_data.get('rationale', 'N/A')}"
-                )
-                print(msg)
-                self.mastodon.status_post(f"@{poster_account['acct']} {msg}", visibility='direct')
-                print(f"   > Gửi xong Hạng {i+1}")
-                time.sleep(1)
-            
-            print(f"✅ Hoàn tất gửi DM cho @{poster_account['acct']}")
-
-        except Exception as e:
-            print(f"❌ Lỗi xử lý JD: {e}")
-            self.mastodon.status_post(
-                f"@{poster_account['acct']} ❌ Đã có lỗi xảy ra, vui lòng thử lại sau.",
-                visibility='direct'
+        blocks = []
+        for i, result in enumerate(final_ranking):
+            eval_data = result.get('evaluation', {})
+            blocks.append(
+                f"🏆 HẠNG {i+1}: {result.get('target', 'N/A')}\n"
+                f"Điểm: {eval_data.get('score', 'N/A')}/100\n"
+                f"Kỹ năng phù hợp: {', '.join(eval_data.get('matched_skills', [])) or 'N/A'}\n"
+                f"Lý do: {eval_data.get('reason', 'N/A')}"
             )
+        n_posts = dispatcher.submit(acct, "✅ Dưới đây là bảng xếp hạng ứng viên:", blocks)
+        print(f"✅ Đã xếp {len(blocks)} kết quả vào {n_posts} DM cho @{acct}")
+
+    except Exception as e:
+        print(f"❌ Lỗi xử lý JD: {e}")
+        if attempt < JOB_MAX_ATTEMPTS:
+            raise  # worker sẽ retry sau backoff
+        dispatcher.submit(acct, "❌ Đã có lỗi xảy ra, vui lòng thử lại sau.", [])
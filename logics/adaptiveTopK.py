@@ -0,0 +1,103 @@
+# adaptiveTopK.py
+# Chọn số ứng viên gửi Gemini theo phân bố điểm retrieval thay vì top_k cố định:
+# dừng ở sàn điểm / khoảng cách tương đối so với hit đầu, nới top_k khi điểm sát nhau, tôn trọng budget mỗi request.
+import time
+from typing import Any, Dict, List, Optional
+from config import (
+    ADAPTIVE_MAX_K, ADAPTIVE_MIN_SCORE, ADAPTIVE_REL_GAP, ADAPTIVE_CLUSTER_EPS,
+    MATCH_MAX_LLM_CALLS, MATCH_MAX_WALL_TIME,
+)
+
+
+class MatchBudget:
+    """
+    Budget cho 1 request matching: số call LLM tối đa và/hoặc thời gian wall tối đa (tính từ lúc tạo).
+    0 / None = không giới hạn.
+    """
+
+    def __init__(self, max_llm_calls: Optional[int] = None, max_wall_time: Optional[float] = None):
+        self.max_llm_calls = MATCH_MAX_LLM_CALLS if max_llm_calls is None else max_llm_calls
+        self.max_wall_time = MATCH_MAX_WALL_TIME if max_wall_time is None else max_wall_time
+        self.started = time.monotonic()
+
+    @property
+    def deadline(self) -> Optional[float]:
+        return self.started + self.max_wall_time if self.max_wall_time else None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def cap(self, n: int) -> int:
+        """Số call LLM được phép trong n call muốn gọi."""
+        return min(n, self.max_llm_calls) if self.max_llm_calls else n
+
+
+def hit_score(hit: Dict[str, Any]) -> float:
+    # đã qua pre-ranker → dùng điểm pre-rank, không thì điểm retrieval (hybrid)
+    return hit.get("prerank_score", hit.get("score", 0.0))
+
+
+def adaptive_cutoff(
+    hits: List[Dict[str, Any]],
+    top_k: int = 5,
+    max_k: Optional[int] = None,
+    min_score: Optional[float] = None,
+    rel_gap: Optional[float] = None,
+    cluster_eps: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    `hits` đã sort theo điểm giảm dần. Lấy lần lượt theo thứ tự điểm:
+    - dừng khi điểm < min_score (sàn) hoặc < điểm_đầu * (1 - rel_gap) (tụt xa so với hit tốt nhất)
+    - đủ top_k mà hit kế tiếp vẫn sát hit thứ top_k (chênh <= cluster_eps) → nới dần tới max_k,
+      vì cắt giữa 1 cụm điểm gần như bằng nhau là ngẫu nhiên.
+    """
+    max_k = max(top_k, max_k if max_k is not None else ADAPTIVE_MAX_K)
+    min_score = ADAPTIVE_MIN_SCORE if min_score is None else min_score
+    rel_gap = ADAPTIVE_REL_GAP if rel_gap is None else rel_gap
+    cluster_eps = ADAPTIVE_CLUSTER_EPS if cluster_eps is None else cluster_eps
+    if not hits:
+        return []
+
+    top = hit_score(hits[0])
+    gap_floor = top * (1 - rel_gap) if rel_gap and top > 0 else float("-inf")
+    selected = []
+    for hit in hits[:max_k]:
+        s = hit_score(hit)
+        if s < min_score or s < gap_floor:
+            break
+        if len(selected) >= top_k and hit_score(selected[top_k - 1]) - s > cluster_eps:
+            break
+        selected.append(hit)
+
+    if len(selected) != min(top_k, len(hits)):
+        print(f"📐 Adaptive top_k: {len(selected)} (top_k={top_k}, max_k={max_k}, top score={top:.4f})")
+    return selected
+
+
+def select_for_eval(hits: List[Dict[str, Any]], top_k: int, budget: MatchBudget, **cutoff) -> List[Dict[str, Any]]:
+    """adaptive_cutoff + giới hạn số call LLM của budget."""
+    selected = adaptive_cutoff(hits, top_k=top_k, **cutoff)
+    allowed = budget.cap(len(selected))
+    if allowed < len(selected):
+        print(f"💰 LLM call budget: evaluating {allowed}/{len(selected)} candidates.")
+    return selected[:allowed]
+
+
+# ------------------ Test ------------------
+if __name__ == "__main__":
+    def mk(scores):
+        return [{"id": f"d{i}", "score": s} for i, s in enumerate(scores)]
+
+    spread = mk([0.9, 0.85, 0.4, 0.3, 0.2, 0.1])
+    print("gap early exit  →", [h["id"] for h in adaptive_cutoff(spread, top_k=5, rel_gap=0.5)])
+    low = mk([0.12, 0.1, 0.09])
+    print("score floor     →", [h["id"] for h in adaptive_cutoff(low, top_k=5, min_score=0.2)])
+    tied = mk([0.8, 0.79, 0.79, 0.785, 0.785, 0.783, 0.782, 0.78, 0.7, 0.69, 0.6])
+    print("clustered grow  →", [h["id"] for h in adaptive_cutoff(tied, top_k=5, max_k=10, cluster_eps=0.01)])
+    b = MatchBudget(max_llm_calls=3, max_wall_time=0.05)
+    print("budget cap      →", [h["id"] for h in select_for_eval(tied, 5, b, max_k=10)])
+    time.sleep(0.06)
+    print("budget expired  →", b.expired())
@@ -0,0 +1,224 @@
+# batchMatcher.py
+# Batch matching toàn bộ JD × toàn bộ CV (chạy đêm): nạp embedding của 2 collection vào ma trận float32 liền mạch
+# (tuỳ chọn memmap), tính similarity bằng matmul theo tile, lấy top-k mỗi hàng bằng argpartition.
+# Bộ nhớ tạm bị chặn bởi tile: BATCH_MATCH_ROW_BLOCK × BATCH_MATCH_COL_BLOCK × 4 byte (+ chỉ số argpartition).
+import os, json, time, argparse, traceback
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config import BATCH_MATCH_ROW_BLOCK, BATCH_MATCH_COL_BLOCK, HYBRID_POOL_SIZE, HYBRID_AUTO_YEARS_FILTER, EVAL_BATCH_MODE
+from db.LlamaIndexAdapter import iter_collection, count_docs, to_hit
+from logics.hybridRetriever import fuse_scores
+from logics.reranker import rerank, rerank_batch
+from logics.skills import doc_years
+
+
+# =======================================================
+# 📦 Load embeddings
+# =======================================================
+class EmbeddingMatrix:
+    """ids / metadatas / documents + ma trận (n, dim) float32, cùng thứ tự hàng."""
+
+    def __init__(self, ids, metadatas, documents, matrix: np.ndarray):
+        self.ids = ids
+        self.metadatas = metadatas
+        self.documents = documents
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_embeddings(collection_name: str, mmap_path: Optional[str] = None, page_size: int = 1000) -> EmbeddingMatrix:
+    """
+    Đọc toàn bộ embedding của collection theo trang, ghi thẳng vào 1 ma trận float32 cấp phát trước.
+    mmap_path → ma trận nằm trong file .npy (np.lib.format.open_memmap), RAM chỉ giữ trang đang đọc.
+    """
+    n = count_docs(collection_name)
+    ids, metas, docs = [], [], []
+    matrix = None
+    row = 0
+    for res in iter_collection(collection_name, ("embeddings", "metadatas", "documents"), page_size):
+        emb = np.asarray(res["embeddings"], dtype=np.float32)
+        if matrix is None:
+            shape = (n, emb.shape[1])
+            matrix = (np.lib.format.open_memmap(mmap_path, mode="w+", dtype=np.float32, shape=shape)
+                      if mmap_path else np.empty(shape, dtype=np.float32))
+        take = min(len(emb), n - row)  # collection bị ghi thêm trong lúc đọc → bỏ phần dư
+        matrix[row:row + take] = emb[:take]
+        ids.extend(res["ids"][:take])
+        metas.extend((res.get("metadatas") or [{}] * take)[:take])
+        docs.extend((res.get("documents") or [""] * take)[:take])
+        row += take
+        if row >= n:
+            break
+    if matrix is None:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    elif row < n:
+        matrix = matrix[:row]  # collection bị xoá bớt trong lúc đọc
+    if mmap_path and len(matrix):
+        matrix.flush()
+        matrix = np.load(mmap_path, mmap_mode="r")[:row]
+    print(f"✅ Loaded {row} embeddings from '{collection_name}'" + (f" (memmap: {mmap_path})" if mmap_path else ""))
+    return EmbeddingMatrix(ids, metas, docs, matrix)
+
+
+# =======================================================
+# 🧮 Blocked top-k
+# =======================================================
+def blocked_topk(
+    queries: np.ndarray,
+    docs: np.ndarray,
+    k: int,
+    row_block: int = None,
+    col_block: int = None,
+    doc_mask: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k doc gần nhất (L2² — cùng metric mặc định của Chroma) cho mỗi query.
+    dist = |q|² + |d|² - 2 q·d; trong 1 hàng |q|² là hằng → chọn theo max(2 q·d - |d|²).
+    doc_mask (bool, len = số doc): chỉ xét doc True — tương đương `where` của Chroma, không copy ma trận.
+    Trả về (indices, distances) shape (n_queries, k), mỗi hàng sort tăng dần theo distance.
+    """
+    row_block = row_block or BATCH_MATCH_ROW_BLOCK
+    col_block = col_block or BATCH_MATCH_COL_BLOCK
+    nq, nd = len(queries), len(docs)
+    k = min(k, nd if doc_mask is None else int(np.count_nonzero(doc_mask)))
+    out_idx = np.empty((nq, k), dtype=np.int64)
+    out_dist = np.empty((nq, k), dtype=np.float32)
+    if nq == 0 or k == 0:
+        return out_idx, out_dist
+
+    d_sq = np.empty(nd, dtype=np.float32)
+    for c0 in range(0, nd, col_block):
+        d = np.asarray(docs[c0:c0 + col_block], dtype=np.float32)
+        d_sq[c0:c0 + len(d)] = np.einsum("ij,ij->i", d, d)
+
+    for r0 in range(0, nq, row_block):
+        q = np.ascontiguousarray(queries[r0:r0 + row_block], dtype=np.float32)
+        q_sq = np.einsum("ij,ij->i", q, q)
+        best_s = np.empty((len(q), 0), dtype=np.float32)
+        best_i = np.empty((len(q), 0), dtype=np.int64)
+        for c0 in range(0, nd, col_block):
+            d = np.asarray(docs[c0:c0 + col_block], dtype=np.float32)
+            s = q @ d.T
+            s *= 2
+            s -= d_sq[c0:c0 + len(d)]
+            if doc_mask is not None:
+                s[:, ~doc_mask[c0:c0 + len(d)]] = -np.inf
+            kk = min(k, s.shape[1])
+            part = np.argpartition(-s, kk - 1, axis=1)[:, :kk]
+            # gộp ứng viên của tile này với top-k đang giữ, rồi cắt lại còn k
+            cand_s = np.concatenate([best_s, np.take_along_axis(s, part, axis=1)], axis=1)
+            cand_i = np.concatenate([best_i, part + c0], axis=1)
+            if cand_s.shape[1] > k:
+                keep = np.argpartition(-cand_s, k - 1, axis=1)[:, :k]
+                cand_s = np.take_along_axis(cand_s, keep, axis=1)
+                cand_i = np.take_along_axis(cand_i, keep, axis=1)
+            best_s, best_i = cand_s, cand_i
+        # sort cuối: score ↓, chỉ số doc ↑ (thứ tự xác định khi hoà)
+        order = np.lexsort((best_i, -best_s), axis=1)
+        best_s = np.take_along_axis(best_s, order, axis=1)
+        best_i = np.take_along_axis(best_i, order, axis=1)
+        out_idx[r0:r0 + len(q)] = best_i
+        out_dist[r0:r0 + len(q)] = np.maximum(q_sq[:, None] - best_s, 0.0)
+    return out_idx, out_dist
+
+
+# =======================================================
+# 🌙 Batch JD → CV
+# =======================================================
+def _meta_years(meta: Dict[str, Any]) -> float:
+    if "years" in meta:
+        return float(meta.get("years") or 0.0)
+    try:  # document chưa backfill metadata có cấu trúc
+        return doc_years(json.loads(meta.get("_raw_json") or "{}"))
+    except json.JSONDecodeError:
+        return 0.0
+
+
+def batch_match(
+    top_k: int = 5,
+    evaluate: bool = True,
+    jd_ids: Optional[List[str]] = None,
+    mmap_dir: Optional[str] = None,
+    pool_size: int = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Match mọi JD (hoặc jd_ids) với mọi CV. Trả về {jd_id: results}, results cùng format find_best_candidates:
+    [{"target", "similarity", "evaluation"}] (evaluate=False → evaluation = {} và sort theo similarity).
+    Tập ứng viên giống hybrid_retrieve: lọc số năm tự động (CV years >= years_of_experience của JD, ít hơn top_k
+    thì nới), lấy pool_size CV gần nhất rồi trộn điểm (fuse_scores) trước khi cắt top_k.
+    Khác find_best_candidates: chỉ 1 vector / document (không dùng multi-vector), không có must_have,
+    và kết quả không ghi vào bảng match (db/matchTable.py).
+    """
+    pool_size = max(top_k, pool_size or HYBRID_POOL_SIZE)
+    if mmap_dir:
+        os.makedirs(mmap_dir, exist_ok=True)
+    cvs = load_embeddings("cv_collection", os.path.join(mmap_dir, "cv.npy") if mmap_dir else None)
+    jds = load_embeddings("jd_collection", os.path.join(mmap_dir, "jd.npy") if mmap_dir else None)
+    if not len(cvs) or not len(jds):
+        return {}
+
+    rows = np.arange(len(jds))
+    if jd_ids is not None:
+        wanted = set(jd_ids)
+        rows = np.array([i for i, d in enumerate(jds.ids) if d in wanted], dtype=np.int64)
+    jd_hits = [to_hit(jds.ids[r], jds.documents[r], jds.metadatas[r], 0.0) for r in rows.tolist()]
+
+    # gom JD theo số năm yêu cầu → mỗi nhóm 1 lượt matmul với mask CV đủ số năm
+    cv_years = np.array([_meta_years(m or {}) for m in cvs.metadatas], dtype=np.float32)
+    groups: Dict[float, List[int]] = {}
+    for r, jd_hit in enumerate(jd_hits):
+        min_years = (doc_years(jd_hit["data"]) or 0.0) if HYBRID_AUTO_YEARS_FILTER else 0.0
+        groups.setdefault(min_years, []).append(r)
+
+    t0 = time.perf_counter()
+    topk: Dict[int, Tuple[List[int], List[float]]] = {}
+    for min_years, members in groups.items():
+        mask = cv_years >= min_years if min_years else None
+        if mask is not None and np.count_nonzero(mask) < top_k:
+            print(f"⚠️ Chỉ {np.count_nonzero(mask)} CV đủ {min_years:g} năm KN, nới điều kiện cho {len(members)} JD.")
+            mask = None
+        idx, dist = blocked_topk(jds.matrix[rows[members]], cvs.matrix, pool_size, doc_mask=mask)
+        for n, r in enumerate(members):
+            topk[r] = (idx[n].tolist(), dist[n].tolist())
+    print(f"⚡ Scored {len(rows)} JD × {len(cvs)} CV in {time.perf_counter() - t0:.2f}s ({len(groups)} years group(s))")
+
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for r, jd_hit in enumerate(jd_hits):
+        cv_idx, cv_dist = topk[r]
+        hits = [to_hit(cvs.ids[c], cvs.documents[c], cvs.metadatas[c], float(d)) for c, d in zip(cv_idx, cv_dist)]
+        hits = fuse_scores(hits, jd_hit["data"], None)[:top_k]
+        candidates = [{
+            "id": h["id"],
+            "target": h["metadata"].get("filename") or h["metadata"].get("id") or "UNKNOWN",
+            "similarity": round(h["score"], 4),
+            "jd_text": jd_hit["text"],
+            "cv_text": h["text"],
+        } for h in hits]
+        if not evaluate:
+            out[jd_hit["id"]] = [{"id": c["id"], "target": c["target"], "similarity": c["similarity"], "evaluation": {}}
+                                 for c in candidates]
+        elif EVAL_BATCH_MODE:
+            out[jd_hit["id"]] = rerank_batch(candidates)
+        else:
+            out[jd_hit["id"]] = rerank(candidates)
+    return out
+
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Batch match toàn bộ JD × CV (chạy đêm).")
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--no-eval", action="store_true", help="chỉ tính similarity, không gọi Gemini")
+    ap.add_argument("--mmap-dir", default=None, help="thư mục ghi ma trận embedding dạng .npy memmap")
+    ap.add_argument("--out", default="batch_matches.json")
+    args = ap.parse_args()
+    try:
+        results = batch_match(top_k=args.top_k, evaluate=not args.no_eval, mmap_dir=args.mmap_dir)
+        with open(args.out, "w", encoding="utf8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✅ Wrote matches for {len(results)} JDs → {args.out}")
+    except Exception as e:
+        print(f"❌ Fatal error in batch matcher: {e}")
+        traceback.print_exc()
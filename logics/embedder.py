@@ -1,13 +1,66 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-
-# ------------------ Setup model ------------------
-try:
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    print("✅ Model loaded successfully.")
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    model = None
+import threading
+import time
+from typing import Dict, List
+from config import EMBED_BATCH_SIZE, EMBED_SERVER_URL, EMBED_SERVER_FALLBACK, EMBED_SERVER_RETRY
+
+# ------------------ Setup model (lazy, 1 instance / process) ------------------
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Load backend embedding (EMBED_BACKEND: torch | onnx, xem logics/embeddingBackends.py) lần đầu khi
+    thực sự cần vector; các lần sau dùng lại. Dùng chung cho embed_json và LlamaIndex Settings.embed_model.
+    """
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            try:
+                from logics.embeddingBackends import create_backend
+                _model = create_backend()
+                print(f"✅ Model loaded successfully ({_model.name}).")
+            except Exception as e:
+                print(f"❌ Error loading model: {e}")
+                raise RuntimeError("Embedding model is not loaded!") from e
+    return _model
+
+
+_server_retry_at = 0.0
+
+
+def _encode_via_server(texts: List[str]):
+    """
+    EMBED_SERVER_URL set → gọi embedding server dùng chung (logics/embeddingServer.py), process này không load model.
+    Server lỗi: EMBED_SERVER_FALLBACK=1 thì trả None (dùng model local, thử lại server sau EMBED_SERVER_RETRY giây),
+    không thì raise.
+    """
+    global _server_retry_at
+    if not EMBED_SERVER_URL or time.monotonic() < _server_retry_at:
+        return None
+    from logics.embeddingServer import encode_remote, EmbeddingServerError
+    try:
+        return encode_remote(texts)
+    except EmbeddingServerError as e:
+        if not EMBED_SERVER_FALLBACK:
+            raise RuntimeError("Embedding server is not available!") from e
+        print(f"⚠️ {e} → dùng model local, thử lại server sau {EMBED_SERVER_RETRY:.0f}s")
+        _server_retry_at = time.monotonic() + EMBED_SERVER_RETRY
+        return None
+
+
+def encode_texts(texts: List[str], batch_size: int = None) -> np.ndarray:
+    """Encode nhiều text 1 lần (normalized, float32) → shape (len(texts), dim)."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    emb = _encode_via_server(list(texts))
+    if emb is not None:
+        return emb
+    emb = get_model().encode(list(texts), batch_size=batch_size or EMBED_BATCH_SIZE)
+    return np.asarray(emb, dtype=np.float32)
 
 
 # ------------------ JSON → Text (CV) ------------------
@@ -90,6 +143,44 @@ def json_to_text_auto(data: dict) -> str:
         return str(data)
 
 
+# ------------------ JSON → Text theo từng field (multi-vector) ------------------
+def json_to_fields(data: dict) -> Dict[str, List[str]]:
+    """
+    Tách CV/JD thành text riêng cho từng field: skills, experience (1 text / kinh nghiệm), projects (1 text / dự án),
+    summary. Mỗi text ngắn → không bị chunker cắt, mỗi field 1 (hoặc vài) vector riêng.
+    """
+    fields: Dict[str, List[str]] = {"skills": [], "experience": [], "projects": [], "summary": []}
+    try:
+        if "skills" in data or "education" in data or "experiences" in data:
+            if data.get("summary"):
+                fields["summary"].append(str(data["summary"]))
+            if data.get("skills"):
+                fields["skills"].append("Skills: " + ", ".join(sorted(set(map(str, data["skills"])))))
+            for e in data.get("experiences") or []:
+                if isinstance(e, dict):
+                    highlights = "; ".join(e.get("highlights", []) or [])
+                    fields["experience"].append(
+                        f"{e.get('role', '')} at {e.get('organization', '')} ({e.get('years', 0)} yrs) - {highlights}")
+            for pr in data.get("projects") or []:
+                if isinstance(pr, dict):
+                    fields["projects"].append(f"{pr.get('role', '')} - {'; '.join(pr.get('highlights', []) or [])}")
+        else:
+            title = data.get("title", "")
+            if data.get("summary") or title:
+                fields["summary"].append(f"{title}. {data.get('summary', '')}".strip(". "))
+            skills = list(data.get("requirements") or []) + list(data.get("tech_stack") or []) + \
+                list(data.get("nice_to_have") or [])
+            if skills:
+                fields["skills"].append("Skills: " + ", ".join(sorted(set(map(str, skills)))))
+            exp = [str(title), str(data.get("experience_level") or "")]
+            if data.get("years_of_experience"):
+                exp.append(f"{data['years_of_experience']} yrs")
+            fields["experience"].append(" - ".join(p for p in exp if p))
+    except Exception as e:
+        print(f"❌ Error splitting JSON into fields: {e}")
+    return {f: [t for t in texts if t.strip()] for f, texts in fields.items()}
+
+
 # ------------------ Embed JSON ------------------
 def embed_json(data: dict):
     try:
@@ -100,10 +191,7 @@ def embed_json(data: dict):
         if not text.strip():
             raise ValueError("Empty text after JSON conversion")
 
-        if model is None:
-            raise RuntimeError("Embedding model is not loaded!")
-
-        emb = model.encode(text, normalize_embeddings=True)
+        emb = encode_texts([text])[0]
         print(f"✅ Embedding success, vector length = {len(emb)}")
         return text, np.array(emb, dtype=np.float32)
 
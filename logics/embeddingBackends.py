@@ -0,0 +1,284 @@
+# embeddingBackends.py
+# Backend tính embedding cho logics/embedder, chọn bằng EMBED_BACKEND:
+#   torch : SentenceTransformer như cũ (mặc định)
+#   onnx  : all-MiniLM-L6-v2 export sang ONNX (+ quantize dynamic int8), chạy bằng onnxruntime trên CPU.
+# Hai backend phải cho vector tương thích với collection đã index (mean pooling + L2 normalize như
+# SentenceTransformer); check_compatibility() đo cosine giữa hai backend trên cùng bộ text.
+# Chạy:
+#   python -m logics.embeddingBackends --export        # export + quantize vào EMBED_ONNX_DIR
+#   python -m logics.embeddingBackends --check [file]  # cosine torch vs onnx (mỗi dòng file = 1 text)
+import os
+import json
+import inspect
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Sequence
+from config import (
+    EMBED_MODEL_NAME,
+    EMBED_BATCH_SIZE,
+    EMBED_BACKEND,
+    EMBED_ONNX_DIR,
+    EMBED_ONNX_QUANTIZE,
+    EMBED_THREADS,
+    EMBED_MAX_SEQ_LENGTH,
+    EMBED_COMPAT_MIN_COSINE,
+)
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+ONNX_MANIFEST = "export.json"
+
+_export_lock = threading.Lock()
+
+
+# ------------------ torch (SentenceTransformer) ------------------
+class TorchBackend:
+    """SentenceTransformer trên CPU/GPU — hành vi gốc của embedder. Tự sort theo độ dài text trong encode()."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBED_MODEL_NAME, threads: int = EMBED_THREADS,
+                 max_seq_length: int = EMBED_MAX_SEQ_LENGTH):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name)
+        if max_seq_length > 0:
+            self.model.max_seq_length = min(self.model.max_seq_length or max_seq_length, max_seq_length)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        emb = self.model.encode(
+            list(texts),
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(emb, dtype=np.float32)
+
+
+# ------------------ ONNX export ------------------
+def onnx_model_path(onnx_dir: str = EMBED_ONNX_DIR, quantize: bool = EMBED_ONNX_QUANTIZE) -> str:
+    return os.path.join(onnx_dir, ONNX_INT8_FILE if quantize else ONNX_FP32_FILE)
+
+
+def export_onnx(model_name: str = EMBED_MODEL_NAME, onnx_dir: str = EMBED_ONNX_DIR,
+                quantize: bool = EMBED_ONNX_QUANTIZE, opset: int = 14) -> str:
+    """
+    Export transformer của model sang ONNX (batch / seq_len động) + lưu tokenizer cạnh nó.
+    quantize=True: thêm bản quantize dynamic int8 (weight MatMul int8, activation quantize lúc chạy).
+    Chỉ lúc export mới cần torch + transformers; lúc chạy chỉ cần onnxruntime + tokenizer.
+    Ghi ra file tạm rồi os.replace để nhiều worker cùng export không đọc phải file dở.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(onnx_dir)
+
+    sample = tokenizer(["hello world"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "seq"} for n in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    fp32_path = os.path.join(onnx_dir, ONNX_FP32_FILE)
+    tmp = fp32_path + f".tmp{os.getpid()}"
+    kwargs = dict(
+        input_names=input_names,
+        output_names=["last_hidden_state"],
+        dynamic_axes=dynamic,
+        opset_version=opset,
+        do_constant_folding=True,
+    )
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # exporter TorchScript: không cần onnxscript, graph ổn định với opset 14
+
+    class _Encoder(torch.nn.Module):
+        # Gọi model bằng keyword: thứ tự tham số positional của forward() khác nhau giữa các bản transformers
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(_Encoder(model), tuple(sample[n] for n in input_names), tmp, **kwargs)
+    os.replace(tmp, fp32_path)
+
+    out_path = fp32_path
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(onnx_dir, ONNX_INT8_FILE)
+        tmp = int8_path + f".tmp{os.getpid()}"
+        quantize_dynamic(fp32_path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, int8_path)
+        out_path = int8_path
+
+    with open(os.path.join(onnx_dir, ONNX_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"model_name": model_name, "opset": opset, "quantized": bool(quantize),
+                   "inputs": input_names}, f, ensure_ascii=False, indent=2)
+    print(f"✅ Exported {model_name} → {out_path}")
+    return out_path
+
+
+def ensure_onnx_model(model_name: str = EMBED_MODEL_NAME, onnx_dir: str = EMBED_ONNX_DIR,
+                      quantize: bool = EMBED_ONNX_QUANTIZE) -> str:
+    """Trả đường dẫn model ONNX; export lần đầu nếu chưa có hoặc export từ model khác."""
+    path = onnx_model_path(onnx_dir, quantize)
+    manifest = os.path.join(onnx_dir, ONNX_MANIFEST)
+    with _export_lock:
+        try:
+            with open(manifest, encoding="utf-8") as f:
+                same_model = json.load(f).get("model_name") == model_name
+        except (OSError, ValueError):
+            same_model = False
+        if not (same_model and os.path.exists(path)):
+            print(f"⚙️ ONNX model chưa có ở {onnx_dir}, export từ {model_name}...")
+            export_onnx(model_name, onnx_dir, quantize)
+    return path
+
+
+# ------------------ onnx (onnxruntime) ------------------
+class OnnxBackend:
+    """
+    onnxruntime CPU + tokenizer fast. Tự chia batch theo độ dài token (length bucketing):
+    sort theo số token, mỗi batch chỉ pad tới text dài nhất của batch đó, xong trả về đúng thứ tự gốc.
+    Pooling = mean theo attention mask rồi L2 normalize (giống module Pooling + Normalize của MiniLM).
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str = EMBED_MODEL_NAME, threads: int = EMBED_THREADS,
+                 max_seq_length: int = EMBED_MAX_SEQ_LENGTH, onnx_dir: str = EMBED_ONNX_DIR,
+                 quantize: bool = EMBED_ONNX_QUANTIZE):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = ensure_onnx_model(model_name, onnx_dir, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        self.max_seq_length = max_seq_length if max_seq_length > 0 else self.tokenizer.model_max_length
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+        self.pad_id = self.tokenizer.pad_token_id or 0
+
+    def encode(self, texts: Sequence[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        enc = self.tokenizer(list(texts), truncation=True, max_length=self.max_seq_length)
+        ids_list = enc["input_ids"]
+        lengths = np.fromiter((len(x) for x in ids_list), dtype=np.int64, count=len(ids_list))
+        order = np.argsort(-lengths, kind="stable")  # dài trước: batch nặng nhất chạy đầu, bucket gần đều nhau
+        out = None
+
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            width = int(lengths[idx[0]])
+            ids = np.full((len(idx), width), self.pad_id, dtype=np.int64)
+            mask = np.zeros((len(idx), width), dtype=np.int64)
+            for r, i in enumerate(idx):
+                n = int(lengths[i])
+                ids[r, :n] = ids_list[i]
+                mask[r, :n] = 1
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+
+            hidden = self.session.run(None, feeds)[0]
+            m = mask[:, :, None].astype(np.float32)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            if out is None:
+                out = np.empty((len(order), pooled.shape[1]), dtype=np.float32)
+            out[idx] = pooled
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+
+# ------------------ Registry ------------------
+_BACKENDS: Dict[str, Callable[[], object]] = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], object]) -> None:
+    """Thêm backend mới (vd. OpenVINO); factory() trả object có .encode(texts, batch_size) và .dim."""
+    _BACKENDS[name] = factory
+
+
+def create_backend(name: str = None):
+    name = (name or EMBED_BACKEND).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown EMBED_BACKEND '{name}' (có: {', '.join(sorted(_BACKENDS))})")
+    return _BACKENDS[name]()
+
+
+# ------------------ Compatibility check ------------------
+def check_compatibility(texts: List[str], reference: str = "torch", candidate: str = "onnx",
+                        min_cosine: float = EMBED_COMPAT_MIN_COSINE) -> Dict:
+    """
+    Encode cùng bộ text bằng 2 backend, đo cosine từng cặp vector + top-1 neighbour có khớp không.
+    ok=False nghĩa là vector của candidate không dùng lẫn được với collection đã index bằng reference
+    → phải re-index (initdb) trước khi đổi EMBED_BACKEND.
+    """
+    ref = create_backend(reference).encode(texts)
+    cand = create_backend(candidate).encode(texts)
+    cos = np.einsum("ij,ij->i", ref, cand)
+    same_nn = float(np.mean(
+        np.argsort(-(ref @ ref.T), axis=1)[:, 1] == np.argsort(-(cand @ ref.T), axis=1)[:, 1]
+    )) if len(texts) > 1 else 1.0
+    report = {
+        "n": len(texts),
+        "min_cosine": float(cos.min()),
+        "mean_cosine": float(cos.mean()),
+        "nn_agreement": same_nn,
+        "threshold": min_cosine,
+        "ok": bool(cos.min() >= min_cosine),
+    }
+    return report
+
+
+DEFAULT_CHECK_TEXTS = [
+    "Summary: Backend engineer with 5 years of Python and Django experience.",
+    "Skills: python, fastapi, postgresql, docker, kubernetes",
+    "Senior Data Scientist at Fintech (3 yrs) - built credit scoring models with XGBoost",
+    "Title: Frontend Developer | Skills: react, typescript, css | Location: Hanoi",
+    "Job: Mobile developer (Flutter), 2+ years, remote",
+    "Kỹ sư phần mềm, 4 năm kinh nghiệm Java Spring Boot, microservices",
+    "DevOps: terraform, aws, ci/cd pipelines, monitoring with prometheus and grafana",
+    "Looking for an NLP engineer familiar with transformers, sentence embeddings and vector databases",
+]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export / kiểm tra backend embedding ONNX")
+    parser.add_argument("--export", action="store_true", help="export + quantize model vào EMBED_ONNX_DIR")
+    parser.add_argument("--no-quantize", action="store_true", help="chỉ export float32")
+    parser.add_argument("--check", nargs="?", const="", default=None,
+                        help="so cosine torch vs onnx; tuỳ chọn file text (mỗi dòng 1 text)")
+    args = parser.parse_args()
+
+    if args.export:
+        export_onnx(quantize=not args.no_quantize)
+    if args.check is not None:
+        if args.check:
+            with open(args.check, encoding="utf-8") as f:
+                texts = [line.strip() for line in f if line.strip()]
+        else:
+            texts = DEFAULT_CHECK_TEXTS
+        report = check_compatibility(texts)
+        print(json.dumps(report, indent=2))
+        print("✅ Tương thích với collection hiện có." if report["ok"]
+              else "❌ Cosine dưới ngưỡng — cần re-index trước khi đổi EMBED_BACKEND.")
+    if not args.export and args.check is None:
+        parser.print_help()
@@ -0,0 +1,381 @@
+# embeddingServer.py
+# Service embedding dùng chung trên localhost HTTP: 1 process giữ model (backend theo EMBED_BACKEND),
+# bot worker / initdb / matchingLogic CLI chỉ là client mỏng (logics/embedder.encode_texts khi EMBED_SERVER_URL được set).
+# - Gom request đồng thời thành micro-batch: chờ tối đa EMBED_SERVER_MAX_WAIT_MS hoặc đủ EMBED_BATCH_SIZE text.
+# - LRU cache sha1(text) → vector (EMBED_SERVER_CACHE_SIZE), text trùng trong cùng batch chỉ encode 1 lần.
+# Giao thức: POST /encode {"texts": [...]} → body float32 little-endian (n × dim), header X-Rows / X-Dim.
+#            GET /health, GET /stats → JSON.
+# Chạy: python -m logics.embeddingServer [--host 127.0.0.1] [--port 8765]
+import json
+import time
+import queue
+import socket
+import hashlib
+import threading
+import http.client
+import numpy as np
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+from config import (
+    EMBED_MODEL_NAME,
+    EMBED_BATCH_SIZE,
+    EMBED_SERVER_URL,
+    EMBED_SERVER_HOST,
+    EMBED_SERVER_PORT,
+    EMBED_SERVER_MAX_WAIT_MS,
+    EMBED_SERVER_CACHE_SIZE,
+    EMBED_SERVER_TIMEOUT,
+    EMBED_SERVER_PAD_WASTE,
+)
+
+
+class EmbeddingServerError(RuntimeError):
+    """Không gọi được embedding server (chưa chạy / timeout / trả lỗi)."""
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+# ------------------ LRU cache ------------------
+class VectorLRU:
+    """OrderedDict sha1(text) → vector float32; thread-safe, bỏ entry ít dùng nhất khi vượt capacity."""
+
+    def __init__(self, capacity: int = EMBED_SERVER_CACHE_SIZE):
+        self.capacity = capacity
+        self._data: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is not None:
+                self._data.move_to_end(key)
+            return vec
+
+    def put(self, key: bytes, vec: np.ndarray):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._data[key] = vec
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ------------------ Micro-batching ------------------
+class _Pending:
+    __slots__ = ("keys", "texts", "vectors", "error", "done")
+
+    def __init__(self, keys: List[bytes], texts: List[str]):
+        self.keys, self.texts = keys, texts
+        self.vectors: Dict[bytes, np.ndarray] = {}
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    1 thread encode duy nhất (model không bị nhiều thread tranh nhau). Request đầu tiên mở 1 cửa sổ
+    max_wait_ms; các request đến trong cửa sổ (tới khi đủ max_batch text) được encode chung 1 lần gọi backend.
+    """
+
+    def __init__(self, backend, max_batch: int = EMBED_BATCH_SIZE, max_wait_ms: float = EMBED_SERVER_MAX_WAIT_MS,
+                 cache_size: int = EMBED_SERVER_CACHE_SIZE, pad_waste: float = EMBED_SERVER_PAD_WASTE):
+        self.backend = backend
+        self.pad_waste = pad_waste
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache = VectorLRU(cache_size)
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "texts": 0, "cache_hits": 0, "batches": 0,
+                      "encoded_texts": 0, "encode_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts: Sequence[str], timeout: float = EMBED_SERVER_TIMEOUT) -> np.ndarray:
+        keys = [text_key(t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        miss_keys, miss_texts = [], []
+        for k, t in zip(keys, texts):
+            if k in found:
+                continue
+            vec = self.cache.get(k)
+            if vec is not None:
+                found[k] = vec
+            else:
+                found[k] = None
+                miss_keys.append(k)
+                miss_texts.append(t)
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            self.stats["cache_hits"] += len(found) - len(miss_keys)
+
+        # Request lớn (ingest) được đưa vào queue từng phần max_batch text, phần sau chỉ vào khi phần trước xong
+        # → query 1 text của bot đến giữa chừng được xếp ngay sau phần đang encode, không phải chờ cả lô.
+        # timeout tính cho từng phần nên tổng thời gian chờ tăng theo kích thước request.
+        for i in range(0, len(miss_keys), self.max_batch):
+            item = _Pending(miss_keys[i:i + self.max_batch], miss_texts[i:i + self.max_batch])
+            self._queue.put(item)
+            if not item.done.wait(timeout):
+                raise TimeoutError(f"encode quá {timeout}s")
+            if item.error is not None:
+                raise item.error
+            found.update(item.vectors)
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[k] for k in keys]).astype(np.float32, copy=False)
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # --- batcher thread ---
+    def _collect(self, first: _Pending) -> List[_Pending]:
+        batch, n = [first], len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while n < self.max_batch:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=left)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # để vòng _run thấy tín hiệu dừng sau batch này
+                break
+            batch.append(item)
+            n += len(item.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                # Gộp text trùng giữa các request; text vừa được batch trước encode thì lấy từ cache
+                todo: "OrderedDict[bytes, str]" = OrderedDict()
+                ready: Dict[bytes, np.ndarray] = {}
+                for item in batch:
+                    for k, t in zip(item.keys, item.texts):
+                        if k in todo or k in ready:
+                            continue
+                        vec = self.cache.get(k)
+                        if vec is not None:
+                            ready[k] = vec
+                        else:
+                            todo[k] = t
+                if todo:
+                    t0 = time.perf_counter()
+                    vecs = self._encode_bucketed(list(todo.values()))
+                    elapsed = time.perf_counter() - t0
+                    for k, vec in zip(todo, vecs):
+                        vec = vec.copy()  # không giữ cả ma trận batch sống trong cache
+                        ready[k] = vec
+                        self.cache.put(k, vec)
+                    with self._stats_lock:
+                        self.stats["batches"] += 1
+                        self.stats["encoded_texts"] += len(todo)
+                        self.stats["encode_seconds"] += elapsed
+                for item in batch:
+                    item.vectors = {k: ready[k] for k in item.keys}
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            finally:
+                for item in batch:
+                    item.done.set()
+
+    def _encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        """
+        Micro-batch gồm request ngẫu nhiên nên độ dài lệch nhau; encode 1 lần thì mọi text bị pad tới text dài nhất.
+        Sort theo độ dài (ký tự ~ token) rồi cắt nhóm sao cho phần pad ≤ pad_waste tổng độ dài thật của nhóm.
+        """
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        out = None
+        start = 0
+        while start < len(order):
+            longest = max(len(texts[order[start]]), 1)
+            end, total = start, 0
+            while end < len(order) and end - start < self.max_batch:
+                n = max(len(texts[order[end]]), 1)
+                if end > start and longest * (end - start + 1) > (1 + self.pad_waste) * (total + n):
+                    break
+                total += n
+                end += 1
+            idx = order[start:end]
+            vecs = np.asarray(self.backend.encode([texts[i] for i in idx], batch_size=len(idx)), dtype=np.float32)
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+            start = end
+        return out
+
+    def snapshot_stats(self) -> Dict:
+        with self._stats_lock:
+            s = dict(self.stats)
+        s["cache_size"] = len(self.cache)
+        s["avg_batch"] = round(s["encoded_texts"] / s["batches"], 2) if s["batches"] else 0.0
+        s["cache_hit_rate"] = round(s["cache_hits"] / s["texts"], 4) if s["texts"] else 0.0
+        return s
+
+
+# ------------------ HTTP server ------------------
+def make_server(batcher: MicroBatcher, host: str = EMBED_SERVER_HOST, port: int = EMBED_SERVER_PORT,
+                info: Dict = None) -> ThreadingHTTPServer:
+    info = info or {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: client giữ 1 connection / thread
+        disable_nagle_algorithm = True  # header + body ghi 2 lần → Nagle + delayed ACK treo ~40ms / request
+
+        def log_message(self, *a):
+            pass
+
+        def _send(self, code: int, body: bytes, ctype: str = "application/json", headers: Dict = None):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, str(v))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, json.dumps({"status": "ok", **info}).encode())
+            elif self.path == "/stats":
+                self._send(200, json.dumps(batcher.snapshot_stats()).encode())
+            else:
+                self._send(404, b'{"error": "not found"}')
+
+        def do_POST(self):
+            if self.path != "/encode":
+                self._send(404, b'{"error": "not found"}')
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                texts = body.get("texts")
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError("'texts' phải là list[str]")
+            except ValueError as e:
+                self._send(400, json.dumps({"error": str(e)}).encode())
+                return
+            try:
+                emb = batcher.encode(texts)
+            except Exception as e:
+                self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode())
+                return
+            emb = np.ascontiguousarray(emb, dtype="<f4")
+            self._send(200, emb.tobytes(), "application/octet-stream",
+                       {"X-Rows": emb.shape[0], "X-Dim": emb.shape[1] if emb.ndim == 2 else 0})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host: str = EMBED_SERVER_HOST, port: int = EMBED_SERVER_PORT, backend=None):
+    from logics.embeddingBackends import create_backend
+
+    backend = backend or create_backend()
+    backend.encode(["warmup"])
+    batcher = MicroBatcher(backend)
+    server = make_server(batcher, host, port, info={"model": EMBED_MODEL_NAME, "backend": backend.name})
+    print(f"✅ Embedding server ({backend.name}, {EMBED_MODEL_NAME}) listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Embedding server stopped.")
+    finally:
+        server.server_close()
+        batcher.stop()
+
+
+# ------------------ Client ------------------
+_local = threading.local()
+
+
+def _connection(url: str) -> http.client.HTTPConnection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "url", None) == url:
+        return conn
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=EMBED_SERVER_TIMEOUT)
+    conn.connect()
+    conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    _local.conn, _local.url = conn, url
+    return conn
+
+
+def _drop_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+    _local.conn = None
+
+
+def encode_remote(texts: Sequence[str], url: str = None, chunk_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """
+    Gửi texts tới embedding server, trả ndarray float32 (n, dim) giống encode_texts local.
+    Lô lớn (initdb / ingest) được cắt thành request chunk_size text: query của bot xen vào giữa các chunk thay vì
+    chờ cả lô, timeout áp cho từng chunk (tổng thời gian tăng theo số text) và lỗi chỉ gửi lại chunk hỏng.
+    """
+    texts = list(texts)
+    if len(texts) <= chunk_size:
+        return _encode_chunk(texts, url or EMBED_SERVER_URL)
+    parts = [_encode_chunk(texts[i:i + chunk_size], url or EMBED_SERVER_URL)
+             for i in range(0, len(texts), chunk_size)]
+    return np.concatenate(parts)
+
+
+def _encode_chunk(texts: List[str], url: str) -> np.ndarray:
+    """
+    1 request POST /encode. 1 connection keep-alive / thread; connection đứt (server restart) thì mở lại 1 lần
+    rồi mới báo lỗi.
+    """
+    payload = json.dumps({"texts": texts}, ensure_ascii=False).encode("utf-8")
+    # server chờ EMBED_SERVER_TIMEOUT cho mỗi phần EMBED_BATCH_SIZE text → client chờ tương ứng
+    timeout = EMBED_SERVER_TIMEOUT * max(1, -(-len(texts) // EMBED_BATCH_SIZE))
+    for attempt in (0, 1):
+        try:
+            conn = _connection(url)
+            conn.sock.settimeout(timeout)
+            conn.request("POST", "/encode", body=payload, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException) as e:
+            _drop_connection()
+            if attempt:
+                raise EmbeddingServerError(f"Embedding server {url} không phản hồi: {e}") from e
+            continue
+        if resp.status != 200:
+            raise EmbeddingServerError(f"Embedding server {url} trả {resp.status}: {body[:200].decode(errors='replace')}")
+        rows, dim = int(resp.getheader("X-Rows", 0)), int(resp.getheader("X-Dim", 0))
+        return np.frombuffer(body, dtype="<f4").reshape(rows, dim).astype(np.float32)
+
+
+def server_stats(url: str = None) -> Dict:
+    conn = _connection(url or EMBED_SERVER_URL)
+    conn.request("GET", "/stats")
+    return json.loads(conn.getresponse().read())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedding server dùng chung (micro-batch + LRU cache)")
+    parser.add_argument("--host", default=EMBED_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=EMBED_SERVER_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,158 @@
+# folderIndexer.py
+# Index tăng dần cho cv_folder / jd_folder: manifest (path, mtime, size, hash) / file,
+# chỉ parse + embed file mới hoặc đã sửa, xoá vector của file đã bị xoá.
+import os, json, time, argparse, traceback
+from typing import Dict, Any, List, Tuple
+from config import INDEX_MANIFEST_DIR, INDEX_WATCH_INTERVAL
+from dataPreprocess.resumeParser import parse_resume, RESUME_EXTS
+from dataPreprocess.jobParser import parse_job_description
+from db.LlamaIndexAdapter import upsert_json_docs, delete_docs, make_doc_id, hash_file, source_path
+from db.embeddingSnapshot import refresh_existing as refresh_snapshots
+
+
+def _parse_cv(path: str) -> dict:
+    return parse_resume(path)
+
+
+def _parse_jd(path: str) -> dict:
+    with open(path, "r", encoding="utf8") as f:
+        return parse_job_description(f.read())
+
+
+_SOURCES = {
+    "cv": {"collection": "cv_collection", "exts": RESUME_EXTS, "parse": _parse_cv},
+    "jd": {"collection": "jd_collection", "exts": (".txt",), "parse": _parse_jd},
+}
+
+
+# ------------------ Manifest ------------------
+def _manifest_path(folder: str, kind: str) -> str:
+    name = os.path.basename(os.path.abspath(folder))
+    return os.path.join(INDEX_MANIFEST_DIR, f"{kind}_{name}.json")
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Manifest hỏng ({e}), index lại từ đầu: {path}")
+        return {}
+
+
+def save_manifest(path: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)  # ghi atomic, process khác không đọc được file dở dang
+
+
+# ------------------ Diff ------------------
+def scan_changes(folder: str, kind: str, manifest: Dict[str, Dict[str, Any]]) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[str], int]:
+    """
+    So folder với manifest. Trả về (changed, deleted, unchanged_count):
+    - changed: [(filename, entry mới)] cho file mới / sửa nội dung
+    - deleted: filename có trong manifest nhưng không còn trên đĩa
+    mtime + size giống → coi là không đổi, không cần đọc file để hash.
+    """
+    exts = _SOURCES[kind]["exts"]
+    changed, seen, unchanged = [], set(), 0
+    for file in sorted(os.listdir(folder)):
+        if not file.lower().endswith(exts):
+            continue
+        path = os.path.join(folder, file)
+        if not os.path.isfile(path):
+            continue
+        seen.add(file)
+        st = os.stat(path)
+        old = manifest.get(file)
+        if old and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+            unchanged += 1
+            continue
+        entry = {"path": path, "mtime": st.st_mtime, "size": st.st_size, "hash": hash_file(path)}
+        if old and old.get("hash") == entry["hash"]:
+            # chỉ bị touch → cập nhật mtime, không index lại
+            manifest[file] = {**old, **entry}
+            unchanged += 1
+            continue
+        changed.append((file, entry))
+    deleted = [f for f in manifest if f not in seen]
+    return changed, deleted, unchanged
+
+
+# ------------------ Sync ------------------
+def sync_folder(folder: str, kind: str, manifest_path: str = None) -> Dict[str, int]:
+    """Đồng bộ 1 lần folder → collection, chỉ tốn parse/LLM/embedding cho phần delta."""
+    source = _SOURCES[kind]
+    manifest_path = manifest_path or _manifest_path(folder, kind)
+    manifest = load_manifest(manifest_path)
+    stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+
+    changed, deleted, stats["unchanged"] = scan_changes(folder, kind, manifest)
+
+    if deleted:
+        delete_docs(source["collection"], [manifest[f]["doc_id"] for f in deleted if manifest[f].get("doc_id")])
+        for f in deleted:
+            manifest.pop(f, None)
+        stats["deleted"] = len(deleted)
+
+    items, parsed = [], []
+    for file, entry in changed:
+        print(f"🧾 Parsing {kind.upper()}: {file}")
+        try:
+            data = source["parse"](entry["path"])
+        except Exception as e:
+            print(f"❌ Error processing {file}: {e}")
+            traceback.print_exc()
+            stats["failed"] += 1
+            continue  # không ghi manifest → lần sau thử lại
+        meta = {"type": kind, "filename": file, "path": source_path(entry["path"]), "source_hash": entry["hash"]}
+        entry["doc_id"] = make_doc_id(meta)
+        items.append((data, meta))
+        parsed.append((file, entry))
+
+    if items:
+        upsert_json_docs(source["collection"], items)
+    for file, entry in parsed:
+        stats["updated" if file in manifest else "added"] += 1
+        manifest[file] = entry
+
+    save_manifest(manifest_path, manifest)
+    if deleted or parsed:
+        refresh_snapshots((source["collection"],))
+    print(f"✅ Sync '{folder}' → '{source['collection']}': {stats}")
+    return stats
+
+
+def watch_folders(targets: List[Tuple[str, str]], interval: float = None) -> None:
+    """Watcher chạy lâu dài: poll các folder mỗi `interval` giây và sync phần thay đổi."""
+    interval = interval or INDEX_WATCH_INTERVAL
+    print(f"👀 Watching {', '.join(f for f, _ in targets)} (every {interval}s)")
+    while True:
+        for folder, kind in targets:
+            try:
+                sync_folder(folder, kind)
+            except Exception as e:
+                print(f"❌ Sync failed for {folder}: {e}")
+                traceback.print_exc()
+        time.sleep(interval)
+
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Incremental CV/JD folder indexer")
+    ap.add_argument("--cv-folder", default="cv_folder")
+    ap.add_argument("--jd-folder", default="jd_folder")
+    ap.add_argument("--watch", action="store_true", help="chạy liên tục (polling)")
+    ap.add_argument("--interval", type=float, default=None)
+    args = ap.parse_args()
+
+    targets = [(f, k) for f, k in ((args.cv_folder, "cv"), (args.jd_folder, "jd")) if os.path.isdir(f)]
+    if args.watch:
+        watch_folders(targets, args.interval)
+    else:
+        for folder, kind in targets:
+            sync_folder(folder, kind)
@@ -0,0 +1,118 @@
+# hybridRetriever.py
+# Hybrid retrieval: pre-filter có cấu trúc (skill bắt buộc, số năm KN) đẩy xuống Chroma `where`,
+# sau đó trộn điểm vector với độ phủ skill + độ khớp số năm → ít ứng viên hơn nhưng tốt hơn cho Gemini re-rank.
+from typing import Any, Dict, Iterable, List, Optional
+from config import (
+    HYBRID_POOL_SIZE, HYBRID_VECTOR_WEIGHT, HYBRID_SKILL_WEIGHT, HYBRID_YEARS_WEIGHT, HYBRID_AUTO_YEARS_FILTER,
+    MULTIVECTOR_ENABLED, SKILL_PRESCREEN_MAX_IDS,
+)
+from db.LlamaIndexAdapter import retrieve_topk, ensure_structured_metadata, SKILL_INDEXED_COLLECTIONS
+from db.skillIndex import get_skill_index
+from logics.multiVectorRetriever import multi_vector_retrieve, has_field_vectors
+from logics.skills import (
+    is_cv, doc_skills, doc_years, normalize_skills, skill_key, skill_coverage, years_fit, parse_skills_meta,
+)
+
+
+def build_where(must_have: Iterable[str] = (), min_years: float = None, max_years: float = None) -> Optional[Dict[str, Any]]:
+    """Ghép điều kiện thành `where` của Chroma ($and khi có nhiều hơn 1 điều kiện)."""
+    conds = [{skill_key(sk): True} for sk in normalize_skills(must_have)]
+    if min_years:
+        conds.append({"years": {"$gte": float(min_years)}})
+    if max_years is not None:
+        conds.append({"years": {"$lte": float(max_years)}})
+    if not conds:
+        return None
+    return conds[0] if len(conds) == 1 else {"$and": conds}
+
+
+def _hit_skills_years(hit: Dict[str, Any]):
+    meta = hit["metadata"]
+    if "skills_norm" in meta:
+        return parse_skills_meta(meta["skills_norm"]), float(meta.get("years") or 0.0)
+    # document index trước khi có metadata có cấu trúc → tính từ _raw_json
+    return doc_skills(hit["data"]), doc_years(hit["data"])
+
+
+def fuse_scores(hits: List[Dict[str, Any]], query_data: Dict[str, Any], weights=None) -> List[Dict[str, Any]]:
+    """
+    Gắn "vector_score", "skill_coverage", "years_fit" và thay "score" bằng điểm trộn.
+    Query là JD → yêu cầu lấy từ query; query là CV → yêu cầu lấy từ từng JD trong hits.
+    """
+    wv, ws, wy = weights or (HYBRID_VECTOR_WEIGHT, HYBRID_SKILL_WEIGHT, HYBRID_YEARS_WEIGHT)
+    q_skills, q_years = doc_skills(query_data), doc_years(query_data)
+    query_is_jd = not is_cv(query_data)
+
+    for hit in hits:
+        h_skills, h_years = _hit_skills_years(hit)
+        if query_is_jd:
+            cov, yfit = skill_coverage(q_skills, h_skills), years_fit(q_years, h_years)
+        else:
+            cov, yfit = skill_coverage(h_skills, q_skills), years_fit(h_years, q_years)
+        hit["vector_score"] = hit.get("vector_score", hit["score"])
+        hit["skill_coverage"] = round(cov, 4)
+        hit["years_fit"] = round(yfit, 4)
+        hit["score"] = wv * hit["vector_score"] + ws * cov + wy * yfit
+
+    hits.sort(key=lambda h: (-h["score"], -h["vector_score"], h["id"]))
+    return hits
+
+
+def _vector_hits(collection_name, query_text, query_data, n, where, ids=None):
+    # multi-vector nếu đã bật và collection có vector field, ngược lại 1 vector / document
+    if MULTIVECTOR_ENABLED and has_field_vectors(collection_name):
+        return multi_vector_retrieve(collection_name, query_data, n, where=where, pool_size=n, ids=ids)
+    return retrieve_topk(collection_name, query_text, n, where=where, ids=ids)
+
+
+def _prescreen_ids(collection_name: str, must_have: List[str]) -> Optional[List[str]]:
+    """
+    Giao posting list must_have trong skill index → id CV đủ skill, ANN chỉ chạy trên các CV này.
+    None (không thu hẹp, Chroma `where` sk_* tự lọc) khi: collection không có index, giao rỗng (index có thể
+    chưa bắt kịp Chroma) hoặc quá SKILL_PRESCREEN_MAX_IDS id (danh sách ids= dài không còn rẻ hơn `where`).
+    """
+    if not must_have or collection_name not in SKILL_INDEXED_COLLECTIONS:
+        return None
+    ids = get_skill_index().intersect(must_have)
+    if not ids:
+        print(f"⚠️ Skill index không có document nào đủ skill: {', '.join(must_have)} → lọc bằng Chroma where")
+        return None
+    return ids if len(ids) <= SKILL_PRESCREEN_MAX_IDS else None
+
+
+def hybrid_retrieve(
+    collection_name: str,
+    query_text: str,
+    query_data: Dict[str, Any],
+    top_k: int = 5,
+    must_have: Iterable[str] = (),
+    min_years: float = None,
+    pool_size: int = None,
+    weights=None,
+) -> List[Dict[str, Any]]:
+    """
+    0) must_have → giao posting list trong skill index (CV) → ANN chỉ trên các id đó (_prescreen_ids)
+    1) `where` từ must_have / min_years (JD→CV) hoặc số năm của CV (CV→JD, JD yêu cầu <= số năm CV)
+    2) ANN lấy pool rộng hơn top_k  3) trộn điểm, trả top_k.
+    Lọc số năm tự động quá chặt (ít hơn top_k kết quả) → nới bỏ điều kiện số năm; must_have luôn giữ.
+    """
+    pool_size = max(top_k, pool_size or HYBRID_POOL_SIZE)
+    must_have = normalize_skills(must_have)
+    ids = _prescreen_ids(collection_name, must_have)
+    auto_min = auto_max = None
+    if HYBRID_AUTO_YEARS_FILTER and min_years is None:
+        if is_cv(query_data):
+            auto_max = doc_years(query_data) or None
+        else:
+            auto_min = doc_years(query_data) or None
+
+    where = build_where(must_have, min_years if min_years is not None else auto_min, auto_max)
+    if where is not None:
+        ensure_structured_metadata(collection_name)  # document cũ thiếu years / sk_* → bị `where` loại
+    hits = _vector_hits(collection_name, query_text, query_data, pool_size, where, ids)
+
+    if len(hits) < top_k and (auto_min or auto_max):
+        print(f"⚠️ Lọc số năm KN chỉ còn {len(hits)} kết quả, nới điều kiện.")
+        hits = _vector_hits(collection_name, query_text, query_data, pool_size, build_where(must_have, min_years), ids)
+
+    return fuse_scores(hits, query_data, weights)[:top_k]
@@ -1,11 +1,18 @@
 # llmEvaluate.py
 from google import generativeai as gemini
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, EVAL_BATCH_TOKEN_BUDGET
+from db.llmCache import make_key, cache_get, cache_set, cached_call
+from typing import Dict
 import json, re, traceback
 
 def _log(msg: str):
     print(msg.replace("```", "'''"))  # tránh highlight markdown
 
+_MODEL_NAME = "gemini-2.5-flash"
+# Đổi version khi sửa prompt → cache cũ tự động không còn được dùng
+_EVAL_PROMPT_VERSION = "eval-v1"
+_EVAL_BATCH_PROMPT_VERSION = "eval-batch-v2"
+
 # ------------------ Setup Gemini ------------------
 try:
     gemini.configure(api_key=GEMINI_API_KEY)
@@ -57,13 +64,40 @@ def _extract_json_block(text: str) -> str:
 
 
 def _sanitize_json_text(txt: str) -> str:
-    """Làm sạch text để tránh lỗi JSON: bỏ comment, ngoặc tròn, xuống dòng thừa."""
-    txt = re.sub(r'\([^)]*\)', '', txt)  # bỏ (comment)
-    txt = re.sub(r'//.*', '', txt)       # bỏ comment //
-    txt = re.sub(r'#.*', '', txt)        # bỏ comment #
-    txt = txt.replace('\n', ' ')         # gộp dòng
-    txt = txt.replace('\r', '')
-    return txt.strip()
+    """
+    Làm sạch text để tránh lỗi JSON: bỏ comment (//, #), ngoặc tròn chú thích, xuống dòng thừa.
+    Chỉ xử lý phần nằm NGOÀI chuỗi JSON — nội dung "reason" của model (vd. "Node.js (3 yrs)", "C#") giữ nguyên.
+    """
+    out, i, n, in_str = [], 0, len(txt), False
+    while i < n:
+        c = txt[i]
+        if in_str:
+            if c == "\\" and i + 1 < n:
+                out.append(txt[i:i + 2])
+                i += 2
+                continue
+            if c == '"':
+                in_str = False
+            if c != "\r":
+                out.append(" " if c == "\n" else c)  # xuống dòng thật trong chuỗi → JSON không hợp lệ
+            i += 1
+            continue
+        if c == '"':
+            in_str = True
+            out.append(c)
+        elif c == "(" and txt.find(")", i) != -1:  # bỏ (comment)
+            i = txt.find(")", i) + 1
+            continue
+        elif c == "#" or txt.startswith("//", i):  # bỏ comment tới hết dòng
+            j = txt.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        elif c == "\n":
+            out.append(" ")
+        elif c != "\r":
+            out.append(c)
+        i += 1
+    return "".join(out).strip()
 
 
 def _coerce_schema(obj: dict) -> dict:
@@ -87,12 +121,20 @@ def _coerce_schema(obj: dict) -> dict:
 
 
 # ------------------ Main Evaluation ------------------
-def evaluate_match(jd_text: str, cv_text: str):
-    _log("\n=== 🤖 EVALUATING MATCH WITH GEMINI ===")
+class _FailedResult(dict):
+    """Kết quả fallback khi Gemini lỗi / JSON hỏng: vẫn là dict cho caller nhưng không được lưu cache."""
+
+
+def _failed(reason: str) -> dict:
+    return _FailedResult(score=0, matched_skills=[], missing_skills=[], reason=reason)
+
+
+def _evaluate_match(jd_text: str, cv_text: str) -> dict:
+    """Gọi Gemini thật. Lỗi → _FailedResult (không cache)."""
     try:
         if not jd_text.strip() or not cv_text.strip():
             _log("⚠️ Empty JD or CV text, skipping evaluation.")
-            return {"score": 0, "matched_skills": [], "missing_skills": [], "reason": "Empty input text."}
+            return _failed("Empty input text.")
 
         prompt = f"""
 You are an experienced recruiter. Evaluate how well this CV fits the job.
@@ -112,14 +154,14 @@ Return ONLY valid JSON (no code fences, no markdown, no explanation):
 }}
 """
 
-        model = gemini.GenerativeModel("gemini-2.5-flash")
+        model = gemini.GenerativeModel(_MODEL_NAME)
         _log("🕐 Sending request to Gemini...")
         response = model.generate_content(prompt)
         raw = (response.text or "").strip()
 
         if not raw:
             _log("⚠️ Gemini returned empty response.")
-            return {"score": 0, "matched_skills": [], "missing_skills": [], "reason": "Gemini returned empty response"}
+            return _failed("Gemini returned empty response")
 
         _log("✅ Raw Gemini response (truncated if long):")
         _log(raw[:800] + ("..." if len(raw) > 800 else ""))
@@ -137,9 +179,144 @@ Return ONLY valid JSON (no code fences, no markdown, no explanation):
             _log(f"❌ JSON decode failed: {e}")
             _log("⚠️ Cleaned content fallback:")
             _log(cleaned[:400])
-            return {"score": 0, "matched_skills": [], "missing_skills": [], "reason": cleaned[:200]}
+            return _failed(cleaned[:200])
 
     except Exception as e:
         _log(f"❌ Unexpected error during LLM evaluation: {e}")
         traceback.print_exc()
-        return {"score": 0, "matched_skills": [], "missing_skills": [], "reason": str(e)[:200]}
+        return _failed(str(e)[:200])
+
+
+def evaluate_match(jd_text: str, cv_text: str):
+    _log("\n=== 🤖 EVALUATING MATCH WITH GEMINI ===")
+    # Cache giống parser JD / CV; chỉ lưu khi parse JSON thành công
+    return cached_call(
+        _MODEL_NAME, _EVAL_PROMPT_VERSION, (jd_text, cv_text),
+        lambda: _evaluate_match(jd_text, cv_text),
+        should_cache=lambda r: not isinstance(r, _FailedResult),
+    )
+
+
+# ------------------ Batch Evaluation ------------------
+_BATCH_PROMPT_HEAD = """
+You are an experienced recruiter. Evaluate how well EACH CV below fits the job.
+
+JD:
+{jd_text}
+
+CVs (each starts with a line "### CANDIDATE <id>"):
+"""
+
+_BATCH_PROMPT_TAIL = """
+Return ONLY a valid JSON array (no code fences, no markdown, no explanation), one object per candidate,
+using the exact candidate id given above:
+[
+  {
+    "id": "<candidate id>",
+    "score": 40-100,
+    "matched_skills": [],
+    "missing_skills": [],
+    "reason": "1-2 sentence summary"
+  }
+]
+"""  # nối thẳng vào prompt, không qua .format() → ngoặc nhọn đơn
+
+
+def _estimate_tokens(text: str) -> int:
+    """Ước lượng thô ~4 ký tự / token (đủ để chia batch, không cần tokenizer)."""
+    return len(text) // 4 + 1
+
+
+def _extract_json_array(text: str) -> str:
+    """Tìm khối [ ... ] ngoài cùng trong text (sau khi đã bỏ code fence)."""
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end <= start:
+        return text.strip()
+    return text[start:end + 1].strip()
+
+
+def _split_batches(jd_text: str, cvs: Dict[str, str], token_budget: int):
+    """Gom CV thành các batch sao cho prompt (JD + CVs + khung) không vượt token_budget."""
+    base = _estimate_tokens(_BATCH_PROMPT_HEAD.format(jd_text=jd_text) + _BATCH_PROMPT_TAIL)
+    batches, current, used = [], {}, base
+    for cid, cv_text in cvs.items():
+        cost = _estimate_tokens(f"### CANDIDATE {cid}\n{cv_text}\n")
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current, used = {}, base
+        current[cid] = cv_text
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _evaluate_one_batch(jd_text: str, cvs: Dict[str, str]) -> Dict[str, dict]:
+    body = "\n".join(f"### CANDIDATE {cid}\n{cv_text}\n" for cid, cv_text in cvs.items())
+    prompt = _BATCH_PROMPT_HEAD.format(jd_text=jd_text) + body + _BATCH_PROMPT_TAIL
+
+    model = gemini.GenerativeModel(_MODEL_NAME)
+    _log(f"🕐 Sending batch request to Gemini ({len(cvs)} CVs)...")
+    response = model.generate_content(prompt)
+    raw = (response.text or "").strip()
+    if not raw:
+        _log("⚠️ Gemini returned empty batch response.")
+        return {}
+
+    cleaned = _extract_json_array(_strip_code_fence(raw))
+    try:
+        parsed = json.loads(cleaned)
+    except json.JSONDecodeError:
+        try:
+            parsed = json.loads(_sanitize_json_text(cleaned))
+        except json.JSONDecodeError as e:
+            _log(f"❌ Batch JSON decode failed: {e}")
+            _log(cleaned[:400])
+            return {}
+
+    out = {}
+    for item in parsed if isinstance(parsed, list) else []:
+        if isinstance(item, dict) and str(item.get("id", "")) in cvs:
+            out[str(item["id"])] = _coerce_schema(item)
+    return out
+
+
+def evaluate_match_batch(jd_text: str, cvs: Dict[str, str], token_budget: int = None) -> Dict[str, dict]:
+    """
+    Chấm N CV với 1 JD trong 1 request (JD chỉ gửi 1 lần).
+    cvs: {candidate_id: cv_text}. Trả về {candidate_id: result theo _coerce_schema}, đúng thứ tự input.
+    Tự chia batch khi prompt vượt token_budget; id nào thiếu trong response → fallback evaluate_match.
+    """
+    _log(f"\n=== 🤖 BATCH EVALUATING {len(cvs)} CVs WITH GEMINI ===")
+    token_budget = token_budget or EVAL_BATCH_TOKEN_BUDGET
+    cvs = {str(cid): text or "" for cid, text in cvs.items()}
+    results: Dict[str, dict] = {}
+
+    keys = {cid: make_key(_MODEL_NAME, _EVAL_BATCH_PROMPT_VERSION, jd_text, t) for cid, t in cvs.items()}
+    for cid, key in keys.items():
+        cached = cache_get(key)
+        if cached is not None:
+            results[cid] = cached
+    if results:
+        _log(f"⚡ {len(results)} cache hit(s), skipping them in batch prompt.")
+
+    pending = {cid: t for cid, t in cvs.items() if t.strip() and cid not in results}
+    if jd_text.strip() and pending:
+        for batch in _split_batches(jd_text, pending, token_budget):
+            try:
+                batch_results = _evaluate_one_batch(jd_text, batch)
+                for cid, res in batch_results.items():
+                    cache_set(keys[cid], res)
+                results.update(batch_results)
+            except Exception as e:
+                _log(f"❌ Batch evaluation failed, falling back per candidate: {e}")
+                traceback.print_exc()
+
+    missing = [cid for cid in cvs if cid not in results]
+    if missing:
+        _log(f"⚠️ {len(missing)} candidate(s) missing from batch response, evaluating individually.")
+    for cid in missing:
+        results[cid] = evaluate_match(jd_text, cvs[cid])
+
+    return {cid: results[cid] for cid in cvs}
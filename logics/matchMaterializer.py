@@ -0,0 +1,178 @@
+# matchMaterializer.py
+# Giữ bảng match JD → top-N CV (db/matchTable.py) luôn mới mà không chạy lại toàn bộ pipeline:
+# - JD mới / đổi → 1 lần hybrid retrieval + evaluate cho riêng JD đó
+# - CV mới / đổi → chỉ chấm CV đó với các JD đã có; chỉ gọi Gemini khi CV lọt được vào top-N của JD
+# - CV / JD bị xoá → xoá dòng tương ứng
+import json, argparse, traceback
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import MATCH_TABLE_ENABLED, MATCH_TABLE_TOP_N, MATCH_ADHOC_TTL
+from db import matchTable
+from db.LlamaIndexAdapter import get_docs, iter_collection, to_hit
+from logics.embedder import encode_texts
+from logics.hybridRetriever import hybrid_retrieve, fuse_scores
+from logics.reranker import rerank
+
+
+def _target(meta: Dict[str, Any]) -> str:
+    # cùng quy tắc đặt tên target với find_best_candidates
+    return meta.get("filename") or meta.get("id") or "UNKNOWN"
+
+
+# =======================================================
+# ⚡ Đọc bảng (find_best_candidates)
+# =======================================================
+def lookup_matches(jd_text_norm: str, top_k: int) -> Optional[List[Dict[str, Any]]]:
+    """Kết quả đã lưu nếu JD chuẩn hoá trùng 1 JD trong bảng và có ít nhất 1 match, ngược lại None."""
+    if not MATCH_TABLE_ENABLED:
+        return None
+    try:
+        jd_id = matchTable.find_jd(matchTable.norm_key(jd_text_norm))
+        return (matchTable.get_matches(jd_id, top_k) or None) if jd_id else None
+    except Exception as e:
+        print(f"⚠️ Match table lookup failed: {e}")
+        return None
+
+
+def _evaluated(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Bỏ kết quả chấm lỗi: evaluate_match không raise mà trả _FailedResult (score 0, reason = lỗi Gemini),
+    rerank giữ nguyên như 1 đánh giá thường → không được ghi vào bảng như điểm thật.
+    """
+    from logics.llmEvaluate import _FailedResult  # import trễ như reranker (không cần Gemini SDK khi import module)
+    return [r for r in results if not isinstance(r["evaluation"], _FailedResult)]
+
+
+def remember(jd_text_norm: str, jd_json: Dict[str, Any], hits: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+    """
+    Lưu kết quả vừa tính của 1 JD ngoài jd_collection (vd. bài đăng Mastodon) → lần sau trả ngay.
+    Chỉ lưu khi mọi hit đều chấm được (không lỗi / timeout), tránh kết quả thiếu thành câu trả lời cố định.
+    """
+    if not MATCH_TABLE_ENABLED or not results:
+        return
+    results = _evaluated(results)
+    if len(results) < len(hits):
+        print(f"⚠️ {len(hits) - len(results)} candidate(s) not evaluated, match table not updated.")
+        return
+    try:
+        key = matchTable.norm_key(jd_text_norm)
+        jd_id = matchTable.find_jd(key) or f"adhoc:{key[:24]}"
+        _store(jd_id, key, jd_text_norm, jd_json, encode_texts([jd_text_norm])[0], hits, results)
+    except Exception as e:
+        print(f"⚠️ Match table write failed: {e}")
+
+
+def _store(jd_id, key, jd_text, jd_json, vector, hits, results):
+    # results mang "id" của hit (candidate truyền "id" qua rerank) → không đụng nhau khi 2 CV trùng filename
+    results = _evaluated(results)
+    if hits and not results:
+        return  # có ứng viên nhưng không chấm được (vd. Gemini lỗi) → giữ nguyên bảng cũ
+    matchTable.put_jd(jd_id, key, jd_text, jd_json, vector)
+    matchTable.replace_matches(jd_id, [(r["id"], r) for r in results if r.get("id")])
+
+
+# =======================================================
+# 🔄 Incremental refresh
+# =======================================================
+def refresh_jd(jd_id: str, top_n: int = None) -> int:
+    """Tính lại toàn bộ top-N cho 1 JD của jd_collection (JD bị xoá → xoá khỏi bảng)."""
+    top_n = top_n or MATCH_TABLE_TOP_N
+    res = get_docs("jd_collection", [jd_id], ("embeddings", "documents", "metadatas"))
+    if not res["ids"]:
+        matchTable.delete_jd(jd_id)
+        return 0
+    jd_hit = to_hit(jd_id, res["documents"][0], res["metadatas"][0], 0.0)
+    hits = hybrid_retrieve("cv_collection", jd_hit["text"], jd_hit["data"], top_k=top_n)
+    candidates = [{"id": h["id"], "target": _target(h["metadata"]), "similarity": round(h["score"], 4),
+                   "jd_text": jd_hit["text"], "cv_text": h["text"]} for h in hits]
+    results = _evaluated(rerank(candidates))
+    if len(results) < len(candidates):  # refresh_pending đưa lại vào pending, bảng cũ giữ nguyên
+        raise RuntimeError(f"{len(candidates) - len(results)} candidate(s) not evaluated for JD {jd_id}")
+    _store(jd_id, matchTable.norm_key(jd_hit["text"]), jd_hit["text"], jd_hit["data"], res["embeddings"][0],
+           hits, results)
+    print(f"✅ Materialized {len(results)} matches for JD {jd_id}")
+    return len(results)
+
+
+def refresh_cv(cv_id: str, top_n: int = None) -> int:
+    """
+    Chấm 1 CV với mọi JD trong bảng; chỉ gọi Gemini cho JD mà CV vượt ngưỡng similarity của top-N hiện tại.
+    JD ad-hoc (bài Mastodon) quá MATCH_ADHOC_TTL bị xoá trước → số JD phải chấm không tăng mãi.
+    """
+    top_n = top_n or MATCH_TABLE_TOP_N
+    matchTable.purge_adhoc(MATCH_ADHOC_TTL)
+    matchTable.delete_cv(cv_id)  # điểm cũ của CV (nếu CV đổi nội dung) không còn đúng
+    res = get_docs("cv_collection", [cv_id], ("embeddings", "documents", "metadatas"))
+    if not res["ids"]:
+        return 0
+    cv_vec = np.asarray(res["embeddings"][0], dtype=np.float32)
+    cv_doc, cv_meta = res["documents"][0], res["metadatas"][0]
+
+    candidates = []
+    for jd in matchTable.iter_jds():
+        if jd["vector"] is None or len(jd["vector"]) != len(cv_vec):
+            continue
+        dist = float(((jd["vector"] - cv_vec) ** 2).sum())  # L2², cùng metric với Chroma
+        hit = fuse_scores([to_hit(cv_id, cv_doc, cv_meta, dist)], jd["jd_json"])[0]
+        similarity = round(hit["score"], 4)
+        floor = matchTable.admission_floor(jd["jd_id"], top_n)
+        if floor is not None and similarity <= floor:
+            continue
+        # id = jd_id để map kết quả rerank về đúng JD
+        candidates.append({"id": jd["jd_id"], "target": _target(cv_meta), "similarity": similarity,
+                           "jd_text": jd["jd_text"], "cv_text": cv_doc})
+
+    results = _evaluated(rerank(candidates))
+    for r in results:
+        matchTable.add_match(r["id"], cv_id, r, top_n)
+    if len(results) < len(candidates):  # refresh_pending đưa lại vào pending; JD đã chấm lấy lại từ llm cache
+        raise RuntimeError(f"{len(candidates) - len(results)} JD(s) not evaluated for CV {cv_id}")
+    print(f"✅ CV {cv_id}: evaluated against {len(candidates)} JD(s)")
+    return len(candidates)
+
+
+def refresh_pending(limit: int = 50) -> int:
+    """Xử lý các CV/JD adapter đã ghi vào pending. Lỗi → ghi lại pending để lần sau thử lại."""
+    done = 0
+    for kind, doc_id, op in matchTable.take_pending(limit):
+        try:
+            if kind == "jd":
+                refresh_jd(doc_id)
+            elif op == "delete":
+                matchTable.delete_cv(doc_id)
+            else:
+                refresh_cv(doc_id)
+            done += 1
+        except Exception as e:
+            print(f"❌ Match refresh failed for {kind} {doc_id}: {e}")
+            traceback.print_exc()
+            matchTable.mark_pending(f"{kind}_collection", [doc_id], op)
+    return done
+
+
+def materialize_all(top_n: int = None, force: bool = False) -> int:
+    """Dựng bảng cho mọi JD trong jd_collection (JD đã có và không đổi nội dung → bỏ qua, trừ khi force)."""
+    count = 0
+    for page in iter_collection("jd_collection", ("documents",)):
+        for jd_id, doc in zip(page["ids"], page["documents"]):
+            stored = matchTable.get_jd(jd_id)
+            if not force and stored and stored["norm_key"] == matchTable.norm_key(doc):
+                continue
+            refresh_jd(jd_id, top_n)
+            count += 1
+    return count
+
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bảng match JD → top-N CV tính sẵn.")
+    ap.add_argument("--all", action="store_true", help="dựng bảng cho mọi JD trong jd_collection")
+    ap.add_argument("--force", action="store_true", help="tính lại cả JD không đổi")
+    ap.add_argument("--refresh", action="store_true", help="xử lý CV/JD pending (mới upsert / xoá)")
+    args = ap.parse_args()
+    if args.all:
+        print(f"✅ Materialized {materialize_all(force=args.force)} JD(s)")
+    if args.refresh:
+        while refresh_pending():
+            pass
+    print(json.dumps(matchTable.table_stats()))
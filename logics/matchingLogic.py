@@ -1,9 +1,16 @@
 import os, json, traceback
 from dataPreprocess.resumeParser import parse_resume
 from dataPreprocess.jobParser import parse_job_description
-from db.LlamaIndexAdapter import upsert_json_doc, query_topk
+from db.LlamaIndexAdapter import upsert_json_docs, hash_file, load_if_unchanged, source_path
+from db.embeddingSnapshot import refresh_existing as refresh_snapshots
 from logics.embedder import json_to_text_auto
-from logics.llmEvaluate import evaluate_match
+from logics.llmEvaluate import evaluate_match, _FailedResult
+from logics.reranker import rerank, rerank_batch
+from logics.hybridRetriever import hybrid_retrieve
+from logics.preRanker import pre_rank, resolve_pre_ranker
+from logics.adaptiveTopK import MatchBudget, select_for_eval
+from logics.matchMaterializer import lookup_matches, remember as remember_matches
+from config import EVAL_BATCH_MODE, PRERANK_POOL_SIZE, ADAPTIVE_MAX_K
 
 
 # =========================
@@ -13,18 +20,27 @@ def index_all_cvs(cv_folder="cv_folder"):
     cvs = []
     print("\n=== 📥 INDEXING CVS ===")
     try:
+        items = []
         for file in os.listdir(cv_folder):
             if not file.lower().endswith(".pdf"):
                 continue
             path = os.path.join(cv_folder, file)
-            print(f"🧾 Parsing CV: {file}")
             try:
+                meta = {"type": "cv", "filename": file, "path": source_path(path), "source_hash": hash_file(path)}
+                cv_json = load_if_unchanged("cv_collection", meta, meta["source_hash"])
+                if cv_json is not None:
+                    print(f"⏭️ Unchanged CV, skipped: {file}")
+                    cvs.append(cv_json)
+                    continue
+                print(f"🧾 Parsing CV: {file}")
                 cv_json = parse_resume(path)
-                upsert_json_doc("cv_collection", cv_json, {"type": "cv", "filename": file})
+                items.append((cv_json, meta))
                 cvs.append(cv_json)
             except Exception as e:
                 print(f"❌ Error processing {file}: {e}")
                 traceback.print_exc()
+        upsert_json_docs("cv_collection", items)
+        refresh_snapshots(("cv_collection",))
         print(f"✅ Indexed {len(cvs)} CVs successfully.")
     except Exception as e:
         print(f"❌ Fatal error while indexing CVs: {e}")
@@ -36,19 +52,28 @@ def index_all_jds(jd_folder="jd_folder"):
     jds = []
     print("\n=== 📥 INDEXING JDS ===")
     try:
+        items = []
         for file in os.listdir(jd_folder):
             if not file.lower().endswith(".txt"):
                 continue
             path = os.path.join(jd_folder, file)
-            print(f"🧾 Parsing JD: {file}")
             try:
+                meta = {"type": "jd", "filename": file, "path": source_path(path), "source_hash": hash_file(path)}
+                jd_json = load_if_unchanged("jd_collection", meta, meta["source_hash"])
+                if jd_json is not None:
+                    print(f"⏭️ Unchanged JD, skipped: {file}")
+                    jds.append(jd_json)
+                    continue
+                print(f"🧾 Parsing JD: {file}")
                 jd_text = open(path, "r", encoding="utf8").read()
                 jd_json = parse_job_description(jd_text)
-                upsert_json_doc("jd_collection", jd_json, {"type": "jd", "filename": file})
+                items.append((jd_json, meta))
                 jds.append(jd_json)
             except Exception as e:
                 print(f"❌ Error processing {file}: {e}")
                 traceback.print_exc()
+        upsert_json_docs("jd_collection", items)
+        refresh_snapshots(("jd_collection",))
         print(f"✅ Indexed {len(jds)} JDs successfully.")
     except Exception as e:
         print(f"❌ Fatal error while indexing JDs: {e}")
@@ -56,36 +81,84 @@ def index_all_jds(jd_folder="jd_folder"):
     return jds
 
 
+def _retrieve_for_eval(collection_name, query_text, query_data, top_k, max_k, pre_ranker, pool_size, budget, **filters):
+    """
+    Lấy hit theo thứ tự điểm rồi chọn số lượng gửi Gemini (adaptive_cutoff + budget):
+    - không pre-ranker → max_k hit từ hybrid_retrieve
+    - có pre-ranker → pool rộng (pool_size, mặc định PRERANK_POOL_SIZE), chấm lại cục bộ, giữ max_k
+    """
+    max_k = max(top_k, max_k or ADAPTIVE_MAX_K)
+    ranker = resolve_pre_ranker(pre_ranker)
+    if ranker is None:
+        hits = hybrid_retrieve(collection_name, query_text, query_data, top_k=max_k, **filters)
+    else:
+        pool_size = max(max_k, pool_size or PRERANK_POOL_SIZE)
+        hits = hybrid_retrieve(collection_name, query_text, query_data, top_k=pool_size, pool_size=pool_size, **filters)
+        hits = pre_rank(query_text, query_data, hits, keep=max_k, ranker=ranker)
+    return select_for_eval(hits, top_k, budget, max_k=max_k)
+
+
+def _evaluate(candidates, budget, batch=False):
+    if budget.expired():
+        print(f"⏱️ Wall-time budget exhausted before evaluation ({budget.elapsed():.1f}s), skipped.")
+        return []
+    if batch:
+        print(f"\n🧠 Evaluating {len(candidates)} candidates in batch prompt...")
+        return rerank_batch(candidates, deadline=budget.deadline)
+    print(f"\n🧠 Evaluating {len(candidates)} candidates concurrently...")
+    return rerank(candidates, evaluate_fn=evaluate_match, deadline=budget.deadline)
+
+
 # =========================
 # 2️⃣ Find best candidates
 # =========================
-def find_best_candidates(jd_text: str):
+def find_best_candidates(
+    jd_text: str, must_have=(), min_years=None, top_k=5, pre_ranker=None, pool_size=None,
+    max_k=None, max_llm_calls=None, max_wall_time=None, raise_errors=False,
+):
+    """
+    must_have: skill bắt buộc (lọc cứng trong Chroma), min_years: số năm KN tối thiểu
+    (mặc định lấy từ years_of_experience của JD, tự nới nếu quá ít ứng viên).
+    pre_ranker: "features" / "cross-encoder" / callable / "none" (mặc định PRERANK_MODE) →
+    lấy pool_size ứng viên, chỉ ứng viên tốt nhất được gửi cho Gemini.
+    top_k là số ứng viên dự kiến: ít hơn nếu điểm thấp / tụt xa hit đầu, tới max_k nếu điểm sát nhau.
+    max_llm_calls / max_wall_time: budget của request (mặc định MATCH_MAX_LLM_CALLS / MATCH_MAX_WALL_TIME).
+    Không có must_have / min_years và JD chuẩn hoá trùng 1 JD trong bảng match (db/matchTable.py) → trả ngay từ bảng.
+    raise_errors: lỗi (Gemini / Chroma) hoặc có ứng viên nhưng không ai chấm được → raise thay vì trả []
+    (job worker dùng để phân biệt lỗi tạm thời với "không có ứng viên" và retry).
+    """
     print("\n=== 🧩 FIND BEST CANDIDATES ===")
+    budget = MatchBudget(max_llm_calls, max_wall_time)
     try:
         jd_json = parse_job_description(jd_text)
         jd_text_norm = json_to_text_auto(jd_json)
-        print("🔎 Querying top CVs from collection...")
-        nodes = query_topk("cv_collection", jd_text_norm, top_k=5)
-        print(f"✅ Retrieved {len(nodes)} candidates from vector DB.")
-
-        results = []
-        for node in nodes:
-            try:
-                cv_text = node.node.get_text()
-                cv_meta = node.node.metadata or {}
-                name = cv_meta.get("filename") or cv_meta.get("id") or "UNKNOWN"
-                print(f"\n🧠 Evaluating {name}")
-                eval_result = evaluate_match(jd_text_norm, cv_text)
-                results.append({
-                    "target": name,
-                    "similarity": round(node.score, 4),
-                    "evaluation": eval_result
-                })
-            except Exception as e:
-                print(f"❌ Error evaluating candidate: {e}")
-                traceback.print_exc()
-
-        results.sort(key=lambda x: x["evaluation"].get("score", 0), reverse=True)
+        use_table = not must_have and min_years is None
+        if use_table:
+            stored = lookup_matches(jd_text_norm, top_k)
+            if stored is not None:
+                print(f"⚡ JD đã có trong bảng match, trả {len(stored)} kết quả tính sẵn.")
+                return stored
+        print("🔎 Querying top CVs from collection (hybrid)...")
+        hits = _retrieve_for_eval("cv_collection", jd_text_norm, jd_json, top_k, max_k, pre_ranker, pool_size, budget,
+                                  must_have=must_have, min_years=min_years)
+        print(f"✅ Retrieved {len(hits)} candidates from vector DB.")
+
+        candidates = []
+        for hit in hits:
+            cv_meta = hit["metadata"]
+            candidates.append({
+                "id": hit["id"],
+                "target": cv_meta.get("filename") or cv_meta.get("id") or "UNKNOWN",
+                "similarity": round(hit["score"], 4),
+                "jd_text": jd_text_norm,
+                "cv_text": hit["text"],
+            })
+
+        results = _evaluate(candidates, budget, batch=EVAL_BATCH_MODE)
+        if raise_errors and candidates and all(isinstance(r["evaluation"], _FailedResult) for r in results):
+            raise RuntimeError(f"none of {len(candidates)} candidate(s) could be evaluated")
+        if use_table:
+            remember_matches(jd_text_norm, jd_json, hits, results)
 
         print("\n🏆 TOP MATCHED CANDIDATES")
         for i, r in enumerate(results):
@@ -97,39 +170,36 @@ def find_best_candidates(jd_text: str):
     except Exception as e:
         print(f"❌ Fatal error in find_best_candidates: {e}")
         traceback.print_exc()
+        if raise_errors:
+            raise
         return []
 
 
 # =========================
 # 3️⃣ Find best jobs
 # =========================
-def find_best_jobs(cv_path: str):
+def find_best_jobs(cv_path: str, top_k=5, pre_ranker=None, pool_size=None, max_k=None, max_llm_calls=None, max_wall_time=None):
     print("\n=== 🧩 FIND BEST JOBS ===")
+    budget = MatchBudget(max_llm_calls, max_wall_time)
     try:
         cv_json = parse_resume(cv_path)
         cv_text_norm = json_to_text_auto(cv_json)
-        print("🔎 Querying top JDs from collection...")
-        nodes = query_topk("jd_collection", cv_text_norm, top_k=5)
-        print(f"✅ Retrieved {len(nodes)} JDs from vector DB.")
-
-        results = []
-        for node in nodes:
-            try:
-                jd_text = node.node.get_text()
-                jd_meta = node.node.metadata or {}
-                name = jd_meta.get("filename") or jd_meta.get("id") or "UNKNOWN"
-                print(f"\n🧠 Evaluating {name}")
-                eval_result = evaluate_match(jd_text, cv_text_norm)
-                results.append({
-                    "target": name,
-                    "similarity": round(node.score, 4),
-                    "evaluation": eval_result
-                })
-            except Exception as e:
-                print(f"❌ Error evaluating JD: {e}")
-                traceback.print_exc()
-
-        results.sort(key=lambda x: x["evaluation"].get("score", 0), reverse=True)
+        print("🔎 Querying top JDs from collection (hybrid)...")
+        hits = _retrieve_for_eval("jd_collection", cv_text_norm, cv_json, top_k, max_k, pre_ranker, pool_size, budget)
+        print(f"✅ Retrieved {len(hits)} JDs from vector DB.")
+
+        candidates = []
+        for hit in hits:
+            jd_meta = hit["metadata"]
+            candidates.append({
+                "id": hit["id"],
+                "target": jd_meta.get("filename") or jd_meta.get("id") or "UNKNOWN",
+                "similarity": round(hit["score"], 4),
+                "jd_text": hit["text"],
+                "cv_text": cv_text_norm,
+            })
+
+        results = _evaluate(candidates, budget)
 
         print("\n🏆 TOP MATCHED JOBS")
         for i, r in enumerate(results):
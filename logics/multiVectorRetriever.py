@@ -0,0 +1,111 @@
+# multiVectorRetriever.py
+# Retrieval multi-vector: mỗi CV/JD có vector riêng cho skills / experience / projects / summary (cùng parent id).
+# 1) ANN theo từng field → tập parent ứng viên  2) chấm chính xác: max-sim trong mỗi field, gộp các field
+#    bằng tổng có trọng số ("weighted") hoặc lấy field tốt nhất ("max").
+import math, argparse, json
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config import MULTIVECTOR_AGG, MULTIVECTOR_WEIGHTS, HYBRID_POOL_SIZE, EMBED_BATCH_SIZE
+from db.LlamaIndexAdapter import (
+    query_field_parents, get_field_vectors, get_docs, to_hit, iter_collection, upsert_field_vectors,
+    count_field_vectors,
+)
+from logics.embedder import json_to_fields, encode_texts
+
+
+def field_similarity(query_vecs: np.ndarray, doc_vecs: np.ndarray) -> float:
+    """Max-sim giữa các vector query và vector document của 1 field, cùng thang exp(-L2²) với Chroma."""
+    d = ((query_vecs[:, None, :] - doc_vecs[None, :, :]) ** 2).sum(axis=2)
+    return math.exp(-float(d.min()))
+
+
+def aggregate(field_scores: Dict[str, float], weights: Dict[str, float], agg: str) -> float:
+    if agg == "max":
+        return max((field_scores.get(f, 0.0) for f in weights), default=0.0)
+    total = sum(weights.values())
+    return sum(w * field_scores.get(f, 0.0) for f, w in weights.items()) / total if total else 0.0
+
+
+def multi_vector_retrieve(
+    collection_name: str,
+    query_data: Dict[str, Any],
+    top_k: int = 5,
+    where: Optional[Dict[str, Any]] = None,
+    weights: Optional[Dict[str, float]] = None,
+    agg: str = None,
+    pool_size: int = None,
+    ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Cùng format với retrieve_topk ({id, score, text, metadata, data}), thêm "field_scores".
+    `ids`: chỉ xét các parent này (như retrieve_topk).
+    Trọng số chỉ tính trên các field mà query có (JD không có projects → bỏ, chuẩn hoá lại).
+    """
+    agg = agg or MULTIVECTOR_AGG
+    pool_size = max(top_k, pool_size or HYBRID_POOL_SIZE)
+    fields = json_to_fields(query_data)
+    weights = {f: w for f, w in (weights or MULTIVECTOR_WEIGHTS).items() if w > 0 and fields.get(f)}
+    if not weights:
+        return []
+
+    # encode mọi text field của query trong 1 lần
+    texts = [t for f in weights for t in fields[f]]
+    vecs = encode_texts(texts, batch_size=EMBED_BATCH_SIZE)
+    query_vecs, start = {}, 0
+    for f in weights:
+        query_vecs[f] = vecs[start:start + len(fields[f])]
+        start += len(fields[f])
+
+    candidates: List[str] = []
+    for f in weights:
+        candidates.extend(query_field_parents(collection_name, f, query_vecs[f], pool_size, where, ids))
+    candidates = list(dict.fromkeys(candidates))
+    if not candidates:
+        return []
+
+    scored = []
+    for parent_id, doc_fields in get_field_vectors(collection_name, candidates).items():
+        field_scores = {
+            f: field_similarity(query_vecs[f], np.asarray(doc_fields[f], dtype=np.float32))
+            for f in weights if doc_fields.get(f)
+        }
+        scored.append((aggregate(field_scores, weights, agg), parent_id, field_scores))
+    scored.sort(key=lambda x: (-x[0], x[1]))
+    scored = scored[:top_k]
+
+    res = get_docs(collection_name, [p for _, p, _ in scored], ("documents", "metadatas"))
+    parents = {i: (t, m) for i, t, m in zip(res["ids"], res["documents"], res["metadatas"])}
+    hits = []
+    for score, parent_id, field_scores in scored:
+        if parent_id not in parents:
+            continue  # parent đã bị xoá, vector field chưa kịp dọn
+        hit = to_hit(parent_id, *parents[parent_id], None)
+        hit["score"] = score
+        hit["field_scores"] = {f: round(s, 4) for f, s in field_scores.items()}
+        hits.append(hit)
+    return hits
+
+
+def reindex_fields(collection_name: str, page_size: int = 500) -> int:
+    """Tạo vector field cho document đã index trước khi bật MULTIVECTOR_ENABLED (encode theo lô, không gọi LLM)."""
+    total = 0
+    for page in iter_collection(collection_name, ("metadatas",), page_size):
+        total += upsert_field_vectors(collection_name, dict(zip(page["ids"], page.get("metadatas") or [])))
+        print(f"✅ {total} field vectors written for '{collection_name}'")
+    return total
+
+
+def has_field_vectors(collection_name: str) -> bool:
+    try:
+        return count_field_vectors(collection_name) > 0
+    except Exception:
+        return False
+
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Vector theo field cho CV/JD.")
+    ap.add_argument("--reindex", nargs="*", metavar="COLLECTION", help="tạo lại vector field từ _raw_json")
+    args = ap.parse_args()
+    for name in args.reindex or []:
+        print(json.dumps({name: reindex_fields(name)}))
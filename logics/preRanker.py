@@ -0,0 +1,241 @@
+# preRanker.py
+# Pre-rank cục bộ (CPU, không gọi LLM) giữa retrieval và Gemini:
+# lấy pool rộng (vd. top-50) từ vector DB, chấm điểm rẻ, chỉ gửi N ứng viên tốt nhất cho evaluate_match.
+import math, re, threading, time, traceback
+from typing import Any, Callable, Dict, List, Optional, Union
+from config import PRERANK_MODE, PRERANK_CROSS_ENCODER_MODEL, EMBED_BATCH_SIZE
+from logics.skills import (
+    is_cv, cv_skills, cv_total_years, jd_skills, jd_min_years, normalize_skills, skill_coverage, years_fit,
+)
+
+# Pre-ranker = callable(query_text, query_data, hits) -> list điểm (cùng thứ tự hits, càng lớn càng tốt).
+# hits: format của retrieve_topk / hybrid_retrieve ({"id", "score", "text", "metadata", "data", ...}).
+PreRanker = Callable[[str, Dict[str, Any], List[Dict[str, Any]]], List[float]]
+
+
+# =======================================================
+# 🧮 Feature-based scorer (skill overlap / năm KN / role trên JSON đã parse)
+# =======================================================
+_WORD_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+def _words(text: str) -> set:
+    return set(_WORD_RE.findall((text or "").lower()))
+
+
+def _pair(query_data: Dict[str, Any], hit: Dict[str, Any]):
+    """(jd, cv) theo đúng chiều, bất kể query là JD hay CV."""
+    other = hit.get("data") or {}
+    return (other, query_data) if is_cv(query_data) else (query_data, other)
+
+
+def pair_features(jd: Dict[str, Any], cv: Dict[str, Any]) -> Dict[str, float]:
+    cv_sk = cv_skills(cv)
+    roles = " ".join(str(e.get("role", "")) for e in cv.get("experiences", []) or [] if isinstance(e, dict))
+    title_words = _words(jd.get("title", ""))
+    nice = normalize_skills(jd.get("nice_to_have", []) or [])
+    return {
+        "required": skill_coverage(jd_skills(jd), cv_sk),
+        "nice": skill_coverage(nice, cv_sk) if nice else 0.0,
+        "years": years_fit(jd_min_years(jd), cv_total_years(cv)),
+        "role": len(title_words & _words(roles)) / len(title_words) if title_words else 0.0,
+    }
+
+
+class FeaturePreRanker:
+    """Tổ hợp tuyến tính: điểm vector + độ phủ skill bắt buộc / nice-to-have + năm KN + trùng chức danh."""
+
+    name = "features"
+    DEFAULT_WEIGHTS = {"vector": 0.35, "required": 0.35, "nice": 0.1, "years": 0.1, "role": 0.1}
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+
+    def __call__(self, query_text, query_data, hits):
+        scores = []
+        for hit in hits:
+            feats = pair_features(*_pair(query_data, hit))
+            feats["vector"] = hit.get("vector_score", hit.get("score", 0.0))
+            scores.append(sum(w * feats.get(k, 0.0) for k, w in self.weights.items()))
+        return scores
+
+
+# =======================================================
+# 🔬 Cross-encoder (sentence-transformers, CPU, load lười)
+# =======================================================
+class CrossEncoderPreRanker:
+    """Chấm từng cặp (query, document) bằng cross-encoder nhỏ; logit → sigmoid (0..1)."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str = None, batch_size: int = None):
+        self.model_name = model_name or PRERANK_CROSS_ENCODER_MODEL
+        self.batch_size = batch_size or EMBED_BATCH_SIZE
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                    print(f"✅ Cross-encoder loaded: {self.model_name}")
+        return self._model
+
+    def __call__(self, query_text, query_data, hits):
+        if not hits:
+            return []
+        logits = self._get_model().predict(
+            [(query_text, h.get("text", "")) for h in hits],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        return [1.0 / (1.0 + math.exp(-float(x))) for x in logits]
+
+
+# =======================================================
+# 🔌 Registry + resolve theo từng lần gọi
+# =======================================================
+_REGISTRY: Dict[str, Callable[[], PreRanker]] = {
+    "features": FeaturePreRanker,
+    "cross-encoder": CrossEncoderPreRanker,
+}
+_instances: Dict[str, PreRanker] = {}
+_instances_lock = threading.Lock()
+
+
+def register_pre_ranker(name: str, factory: Callable[[], PreRanker]):
+    """Đăng ký pre-ranker mới (factory được gọi 1 lần / process)."""
+    with _instances_lock:
+        _REGISTRY[name] = factory
+        _instances.pop(name, None)
+
+
+def resolve_pre_ranker(ranker: Union[str, PreRanker, None] = None) -> Optional[PreRanker]:
+    """None → PRERANK_MODE; "none"/"" → tắt; tên đã đăng ký → instance dùng chung; callable → dùng luôn."""
+    if ranker is None:
+        ranker = PRERANK_MODE
+    if callable(ranker):
+        return ranker
+    if not ranker or ranker == "none":
+        return None
+    if ranker not in _REGISTRY:
+        raise ValueError(f"Unknown pre-ranker: {ranker} (có: {', '.join(_REGISTRY)})")
+    with _instances_lock:
+        if ranker not in _instances:
+            _instances[ranker] = _REGISTRY[ranker]()
+        return _instances[ranker]
+
+
+# =======================================================
+# ⏱️ Latency metrics (theo từng pre-ranker)
+# =======================================================
+class _RankerStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.failed = 0
+        self.items = 0
+        self.busy = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, items: int, ok: bool = True):
+        with self._lock:
+            self.busy += seconds
+            self.max_ms = max(self.max_ms, seconds * 1000)
+            if ok:
+                self.calls += 1
+                self.items += items
+            else:
+                self.failed += 1
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ranker": self.name,
+            "calls": self.calls,
+            "failed": self.failed,
+            "items": self.items,
+            "avg_ms": round(self.busy * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "us_per_item": round(self.busy * 1e6 / self.items, 1) if self.items else 0.0,
+        }
+
+
+_stats: Dict[str, _RankerStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _ranker_name(ranker: PreRanker) -> str:
+    return getattr(ranker, "name", None) or getattr(ranker, "__name__", None) or type(ranker).__name__
+
+
+def _stats_for(name: str) -> _RankerStats:
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = _RankerStats(name)
+        return _stats[name]
+
+
+def prerank_stats() -> List[Dict[str, Any]]:
+    with _stats_lock:
+        return [s.report() for s in _stats.values()]
+
+
+# =======================================================
+# 🚦 Pre-rank
+# =======================================================
+def pre_rank(
+    query_text: str,
+    query_data: Dict[str, Any],
+    hits: List[Dict[str, Any]],
+    keep: int,
+    ranker: Union[str, PreRanker, None] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Chấm lại `hits` bằng pre-ranker, gắn "prerank_score", trả `keep` hit tốt nhất
+    (thứ tự xác định: prerank_score ↓, score retrieval ↓, thứ tự retrieval ↑).
+    Pre-ranker tắt hoặc lỗi → giữ thứ tự retrieval.
+    """
+    ranker = resolve_pre_ranker(ranker)
+    if ranker is None or len(hits) <= 1:
+        return hits[:keep]
+
+    stats = _stats_for(_ranker_name(ranker))
+    t0 = time.perf_counter()
+    try:
+        scores = ranker(query_text, query_data, hits)
+    except Exception as e:
+        stats.record(time.perf_counter() - t0, len(hits), ok=False)
+        print(f"❌ Pre-ranker {stats.name} failed, keeping retrieval order: {e}")
+        traceback.print_exc()
+        return hits[:keep]
+    elapsed = time.perf_counter() - t0
+    stats.record(elapsed, len(hits))
+
+    for hit, s in zip(hits, scores):
+        hit["prerank_score"] = round(float(s), 4)
+    order = sorted(range(len(hits)), key=lambda i: (-hits[i]["prerank_score"], -hits[i].get("score", 0.0), i))
+    print(f"⚡ Pre-rank ({stats.name}): {len(hits)} → {min(keep, len(hits))} in {elapsed * 1000:.1f} ms")
+    return [hits[i] for i in order[:keep]]
+
+
+# ------------------ Test ------------------
+if __name__ == "__main__":
+    import random
+    rnd = random.Random(0)
+    pool = ["python", "node.js", "sql", "docker", "aws", "react", "java", "go", "kubernetes", "redis"]
+    jd = {"title": "Backend Developer", "tech_stack": ["Node.js", "SQL"], "requirements": ["Docker"],
+          "nice_to_have": ["AWS"], "years_of_experience": "2"}
+    hits = []
+    for i in range(50):
+        cv = {"skills": rnd.sample(pool, 4),
+              "experiences": [{"role": rnd.choice(["Backend Developer", "Designer", "QA"]), "years": rnd.randint(0, 5)}]}
+        hits.append({"id": f"cv{i}", "score": rnd.random(), "text": "", "data": cv})
+
+    kept = pre_rank("backend node sql", jd, hits, keep=5, ranker="features")
+    for h in kept:
+        print(h["id"], h["prerank_score"], h["data"]["skills"], h["data"]["experiences"][0]["role"])
+    pre_rank("backend", jd, hits, keep=5, ranker=lambda q, d, hs: [-h["score"] for h in hs])
+    print(prerank_stats())
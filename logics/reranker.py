@@ -0,0 +1,149 @@
+# reranker.py
+# Re-ranking song song: gọi evaluate_match cho nhiều cặp JD↔CV cùng lúc (thread pool có giới hạn).
+import math, time, traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, List, Optional
+from config import RERANK_MAX_WORKERS, RERANK_TIMEOUT
+
+
+def _default_evaluate(jd_text: str, cv_text: str) -> dict:
+    # import trễ để module dùng được với stub mà không cần Gemini SDK
+    from logics.llmEvaluate import evaluate_match
+    return evaluate_match(jd_text, cv_text)
+
+
+def _default_evaluate_batch(jd_text: str, cvs: Dict[str, str]) -> Dict[str, dict]:
+    from logics.llmEvaluate import evaluate_match_batch
+    return evaluate_match_batch(jd_text, cvs)
+
+
+def _result(cand: Dict[str, Any], eval_result: dict, idx: int) -> Dict[str, Any]:
+    # "id" của hit (nếu caller truyền) đi kèm kết quả → map về document mà không phụ thuộc filename
+    r = {"target": cand.get("target", "UNKNOWN"), "similarity": cand.get("similarity", 0.0),
+         "evaluation": eval_result, "_index": idx}
+    if "id" in cand:
+        r["id"] = cand["id"]
+    return r
+
+
+def _sort_key(item: Dict[str, Any]):
+    # Thứ tự xác định: LLM score ↓, similarity ↓, thứ tự retrieval ↑
+    return (-item["evaluation"].get("score", 0), -item.get("similarity", 0.0), item["_index"])
+
+
+# ------------------ Main Re-rank ------------------
+def rerank(
+    candidates: List[Dict[str, Any]],
+    evaluate_fn: Optional[Callable[[str, str], dict]] = None,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Đánh giá đồng thời các ứng viên.
+    Mỗi candidate: {"target", "similarity", "jd_text", "cv_text"} (+ "id" tuỳ chọn).
+    Trả về list {"target", "similarity", "evaluation"} (+ "id" nếu candidate có) đã sort theo thứ tự xác định.
+    Call lỗi hoặc quá `timeout` giây bị bỏ qua → kết quả partial.
+    `deadline` (time.monotonic()): hết giờ → bỏ mọi call còn lại; candidate được submit theo thứ tự
+    truyền vào nên candidate đứng trước (điểm retrieval cao hơn) được ưu tiên.
+    Luôn có thêm 1 deadline tổng = timeout × ceil(n / workers): nếu mọi worker đều kẹt ở call treo thì
+    candidate đang chờ slot không bao giờ bắt đầu (nên không bao giờ "timeout"), deadline tổng cắt vòng chờ.
+    Khi timeout / hết deadline: candidate chưa bắt đầu bị huỷ (cancel_futures=True), nhưng call đang chạy thì
+    không dừng được — thread vẫn giữ request Gemini tới khi xong và evaluate_match vẫn ghi kết quả vào LLM cache
+    (hợp lệ, lần sau hit cache); chỉ kết quả trả về cho caller bị bỏ. Số thread treo tối đa = max_workers / lần gọi.
+    """
+    evaluate_fn = evaluate_fn or _default_evaluate
+    max_workers = max(1, max_workers or RERANK_MAX_WORKERS)
+    timeout = timeout if timeout is not None else RERANK_TIMEOUT
+    if not candidates:
+        return []
+
+    started: Dict[int, float] = {}
+
+    def _run(idx: int, cand: Dict[str, Any]) -> dict:
+        started[idx] = time.monotonic()
+        return evaluate_fn(cand["jd_text"], cand["cv_text"])
+
+    workers = min(max_workers, len(candidates))
+    if timeout > 0:
+        overall = time.monotonic() + timeout * math.ceil(len(candidates) / workers)
+        deadline = overall if deadline is None else min(deadline, overall)
+
+    results = []
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(_run, i, c): i for i, c in enumerate(candidates)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx = futures[fut]
+                cand = candidates[idx]
+                try:
+                    eval_result = fut.result()
+                except Exception as e:
+                    print(f"❌ Error evaluating {cand.get('target')}: {e}")
+                    traceback.print_exc()
+                    continue
+                results.append(_result(cand, eval_result, idx))
+
+            # per-call timeout: tính từ lúc call thực sự bắt đầu chạy (không tính thời gian chờ slot)
+            now = time.monotonic()
+            for fut in list(pending):
+                idx = futures[fut]
+                if idx in started and now - started[idx] > timeout:
+                    print(f"⏱️ Timeout evaluating {candidates[idx].get('target')} after {timeout}s, skipped.")
+                    fut.cancel()
+                    pending.discard(fut)
+
+            if deadline is not None and now >= deadline and pending:
+                print(f"⏱️ Wall-time budget exhausted, {len(pending)} evaluation(s) dropped.")
+                for fut in pending:
+                    fut.cancel()
+                pending = set()
+    finally:
+        # không chờ các call đã timeout (thread vẫn chạy nền, kết quả bị bỏ)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results.sort(key=_sort_key)
+    for r in results:
+        r.pop("_index", None)
+    return results
+
+
+# ------------------ Batch Re-rank ------------------
+def rerank_batch(
+    candidates: List[Dict[str, Any]],
+    evaluate_batch_fn: Optional[Callable[[str, Dict[str, str]], Dict[str, dict]]] = None,
+    deadline: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Giống rerank() nhưng gom các candidate cùng jd_text vào 1 prompt batch
+    (evaluate_match_batch) → ít request Gemini hơn, JD chỉ gửi 1 lần.
+    `deadline`: nhóm chưa bắt đầu khi đã hết giờ thì bỏ qua (không cắt ngang 1 batch đang chạy).
+    """
+    evaluate_batch_fn = evaluate_batch_fn or _default_evaluate_batch
+    groups: Dict[str, Dict[str, str]] = {}
+    for i, cand in enumerate(candidates):
+        groups.setdefault(cand["jd_text"], {})[str(i)] = cand["cv_text"]
+
+    results = []
+    for jd_text, cvs in groups.items():
+        if deadline is not None and time.monotonic() >= deadline:
+            print(f"⏱️ Wall-time budget exhausted, {len(cvs)} evaluation(s) dropped.")
+            continue
+        try:
+            evaluations = evaluate_batch_fn(jd_text, cvs)
+        except Exception as e:
+            print(f"❌ Error in batch evaluation: {e}")
+            traceback.print_exc()
+            continue
+        for cid, eval_result in evaluations.items():
+            idx = int(cid)
+            results.append(_result(candidates[idx], eval_result, idx))
+
+    results.sort(key=_sort_key)
+    for r in results:
+        r.pop("_index", None)
+    return results
+
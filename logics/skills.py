@@ -0,0 +1,119 @@
+# skills.py
+# Chuẩn hoá skill / tech token + trích trường có cấu trúc (skills, số năm KN) từ JSON CV/JD
+# để lưu thành metadata phẳng trong Chroma (lọc `where`) và dùng cho hybrid scoring.
+import re
+from typing import Any, Dict, Iterable, List
+
+_ALIASES = {
+    "nodejs": "node.js", "node": "node.js", "node js": "node.js",
+    "js": "javascript", "ecmascript": "javascript",
+    "ts": "typescript",
+    "reactjs": "react", "react.js": "react",
+    "vuejs": "vue", "vue.js": "vue",
+    "nextjs": "next.js", "expressjs": "express", "express.js": "express",
+    "postgres": "postgresql", "psql": "postgresql",
+    "mongo": "mongodb", "mysql db": "mysql",
+    "golang": "go", "py": "python", "python3": "python",
+    "k8s": "kubernetes", "amazon web services": "aws", "gcp": "google cloud",
+    "restful api": "rest api", "restful apis": "rest api", "rest apis": "rest api", "rest": "rest api",
+    "ci/cd": "ci/cd", "cicd": "ci/cd", "ci-cd": "ci/cd",
+    "ml": "machine learning", "dl": "deep learning",
+}
+
+# Tránh coi câu dài trong "requirements" là skill
+_MAX_SKILL_WORDS = 3
+SKILL_KEY_PREFIX = "sk_"
+
+
+def normalize_skill(skill: str) -> str:
+    s = re.sub(r"\s+", " ", str(skill).strip().lower())
+    s = s.strip(" .,;:")
+    return _ALIASES.get(s, s)
+
+
+def normalize_skills(skills: Iterable[Any]) -> List[str]:
+    out = set()
+    for sk in skills or []:
+        norm = normalize_skill(sk)
+        if norm and len(norm.split()) <= _MAX_SKILL_WORDS:
+            out.add(norm)
+    return sorted(out)
+
+
+def skill_key(skill: str) -> str:
+    """Tên key metadata cho 1 skill đã chuẩn hoá (c++ ≠ c#, node.js → sk_nodedotjs)."""
+    s = skill.replace("+", "p").replace("#", "sharp").replace(".", "dot")
+    return SKILL_KEY_PREFIX + re.sub(r"[^a-z0-9]+", "_", s).strip("_")
+
+
+def _first_number(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = re.search(r"\d+(\.\d+)?", str(value or ""))
+    return float(m.group(0)) if m else 0.0
+
+
+# ------------------ CV / JD fields ------------------
+def is_cv(data: Dict[str, Any]) -> bool:
+    # cùng quy tắc nhận dạng với embedder.json_to_text_auto
+    return "skills" in data or "education" in data or "experiences" in data
+
+
+def cv_skills(data: Dict[str, Any]) -> List[str]:
+    return normalize_skills(data.get("skills", []))
+
+
+def cv_total_years(data: Dict[str, Any]) -> float:
+    years = 0.0
+    for e in data.get("experiences", []) or []:
+        if isinstance(e, dict):
+            years += _first_number(e.get("years", 0))
+    return round(years, 2)
+
+
+def jd_skills(data: Dict[str, Any]) -> List[str]:
+    return normalize_skills(list(data.get("tech_stack", []) or []) + list(data.get("requirements", []) or []))
+
+
+def jd_min_years(data: Dict[str, Any]) -> float:
+    return _first_number(data.get("years_of_experience"))
+
+
+def doc_skills(data: Dict[str, Any]) -> List[str]:
+    return cv_skills(data) if is_cv(data) else jd_skills(data)
+
+
+def doc_years(data: Dict[str, Any]) -> float:
+    return cv_total_years(data) if is_cv(data) else jd_min_years(data)
+
+
+def structured_metadata(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metadata phẳng cho Chroma:
+      skills_norm = "|node.js|sql|", years = tổng năm KN (CV) / số năm yêu cầu (JD),
+      sk_<skill> = True cho từng skill → lọc bằng where={"sk_nodedotjs": True}.
+    """
+    skills = doc_skills(data)
+    meta: Dict[str, Any] = {"skills_norm": "|" + "|".join(skills) + "|" if skills else "", "years": doc_years(data)}
+    for sk in skills:
+        meta[skill_key(sk)] = True
+    return meta
+
+
+# ------------------ Scoring helpers ------------------
+def skill_coverage(required: Iterable[str], have: Iterable[str]) -> float:
+    """Tỉ lệ skill yêu cầu có trong tập skill ứng viên (0..1); không có yêu cầu → 1."""
+    req = set(required)
+    if not req:
+        return 1.0
+    return len(req & set(have)) / len(req)
+
+
+def years_fit(required: float, have: float) -> float:
+    if not required or required <= 0:
+        return 1.0
+    return max(0.0, min(1.0, have / required))
+
+
+def parse_skills_meta(value: str) -> List[str]:
+    return [s for s in (value or "").split("|") if s]
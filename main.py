@@ -1,31 +1,24 @@
-import os
-import time
-from mastodon import Mastodon
-from dotenv import load_dotenv
+from config import MASTODON_API_BASE_URL, CV_HASHTAG
+from listeners.mastodonClient import make_mastodon, DEFAULT_API_BASE_URL
 from listeners.postJDListener import RecruitmentListener
+from listeners.postCVListener import postCVListener
+from listeners.jobWorker import start_workers
 
-# --- Load config ---
-load_dotenv()
-MASTODON_CLIENT_KEY = os.getenv("MASTODON_CLIENT_KEY")
-MASTODON_CLIENT_SECRET = os.getenv("MASTODON_CLIENT_SECRET")
-MASTODON_ACCESS_TOKEN = os.getenv("MASTODON_ACCESS_TOKEN")
-MASTODON_API_BASE_URL = os.getenv("MASTODON_API_BASE_URL", "https://mastodonuet.duckdns.org/")
 LISTEN_HASHTAG = "tuyendungAI"
 
 # --- Khởi tạo API ---
-mastodon = Mastodon(
-    client_id=MASTODON_CLIENT_KEY,
-    client_secret=MASTODON_CLIENT_SECRET,
-    access_token=MASTODON_ACCESS_TOKEN,
-    api_base_url=MASTODON_API_BASE_URL
-)
+mastodon = make_mastodon()
 
 # --- Run bot ---
 if __name__ == "__main__":
     try:
         my_info = mastodon.me()
-        print(f"🤖 Bot '{my_info['username']}' đang chạy...")
-        print(f"   > Lắng nghe #{LISTEN_HASHTAG} trên {MASTODON_API_BASE_URL}")
-        mastodon.stream_hashtag(LISTEN_HASHTAG, RecruitmentListener(mastodon, LISTEN_HASHTAG), reconnect_async=True)
+        workers = start_workers()
+        print(f"🤖 Bot '{my_info['username']}' đang chạy với {len(workers)} worker...")
+        print(f"   > Lắng nghe #{LISTEN_HASHTAG}, #{CV_HASHTAG} trên {MASTODON_API_BASE_URL or DEFAULT_API_BASE_URL}")
+        # stream #cv chạy nền, stream JD chặn main thread
+        mastodon.stream_hashtag(CV_HASHTAG, postCVListener(mastodon, CV_HASHTAG, me=my_info),
+                                run_async=True, reconnect_async=True)
+        mastodon.stream_hashtag(LISTEN_HASHTAG, RecruitmentListener(mastodon, LISTEN_HASHTAG, me=my_info), reconnect_async=True)
     except Exception as e:
         print(f"❌ Lỗi khởi động bot: {e}")
@@ -0,0 +1,46 @@
+# Fixture dùng chung: Chroma + các file trạng thái (snapshot, skill index, match table, llm cache)
+# đều nằm trong thư mục tạm; embedding = vector giả lập theo hash text (không load model).
+import hashlib
+import threading
+import pytest
+
+
+def fake_encode(texts, batch_size=None):
+    import numpy as np
+    out = []
+    for t in texts:
+        seed = int.from_bytes(hashlib.sha1(t.encode("utf-8")).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(32).astype(np.float32)
+        out.append(v / np.linalg.norm(v))
+    return np.stack(out) if out else np.zeros((0, 0), dtype=np.float32)
+
+
+@pytest.fixture
+def adapter(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    pytest.importorskip("chromadb")
+    pytest.importorskip("llama_index.vector_stores.chroma")
+    monkeypatch.chdir(tmp_path)  # chroma_db/, snapshots/, *.sqlite là đường dẫn tương đối
+
+    from chromadb.api.client import SharedSystemClient
+    from db import LlamaIndexAdapter as A, matchTable, skillIndex, embeddingSnapshot, llmCache
+    SharedSystemClient.clear_system_cache()  # Chroma cache client theo path "chroma_db" (tương đối) giữa các test
+    monkeypatch.setattr(A, "_chroma_client", None)
+    monkeypatch.setattr(A, "_indexes", {})
+    monkeypatch.setattr(A, "_backfill_checked", set())
+    monkeypatch.setattr(A, "encode_texts", fake_encode)
+    monkeypatch.setattr(skillIndex, "_index", None)
+    monkeypatch.setattr(skillIndex, "_local", threading.local())
+    monkeypatch.setattr(embeddingSnapshot, "_open", {})
+    for mod in (matchTable, llmCache):
+        monkeypatch.setattr(mod, "_local", threading.local())
+    yield A
+    SharedSystemClient.clear_system_cache()
+
+
+@pytest.fixture
+def job_queue(tmp_path, monkeypatch):
+    from listeners import jobQueue
+    monkeypatch.setattr(jobQueue, "JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(jobQueue, "_local", threading.local())
+    return jobQueue
@@ -0,0 +1,30 @@
+# Test upsert idempotent: id theo đường dẫn tương đối, metadata-only update khi nội dung không đổi.
+CV = {"summary": "Backend engineer", "skills": ["python", "django"], "experiences": [{"role": "Dev", "years": 3}]}
+
+
+def test_same_filename_in_two_folders_gets_two_docs(adapter):
+    a = {"type": "cv", "filename": "cv.pdf", "path": "folder_a/cv.pdf", "source_hash": "h1"}
+    b = {"type": "cv", "filename": "cv.pdf", "path": "folder_b/cv.pdf", "source_hash": "h2"}
+    adapter.upsert_json_docs("cv_collection", [(CV, a)])
+    adapter.upsert_json_docs("cv_collection", [({**CV, "summary": "Data engineer"}, b)])
+    assert adapter.count_docs("cv_collection") == 2
+    assert adapter.make_doc_id(a) != adapter.make_doc_id(b)
+
+
+def test_legacy_filename_id_replaced_by_path_id(adapter):
+    adapter.upsert_json_docs("cv_collection", [(CV, {"type": "cv", "filename": "cv.pdf", "source_hash": "h1"})])
+    ids = adapter.upsert_json_docs(
+        "cv_collection", [({**CV, "summary": "x"}, {"type": "cv", "filename": "cv.pdf", "path": "f/cv.pdf", "source_hash": "h2"})])
+    assert ids == ["file:f/cv.pdf"]
+    assert adapter.count_docs("cv_collection") == 1
+
+
+def test_source_hash_updated_when_content_unchanged(adapter):
+    meta = {"type": "cv", "filename": "cv.pdf", "path": "f/cv.pdf", "source_hash": "old"}
+    adapter.upsert_json_docs("cv_collection", [(CV, meta)])
+    new_meta = {**meta, "source_hash": "new"}
+    assert adapter.load_if_unchanged("cv_collection", new_meta, "new") is None
+    assert adapter.upsert_json_docs("cv_collection", [(CV, new_meta)]) == []  # không re-embed
+    assert adapter.load_if_unchanged("cv_collection", new_meta, "new") == CV
+    stored = adapter.get_stored_meta("cv_collection", ["file:f/cv.pdf"])["file:f/cv.pdf"]
+    assert stored["source_hash"] == "new" and stored["content_hash"]
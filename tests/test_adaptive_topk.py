@@ -0,0 +1,55 @@
+# Test adaptive top_k: sàn điểm, dừng sớm theo khoảng cách tương đối, nới tới max_k khi điểm sát nhau, budget.
+import time
+from logics.adaptiveTopK import MatchBudget, adaptive_cutoff, select_for_eval
+
+
+def _hits(scores):
+    return [{"id": f"d{i}", "score": s} for i, s in enumerate(scores)]
+
+
+def _ids(hits):
+    return [h["id"] for h in hits]
+
+
+def test_score_floor_cuts_low_hits():
+    hits = _hits([0.5, 0.3, 0.19, 0.1])
+    assert _ids(adaptive_cutoff(hits, top_k=5, min_score=0.2, rel_gap=0, cluster_eps=0)) == ["d0", "d1"]
+    assert adaptive_cutoff(_hits([0.12, 0.1]), top_k=5, min_score=0.2, rel_gap=0) == []
+
+
+def test_relative_gap_exits_early():
+    hits = _hits([0.9, 0.85, 0.4, 0.3, 0.2, 0.1])
+    assert _ids(adaptive_cutoff(hits, top_k=5, min_score=0, rel_gap=0.5, cluster_eps=0)) == ["d0", "d1"]
+
+
+def test_defaults_keep_top_k():
+    # ADAPTIVE_REL_GAP / ADAPTIVE_MIN_SCORE mặc định tắt → caller cũ vẫn nhận đủ top_k
+    hits = _hits([0.9, 0.85, 0.4, 0.3, 0.2, 0.1])
+    assert _ids(adaptive_cutoff(hits, top_k=5, cluster_eps=0)) == ["d0", "d1", "d2", "d3", "d4"]
+
+
+def test_close_scores_extend_up_to_max_k():
+    tied = _hits([0.8, 0.79, 0.79, 0.785, 0.785, 0.783, 0.782, 0.78, 0.7, 0.69])
+    out = adaptive_cutoff(tied, top_k=5, max_k=10, min_score=0, rel_gap=0, cluster_eps=0.01)
+    assert _ids(out) == [f"d{i}" for i in range(8)]  # d8 (0.7) tụt > eps so với hit thứ 5
+    assert len(adaptive_cutoff(tied, top_k=5, max_k=6, min_score=0, rel_gap=0, cluster_eps=0.01)) == 6
+    assert len(adaptive_cutoff(tied, top_k=5, max_k=10, min_score=0, rel_gap=0, cluster_eps=0)) == 5
+
+
+def test_prerank_score_takes_precedence():
+    hits = [{"id": "a", "score": 0.9, "prerank_score": 0.1}, {"id": "b", "score": 0.1, "prerank_score": 0.05}]
+    assert _ids(adaptive_cutoff(hits, top_k=5, min_score=0.08, rel_gap=0)) == ["a"]
+
+
+def test_llm_call_budget_caps_selection():
+    hits = _hits([0.9, 0.8, 0.7, 0.6, 0.5])
+    assert _ids(select_for_eval(hits, 5, MatchBudget(max_llm_calls=3, max_wall_time=0), rel_gap=0)) == ["d0", "d1", "d2"]
+    assert len(select_for_eval(hits, 5, MatchBudget(max_llm_calls=0, max_wall_time=0), rel_gap=0)) == 5
+
+
+def test_wall_time_budget():
+    budget = MatchBudget(max_llm_calls=0, max_wall_time=0.05)
+    assert not budget.expired() and budget.deadline is not None
+    time.sleep(0.06)
+    assert budget.expired()
+    assert MatchBudget(max_llm_calls=0, max_wall_time=0).deadline is None
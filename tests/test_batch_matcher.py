@@ -0,0 +1,38 @@
+# Test batch match trên Chroma tạm: lọc số năm KN theo từng JD như hybrid_retrieve.
+import numpy as np
+import pytest
+
+
+def _cv(name, years):
+    return ({"summary": name, "skills": ["python"], "experiences": [{"role": "Dev", "years": years}]},
+            {"type": "cv", "filename": f"{name}.pdf", "path": f"{name}.pdf"})
+
+
+def _jd(name, years):
+    return ({"title": name, "tech_stack": ["python"], "years_of_experience": years},
+            {"type": "jd", "filename": f"{name}.txt", "path": f"{name}.txt"})
+
+
+def test_blocked_topk_respects_doc_mask():
+    pytest.importorskip("numpy")
+    from logics.batchMatcher import blocked_topk
+    rng = np.random.default_rng(0)
+    q, d = rng.standard_normal((3, 8)).astype(np.float32), rng.standard_normal((50, 8)).astype(np.float32)
+    mask = np.zeros(50, dtype=bool)
+    mask[::7] = True
+    idx, _ = blocked_topk(q, d, 4, row_block=2, col_block=6, doc_mask=mask)
+    assert mask[idx].all()
+    full, _ = blocked_topk(q, d[mask], 4)
+    assert (np.flatnonzero(mask)[full] == idx).all()
+
+
+def test_batch_match_applies_years_filter_per_jd(adapter):
+    from logics.batchMatcher import batch_match
+    adapter.upsert_json_docs("cv_collection", [_cv(n, y) for n, y in
+                                               [("junior", 1), ("mid", 3), ("intern", 0), ("senior", 6), ("staff", 8)]])
+    adapter.upsert_json_docs("jd_collection", [_jd("lead", "5+"), _jd("any", ""), _jd("principal", "15+")])
+    out = batch_match(top_k=2, evaluate=False)
+    by_file = {adapter.get_stored_meta("jd_collection", [k])[k]["filename"]: v for k, v in out.items()}
+    assert sorted(r["target"] for r in by_file["lead.txt"]) == ["senior.pdf", "staff.pdf"]
+    assert len(by_file["any.txt"]) == 2
+    assert len(by_file["principal.txt"]) == 2  # không CV nào đủ 15 năm → nới điều kiện như hybrid_retrieve
@@ -0,0 +1,83 @@
+# Test pipeline parse CV: stage extract lỗi vẫn phải kết thúc được (không treo join());
+# chạy lại lô chỉ gửi Gemini các file đã đổi (source_hash).
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("pytesseract")
+from dataPreprocess import batchParser
+
+
+class _BrokenPool:
+    def __init__(self, *a, **k):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def submit(self, *a, **k):
+        from concurrent.futures.process import BrokenProcessPool
+        raise BrokenProcessPool("worker died")
+
+
+def _run_with_timeout(fn, timeout=10):
+    out = {}
+    t = threading.Thread(target=lambda: out.update(result=fn()), daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), "pipeline treo"
+    return out["result"]
+
+
+def _files(tmp_path, *names):
+    paths = []
+    for n in names:
+        (tmp_path / n).write_bytes(f"%PDF {n}".encode())
+        paths.append(str(tmp_path / n))
+    return paths
+
+
+def test_pipeline_finishes_when_pool_breaks(monkeypatch, tmp_path):
+    monkeypatch.setattr(batchParser, "ProcessPoolExecutor", _BrokenPool)
+    paths = _files(tmp_path, "a.pdf", "b.pdf")
+    results, stats = _run_with_timeout(
+        lambda: batchParser.parse_resumes_pipelined(paths, index_fn=None, cpu_workers=1, llm_workers=2))
+    assert results == {}
+    assert stats[0]["failed"] == 2
+
+
+def test_pipeline_finishes_when_pool_cannot_start(monkeypatch, tmp_path):
+    def boom(*a, **k):
+        raise OSError("no more processes")
+
+    monkeypatch.setattr(batchParser, "ProcessPoolExecutor", boom)
+    results, _ = _run_with_timeout(
+        lambda: batchParser.parse_resumes_pipelined(_files(tmp_path, "a.pdf"), index_fn=None, cpu_workers=1,
+                                                    llm_workers=1))
+    assert results == {}
+
+
+def test_rerun_skips_unchanged_files(adapter, monkeypatch, tmp_path):
+    calls = []
+
+    def fake_gemini(text):
+        calls.append(text)
+        return {"name": text, "summary": text, "skills": ["python"]}
+
+    # extract_text giả cần chạy cùng process
+    monkeypatch.setattr(batchParser, "ProcessPoolExecutor", lambda max_workers, **kw: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(batchParser, "extract_text", lambda path, workers=None: open(path, "rb").read().decode())
+    monkeypatch.setattr(batchParser, "extract_with_gemini", fake_gemini)
+    a, b = _files(tmp_path, "a.pdf", "b.pdf")
+
+    def run():
+        return _run_with_timeout(lambda: batchParser.parse_resumes_pipelined([a, b], cpu_workers=1, llm_workers=2))[0]
+
+    assert set(run()) == {a, b} and len(calls) == 2
+    assert run()[b]["name"] == "%PDF b.pdf" and len(calls) == 2  # không đổi → JSON đã index, không gọi Gemini
+    (tmp_path / "b.pdf").write_bytes(b"%PDF b v2")
+    assert run()[b]["name"] == "%PDF b v2" and calls[2:] == ["%PDF b v2"]
@@ -0,0 +1,113 @@
+# Test DMDispatcher với fake Mastodon HTTP server (header X-RateLimit-* như Mastodon thật),
+# gửi qua Mastodon.py + mastodon_post_fn.
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+import pytest
+from listeners.dmDispatcher import DMDispatcher, RateLimiter, mastodon_post_fn
+
+
+@pytest.fixture
+def fake_mastodon():
+    mastodon_mod = pytest.importorskip("mastodon")
+    state = {"limit": 3, "window": 1.0, "window_start": time.time(), "used": 0, "log": [], "fail_once": set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_POST(self):
+            body = parse.parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+            text = body["status"][0]
+            with lock:
+                now = time.time()
+                if now - state["window_start"] >= state["window"]:
+                    state["window_start"], state["used"] = now, 0
+                reset = datetime.fromtimestamp(state["window_start"] + state["window"], tz=timezone.utc).isoformat()
+                if state["used"] >= state["limit"]:
+                    code = 429
+                elif text in state["fail_once"]:
+                    state["fail_once"].discard(text)
+                    code = 500
+                else:
+                    state["used"] += 1
+                    state["log"].append((now, text))
+                    code = 200
+                remaining = state["limit"] - state["used"]
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("X-RateLimit-Limit", str(state["limit"]))
+            self.send_header("X-RateLimit-Remaining", str(remaining))
+            self.send_header("X-RateLimit-Reset", reset)
+            self.end_headers()
+            payload = {"id": str(len(state["log"]))} if code == 200 else {"error": "nope"}
+            self.wfile.write(json.dumps(payload).encode())
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = mastodon_mod.Mastodon(access_token="token", api_base_url=f"http://127.0.0.1:{server.server_port}",
+                                   version_check_mode="none", ratelimit_method="throw")
+    yield client, state
+    server.shutdown()
+
+
+def test_respects_server_rate_limit_and_round_robin(fake_mastodon, tmp_path):
+    client, state = fake_mastodon
+    limiter = RateLimiter(capacity=100, window=1)  # cố ý cấu hình sai → phải tự chỉnh theo header
+    disp = DMDispatcher(mastodon_post_fn(client), char_limit=120, limiter=limiter,
+                        outbox_path=str(tmp_path / "outbox.sqlite"))
+    try:
+        for r in ("alice", "bob", "carol"):
+            rows = [f"#{i + 1} cv_{r}_{i}.pdf — Điểm {90 - i * 5}/100" for i in range(4)]
+            assert disp.submit(r, "Bảng xếp hạng:", rows) >= 2
+        assert disp.flush(timeout=30)
+    finally:
+        disp.stop()
+
+    assert disp.failed == 0 and disp.sent == len(state["log"])
+    texts = [t for _, t in state["log"]]
+    assert [t.split()[0] for t in texts[:3]] == ["@alice", "@bob", "@carol"]  # xen kẽ recruiter
+    for r in ("alice", "bob", "carol"):
+        mine = [t for t in texts if t.startswith(f"@{r} ")]
+        assert mine[0].startswith(f"@{r} Bảng xếp hạng:")  # thứ tự các phần của 1 tin nhắn giữ nguyên
+        assert "cv_%s_3.pdf" % r in mine[-1]
+
+
+def test_retry_does_not_block_other_recruiters(fake_mastodon, tmp_path):
+    client, state = fake_mastodon
+    state["limit"] = 100
+    state["fail_once"].add("@alice lỗi lần đầu")
+    disp = DMDispatcher(mastodon_post_fn(client), outbox_path=str(tmp_path / "outbox.sqlite"))
+    t0 = time.time()
+    try:
+        disp.submit("alice", "lỗi lần đầu", [])
+        time.sleep(0.2)  # lần gửi đầu của alice đã lỗi → chờ retry
+        disp.submit("bob", "gửi ngay", [])
+        assert disp.flush(timeout=30)
+    finally:
+        disp.stop()
+    sent = {t: ts - t0 for ts, t in state["log"]}
+    assert sent["@bob gửi ngay"] < 1.0
+    assert sent["@alice lỗi lần đầu"] > sent["@bob gửi ngay"]
+
+
+def test_outbox_survives_dead_sender(tmp_path):
+    path = str(tmp_path / "outbox.sqlite")
+    dead = DMDispatcher(lambda *a, **k: None, outbox_path=path)
+    dead.stop()  # worker "chết" trước khi gửi
+    dead.submit("alice", "còn trong outbox", [])
+    dead.submit("bob", "đang gửi dở", [])
+    dead._conn().execute("UPDATE dm_outbox SET status = 'sending', leased_until = ? WHERE acct = 'bob'",
+                         (time.time() - 1,))
+
+    got = []
+    disp = DMDispatcher(lambda text, **kw: got.append(text), outbox_path=path)
+    try:
+        assert disp.flush(timeout=10)
+    finally:
+        disp.stop()
+    assert sorted(got) == ["@alice còn trong outbox", "@bob đang gửi dở"]
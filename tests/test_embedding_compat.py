@@ -0,0 +1,36 @@
+# Cổng tương thích trước khi đổi EMBED_BACKEND (mặc định torch): vector ONNX phải đạt cosine
+# >= EMBED_COMPAT_MIN_COSINE so với torch, nếu không collection đã index phải re-index.
+# Backend dựng đúng như production (EMBED_MODEL_NAME, EMBED_ONNX_DIR nếu đã export); chỉ khi chưa export thì
+# export vào thư mục tạm. Skip khi thiếu onnxruntime / sentence-transformers hoặc model không có sẵn trên máy
+# (không tải mạng trong test).
+import os
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("sentence_transformers")
+from config import EMBED_MODEL_NAME, EMBED_COMPAT_MIN_COSINE
+from logics import embeddingBackends as eb
+
+
+def _model_available(name: str) -> bool:
+    # EMBED_MODEL_NAME là thư mục local hoặc tên trên hub đã có trong cache HuggingFace
+    if os.path.isdir(name):
+        return True
+    from huggingface_hub import try_to_load_from_cache
+    return isinstance(try_to_load_from_cache(name, "config.json"), str)
+
+
+def test_onnx_backend_matches_torch(tmp_path, monkeypatch):
+    if not _model_available(EMBED_MODEL_NAME):
+        pytest.skip(f"model {EMBED_MODEL_NAME} chưa có trên máy")
+    torch_backend = eb.TorchBackend()
+    if os.path.exists(eb.onnx_model_path()):
+        onnx_backend = eb.OnnxBackend()
+    else:
+        onnx_backend = eb.OnnxBackend(onnx_dir=str(tmp_path / "onnx"))
+    monkeypatch.setitem(eb._BACKENDS, "torch", lambda: torch_backend)
+    monkeypatch.setitem(eb._BACKENDS, "onnx", lambda: onnx_backend)
+    report = eb.check_compatibility(eb.DEFAULT_CHECK_TEXTS)
+    assert report["threshold"] == EMBED_COMPAT_MIN_COSINE
+    assert report["ok"], f"ONNX lệch torch: {report}"
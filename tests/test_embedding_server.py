@@ -0,0 +1,72 @@
+# Embedding server với backend giả lập (mỗi lần encode tốn thời gian cố định): lô ingest lớn không được chặn
+# query 1 text của bot, kết quả ghép từ nhiều chunk phải giống encode trực tiếp.
+import time
+import threading
+import pytest
+
+np = pytest.importorskip("numpy")
+from conftest import fake_encode
+from logics.embeddingServer import MicroBatcher, make_server, encode_remote
+
+STEP = 0.05  # giây / lần gọi backend
+
+
+class SlowBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=None):
+        self.calls.append(len(texts))
+        time.sleep(STEP)
+        return fake_encode(texts)
+
+
+@pytest.fixture
+def server():
+    backend = SlowBackend()
+    batcher = MicroBatcher(backend, max_batch=8, max_wait_ms=1, cache_size=0)
+    srv = make_server(batcher, port=0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield backend, batcher, f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    srv.server_close()
+    batcher.stop()
+
+
+def _query_during_ingest(ingest, query):
+    """
+    Chạy ingest ở thread nền, gửi query khi ingest đang chạy → (ingest còn chạy khi query xong?, vector query,
+    kết quả ingest). So với thread ingest thay vì latency tuyệt đối để không phụ thuộc tải máy.
+    """
+    out = {}
+    th = threading.Thread(target=lambda: out.setdefault("ingest", ingest()))
+    th.start()
+    time.sleep(5 * STEP)
+    assert th.is_alive(), "ingest xong trước khi query tới — tăng số text"
+    vec = query()
+    interleaved = th.is_alive()
+    th.join()
+    return interleaved, vec, out["ingest"]
+
+
+def test_remote_ingest_is_chunked_and_query_interleaves(server):
+    backend, _, url = server
+    texts = [f"cv {i}" for i in range(400)]  # 50 chunk × STEP ≈ 2.5s
+    interleaved, vec, emb = _query_during_ingest(lambda: encode_remote(texts, url, chunk_size=8),
+                                             lambda: encode_remote(["bot query"], url))
+    assert interleaved, "query phải chờ hết lô ingest"
+    assert np.allclose(vec, fake_encode(["bot query"]))
+    assert emb.shape == (400, 32) and np.allclose(emb, fake_encode(texts))
+    assert max(backend.calls) <= 8
+
+
+def test_batcher_splits_large_request(server):
+    # client gửi thẳng 1 request lớn (không qua encode_remote) → MicroBatcher tự chia theo max_batch
+    backend, batcher, _ = server
+    texts = [f"jd {i}" for i in range(400)]
+    interleaved, vec, emb = _query_during_ingest(lambda: batcher.encode(texts), lambda: batcher.encode(["bot query"]))
+    assert interleaved, "query phải chờ hết lô ingest"
+    assert np.allclose(emb, fake_encode(texts)) and np.allclose(vec, fake_encode(["bot query"]))
+    assert max(backend.calls) <= 8
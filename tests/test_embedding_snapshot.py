@@ -0,0 +1,40 @@
+# Test snapshot mmap: refresh khi collection bị ghi, kể cả ghi xen giữa lúc refresh đang đọc Chroma.
+import time
+
+CV = {"summary": "Backend", "skills": ["python"], "experiences": [{"role": "Dev", "years": 2}]}
+
+
+def _seed(adapter):
+    from db import embeddingSnapshot
+    adapter.upsert_json_docs("cv_collection", [(CV, {"type": "cv", "filename": "a.pdf", "path": "a.pdf"})])
+    embeddingSnapshot.refresh_snapshot("cv_collection")
+    assert not embeddingSnapshot.is_stale("cv_collection")
+    return embeddingSnapshot
+
+
+def test_unchanged_refresh_keeps_concurrent_write_dirty(adapter, monkeypatch):
+    snap = _seed(adapter)
+    original = adapter.iter_collection
+
+    def iter_with_concurrent_write(*args, **kwargs):
+        time.sleep(0.01)
+        snap.mark_dirty("cv_collection")  # process khác ghi trong lúc refresh đang đọc
+        yield from original(*args, **kwargs)
+
+    monkeypatch.setattr(adapter, "iter_collection", iter_with_concurrent_write)
+    snap.refresh_snapshot("cv_collection")
+    assert snap.is_stale("cv_collection")
+    assert snap.get_snapshot("cv_collection") is None
+
+
+def test_worker_idle_refreshes_stale_snapshot(adapter, monkeypatch):
+    from listeners import jobWorker
+    snap = _seed(adapter)
+    adapter.upsert_json_docs("cv_collection", [({**CV, "summary": "Data"}, {"type": "cv", "filename": "b.pdf",
+                                                                              "path": "b.pdf"})])
+    assert snap.is_stale("cv_collection")
+    monkeypatch.setattr(jobWorker, "SNAPSHOT_IDLE_REFRESH", 0)
+    assert jobWorker._refresh_snapshots() == 1
+    assert not snap.is_stale("cv_collection")
+    assert len(snap.get_snapshot("cv_collection")) == 2
+    assert snap.refresh_stale() == 0
@@ -0,0 +1,57 @@
+# Test hybrid retrieval trên Chroma tạm: document cũ thiếu metadata lọc vẫn được tìm thấy.
+import json
+from tests.conftest import fake_encode
+
+JD = {"title": "Backend Developer", "tech_stack": ["python"], "years_of_experience": "2+"}
+LEGACY_CV = {"summary": "Senior backend", "skills": ["python", "sql"], "experiences": [{"role": "Dev", "years": 5}]}
+
+
+def _add_legacy_cv(adapter, doc_id="legacy:1"):
+    # index từ bản trước hybrid retrieval: chỉ có _raw_json, không có years / sk_*
+    text = json.dumps(LEGACY_CV)
+    adapter._get_collection("cv_collection").add(
+        ids=[doc_id], embeddings=fake_encode([text]).tolist(), documents=[text],
+        metadatas=[{"type": "cv", "filename": "old.pdf", "_raw_json": text}])
+
+
+def test_auto_years_filter_backfills_legacy_docs(adapter):
+    from logics.hybridRetriever import hybrid_retrieve
+    _add_legacy_cv(adapter)
+    hits = hybrid_retrieve("cv_collection", "Backend Developer python", JD, top_k=1)
+    assert [h["id"] for h in hits] == ["legacy:1"]
+    meta = adapter.get_stored_meta("cv_collection", ["legacy:1"])["legacy:1"]
+    assert meta["years"] == 5 and "|python|" in meta["skills_norm"]
+
+
+def test_backfill_is_idempotent(adapter):
+    _add_legacy_cv(adapter)
+    assert adapter.backfill_structured_metadata("cv_collection") == 1
+    assert adapter.backfill_structured_metadata("cv_collection") == 0
+
+
+def test_must_have_falls_back_to_chroma_when_index_misses(adapter):
+    from db import skillIndex
+    from logics.hybridRetriever import hybrid_retrieve
+    cv = {"summary": "Go dev", "skills": ["go"], "experiences": [{"role": "Dev", "years": 3}]}
+    adapter.upsert_json_docs("cv_collection", [(cv, {"type": "cv", "filename": "g.pdf", "path": "g.pdf"})])
+    skillIndex.sync_upserts({"file:g.pdf": []})  # index lệch so với Chroma
+    hits = hybrid_retrieve("cv_collection", "Go developer", {"title": "Go"}, top_k=1, must_have=["go"])
+    assert [h["id"] for h in hits] == ["file:g.pdf"]
+
+
+def test_must_have_searches_only_skill_index_ids(adapter, monkeypatch):
+    # 2 CV đều có sk_go trong Chroma, index chỉ liệt kê 1 → ANN chỉ chạy trên id index trả về (Chroma và snapshot)
+    from db import skillIndex, embeddingSnapshot
+    from logics.hybridRetriever import hybrid_retrieve
+    cvs = [({"summary": f"Go dev {n}", "skills": ["go"], "experiences": [{"role": "Dev", "years": 3}]},
+            {"type": "cv", "filename": f"{n}.pdf", "path": f"{n}.pdf"}) for n in ("a", "b")]
+    adapter.upsert_json_docs("cv_collection", cvs)
+    skillIndex.sync_upserts({"file:b.pdf": ["rust"]})
+    query = ("Go developer", {"title": "Go"})
+    assert [h["id"] for h in hybrid_retrieve("cv_collection", *query, top_k=2, must_have=["go"])] == ["file:a.pdf"]
+
+    monkeypatch.setattr(adapter, "SNAPSHOT_ENABLED", True)
+    embeddingSnapshot.refresh_snapshot("cv_collection")
+    assert embeddingSnapshot.get_snapshot("cv_collection") is not None
+    assert [h["id"] for h in hybrid_retrieve("cv_collection", *query, top_k=2, must_have=["go"])] == ["file:a.pdf"]
+    assert len(hybrid_retrieve("cv_collection", *query, top_k=2)) == 2
@@ -0,0 +1,54 @@
+# Test job queue SQLite: lease hết hạn, gia hạn lease, restart worker chết.
+import threading
+import time
+from listeners import jobWorker
+
+
+def test_expired_lease_respects_max_attempts(job_queue):
+    job_queue.enqueue("cv", {"n": 1})
+    for attempt in (1, 2):
+        job_id, _, _, got = job_queue.claim(lease_seconds=0.01, max_attempts=2)
+        assert got == attempt
+        time.sleep(0.02)  # worker "chết" → lease hết hạn
+    assert job_queue.claim(lease_seconds=0.01, max_attempts=2) is None
+    status, error = job_queue._conn().execute("SELECT status, last_error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    assert status == "dead" and "lease expired" in error
+
+
+def test_renew_keeps_job_leased(job_queue):
+    job_queue.enqueue("cv", {"n": 1})
+    job_id, *_ = job_queue.claim(lease_seconds=0.5)
+    for _ in range(3):
+        time.sleep(0.3)
+        assert job_queue.renew(job_id, lease_seconds=0.5)
+    assert job_queue.claim() is None
+    job_queue.complete(job_id)
+    assert not job_queue.renew(job_id)
+
+
+def test_heartbeat_renews_while_handler_runs(job_queue):
+    job_queue.enqueue("cv", {"n": 1})
+    job_id, *_ = job_queue.claim(lease_seconds=0.6)
+    with jobWorker._heartbeat(job_id, lease_seconds=0.6):
+        time.sleep(1.5)  # > 2 lần lease
+        assert job_queue.claim() is None
+
+
+def _exit_immediately(worker_id):
+    return None
+
+
+def test_supervisor_restarts_dead_workers(monkeypatch):
+    monkeypatch.setattr(jobWorker, "worker_loop", _exit_immediately)
+    stop = threading.Event()
+    procs = jobWorker.start_workers(2, supervise_interval=0.05, stop=stop)
+    first = list(procs)
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and any(p is q for p, q in zip(procs, first)):
+            time.sleep(0.05)
+        assert all(p is not q for p, q in zip(procs, first))
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5)
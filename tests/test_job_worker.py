@@ -0,0 +1,63 @@
+# CV ảnh (TIFF 2 trang, cần OCR) đi trọn đường worker_loop trong daemon process như production:
+# OCR pool dùng thread nên không vướng "daemonic processes are not allowed to have children".
+import gc
+import multiprocessing
+import shutil
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("pytesseract")
+from PIL import Image
+
+
+class FakeMastodon:
+    def instance(self):
+        return {"configuration": {"statuses": {"max_characters": 500}}}
+
+    def status_post(self, text, **kwargs):
+        return {"id": "1"}
+
+
+def test_worker_ocrs_image_cv_in_daemon_process(adapter, job_queue, tmp_path, monkeypatch):
+    from dataPreprocess import resumeParser
+    from listeners import attachmentFetcher, dmDispatcher, jobWorker
+
+    src = tmp_path / "scan.tiff"
+    first, second = (Image.new("L", (120, 160), g).convert("RGB") for g in (40, 160))
+    first.save(src, save_all=True, append_images=[second])
+    seen = tmp_path / "llm_input.txt"
+
+    def ocr(img, lang=None):
+        return f"OCR gray {img.convert('L').getpixel((60, 80))}"
+
+    def fake_gemini(text):
+        seen.write_text(text)
+        return {"name": "Scan Candidate", "summary": text, "skills": ["python"]}
+
+    def fake_download(attachments):
+        out = []
+        for a in attachments:
+            path = tmp_path / f"dl_{a['id']}.tiff"
+            shutil.copy(src, path)
+            out.append({"attachment": a, "path": str(path)})
+        return out
+
+    monkeypatch.setattr(resumeParser.pytesseract, "image_to_string", ocr)
+    monkeypatch.setattr(resumeParser, "_extract_with_gemini", fake_gemini)
+    monkeypatch.setattr(attachmentFetcher, "download_attachments", fake_download)
+    monkeypatch.setattr(dmDispatcher, "DM_OUTBOX_PATH", str(tmp_path / "outbox.sqlite"))
+    monkeypatch.setattr(dmDispatcher, "_dispatcher", None)
+    monkeypatch.setattr(jobWorker, "MATCH_TABLE_ENABLED", False)
+
+    job_queue.enqueue("cv", {"status_id": "42", "acct": "alice",
+                             "attachments": [{"id": "7", "url": "http://media/scan.tiff", "remote_url": None}]})
+    proc = multiprocessing.get_context("fork").Process(
+        target=jobWorker.worker_loop, args=(0, 0.05), kwargs={"mastodon": FakeMastodon(), "max_jobs": 1}, daemon=True)
+    gc.collect()  # client Chroma của test trước: dọn ở đây, không để GC của process con gọi finalizer chờ runtime không còn
+    proc.start()
+    proc.join(timeout=120)
+    assert proc.exitcode == 0
+
+    status, error = job_queue._conn().execute("SELECT status, last_error FROM jobs").fetchone()
+    assert (status, error) == ("done", None)
+    assert seen.read_text().split("\n") == ["OCR gray 40", "OCR gray 160"]
@@ -0,0 +1,83 @@
+# Test cache SQLite cho call Gemini (file cache tạm, không gọi Gemini thật).
+import pytest
+from db import llmCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llmCache, "LLM_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(llmCache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llmCache, "_local", type(llmCache._local)())
+    return llmCache
+
+
+def test_evict_drops_least_recently_accessed(cache):
+    keys = [cache.make_key("m", "v", str(i)) for i in range(10)]
+    for k in keys:
+        cache.cache_set(k, {"blob": "x" * 100}, max_bytes=10**9)
+    assert cache.cache_get(keys[0]) is not None  # keys[0] thành mới dùng nhất
+    cache.cache_set(cache.make_key("m", "v", "new"), {"blob": "x" * 100}, max_bytes=5 * 120)
+    assert cache.cache_get(keys[0]) is not None
+    assert cache.cache_get(keys[1]) is None
+    stats = cache.cache_stats()
+    assert stats["bytes"] <= 5 * 120 and stats["evictions"] == 11 - stats["entries"]
+
+
+def test_cached_call_skips_uncacheable(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"score": 0}
+
+    for _ in range(2):
+        cache.cached_call("m", "v", ("a",), compute, should_cache=lambda r: r["score"] > 0)
+    assert len(calls) == 2
+    for _ in range(2):
+        cache.cached_call("m", "v", ("b",), lambda: calls.append(1) or {"score": 80})
+    assert len(calls) == 3
+
+
+def test_evaluate_match_uses_cached_call(cache, monkeypatch):
+    pytest.importorskip("google.generativeai")
+    from logics import llmEvaluate
+
+    calls = []
+
+    def fake(jd, cv):
+        calls.append(cv)
+        return llmEvaluate._failed("boom") if cv == "bad" else {"score": 90, "matched_skills": [],
+                                                                  "missing_skills": [], "reason": "ok"}
+
+    monkeypatch.setattr(llmEvaluate, "_evaluate_match", fake)
+    assert llmEvaluate.evaluate_match("jd", "good")["score"] == 90
+    assert llmEvaluate.evaluate_match("jd", "good")["score"] == 90
+    llmEvaluate.evaluate_match("jd", "bad")
+    llmEvaluate.evaluate_match("jd", "bad")
+    assert calls == ["good", "bad", "bad"]
+
+
+def test_running_total_matches_table(cache):
+    def table_bytes():
+        return cache._conn().execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    keys = [cache.make_key("m", "v", str(i)) for i in range(20)]
+    for i, k in enumerate(keys):
+        cache.cache_set(k, {"blob": "x" * (50 + i)}, max_bytes=10**9)
+    cache.cache_set(keys[0], {"blob": "y" * 500}, max_bytes=10**9)  # ghi đè: trừ size cũ
+    assert cache.cache_stats()["bytes"] == table_bytes()
+    cache.cache_set(cache.make_key("m", "v", "new"), {"blob": "z"}, max_bytes=1000)  # evict
+    assert cache.cache_stats()["bytes"] == table_bytes() <= 1000
+    live = [k for k in keys if cache.cache_get(k) is not None]
+    assert cache.cache_get(live[0], ttl=1e-9) is None  # hết hạn → xoá
+    assert cache.cache_stats()["bytes"] == table_bytes()
+
+
+def test_running_total_initialized_from_existing_file(cache):
+    for i in range(5):
+        cache.cache_set(cache.make_key("m", "v", str(i)), {"blob": "x" * 100}, max_bytes=10**9)
+    expected = cache.cache_stats()["bytes"]
+    conn = cache._conn()
+    conn.execute("DROP TABLE meta")  # file cache tạo trước khi có bảng meta
+    cache._local.conn = None
+    assert cache.cache_stats()["bytes"] == expected > 0
@@ -0,0 +1,42 @@
+# Test phần dựng prompt / parse JSON của llmEvaluate (Gemini được thay bằng fake model).
+import json
+import pytest
+
+pytest.importorskip("google.generativeai")
+from logics import llmEvaluate
+
+
+def test_sanitize_keeps_text_inside_strings():
+    raw = '''{
+  "score": 85, // model comment
+  "matched_skills": ["C#", "Node.js"],  # another comment
+  "missing_skills": [] (none),
+  "reason": "Strong Node.js (3 yrs) and C# background // see CV"
+}'''
+    parsed = json.loads(llmEvaluate._sanitize_json_text(raw))
+    assert parsed["reason"] == "Strong Node.js (3 yrs) and C# background // see CV"
+    assert parsed["matched_skills"] == ["C#", "Node.js"]
+
+
+def test_sanitize_handles_escaped_quotes_and_raw_newlines():
+    raw = '{"reason": "says \\"hi\\" (ok)\nnext line", "score": 70}'
+    parsed = json.loads(llmEvaluate._sanitize_json_text(raw))
+    assert parsed["reason"] == 'says "hi" (ok) next line'
+
+
+def test_batch_prompt_has_single_braces(monkeypatch):
+    sent = {}
+
+    class FakeModel:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, prompt):
+            sent["prompt"] = prompt
+            return type("R", (), {"text": '[{"id": "a", "score": 90, "reason": "fit (React, C#)"}]'})()
+
+    monkeypatch.setattr(llmEvaluate.gemini, "GenerativeModel", FakeModel)
+    out = llmEvaluate._evaluate_one_batch("JD {with braces}", {"a": "cv text"})
+    assert "{{" not in sent["prompt"] and "}}" not in sent["prompt"]
+    assert '"id": "<candidate id>"' in sent["prompt"]
+    assert out["a"]["score"] == 90 and out["a"]["reason"] == "fit (React, C#)"
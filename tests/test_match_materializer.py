@@ -0,0 +1,108 @@
+# Test bảng match: map kết quả theo id document, bỏ qua lần chấm rỗng, JD ad-hoc hết hạn.
+import pytest
+
+
+def _fake_rerank(score=80):
+    def rerank(candidates, **kwargs):
+        return [{"id": c["id"], "target": c["target"], "similarity": c["similarity"],
+                 "evaluation": {"score": score, "reason": "stub"}} for c in candidates]
+    return rerank
+
+
+@pytest.fixture
+def mm(adapter, monkeypatch):
+    from logics import matchMaterializer
+    monkeypatch.setattr(matchMaterializer, "MATCH_TABLE_ENABLED", True)
+    monkeypatch.setattr(matchMaterializer, "rerank", _fake_rerank())
+    return matchMaterializer
+
+
+def _cv(folder, summary):
+    return ({"summary": summary, "skills": ["python"], "experiences": [{"role": "Dev", "years": 3}]},
+            {"type": "cv", "filename": "cv.pdf", "path": f"{folder}/cv.pdf"})
+
+
+def test_same_filename_cvs_map_to_their_own_ids(mm, adapter):
+    from db import matchTable
+    adapter.upsert_json_docs("cv_collection", [_cv("a", "Backend"), _cv("b", "Data")])
+    jd = {"title": "Dev", "tech_stack": ["python"]}
+    adapter.upsert_json_docs("jd_collection", [(jd, {"type": "jd", "filename": "jd.txt", "path": "jd.txt"})])
+    assert mm.refresh_jd("file:jd.txt") == 2
+    assert sorted(r["id"] for r in matchTable.get_matches("file:jd.txt", 10)) == ["file:a/cv.pdf", "file:b/cv.pdf"]
+
+
+def test_failed_evaluation_keeps_previous_matches(mm, adapter, monkeypatch):
+    from db import matchTable
+    adapter.upsert_json_docs("cv_collection", [_cv("a", "Backend")])
+    adapter.upsert_json_docs("jd_collection", [({"title": "Dev"}, {"type": "jd", "filename": "jd.txt", "path": "jd.txt"})])
+    mm.refresh_jd("file:jd.txt")
+    monkeypatch.setattr(mm, "rerank", lambda candidates, **kw: [])  # Gemini lỗi hết
+    with pytest.raises(RuntimeError):
+        mm.refresh_jd("file:jd.txt")
+    assert [r["id"] for r in matchTable.get_matches("file:jd.txt", 10)] == ["file:a/cv.pdf"]
+
+    mm.remember("adhoc jd", {"title": "x"}, [{"id": "file:a/cv.pdf", "metadata": {}}], [])
+    assert mm.lookup_matches("adhoc jd", 5) is None
+
+
+def test_empty_match_set_is_a_miss(mm, adapter):
+    from db import matchTable
+    key = matchTable.norm_key("jd text")
+    matchTable.put_jd("adhoc:x", key, "jd text", {}, None)
+    assert mm.lookup_matches("jd text", 5) is None
+
+
+def test_expired_adhoc_jds_are_not_scored(mm, adapter, monkeypatch):
+    from db import matchTable
+    adapter.upsert_json_docs("cv_collection", [_cv("a", "Backend")])
+    vec = adapter.encode_texts(["jd"])[0]
+    matchTable.put_jd("adhoc:old", "k1", "old jd", {}, vec)
+    matchTable.put_jd("adhoc:new", "k2", "new jd", {}, vec)
+    matchTable._conn().execute("UPDATE jds SET updated = updated - 100 WHERE jd_id = 'adhoc:old'")
+    monkeypatch.setattr(mm, "MATCH_ADHOC_TTL", 50)
+    assert mm.refresh_cv("file:a/cv.pdf") == 1
+    assert matchTable.get_jd("adhoc:old") is None
+    assert [r["id"] for r in matchTable.get_matches("adhoc:new", 5)] == ["file:a/cv.pdf"]
+
+
+def _failing_rerank(fail_ids):
+    # rerank thật + evaluate giả: CV trong fail_ids nhận _FailedResult như khi Gemini trả 503 (evaluate_match không raise)
+    llmEvaluate = pytest.importorskip("logics.llmEvaluate")
+    from logics.reranker import rerank
+
+    def evaluate(jd_text, cv_text):
+        if cv_text in fail_ids:
+            return llmEvaluate._failed("503 Service Unavailable")
+        return {"score": 70, "matched_skills": [], "missing_skills": [], "reason": "ok"}
+
+    return lambda candidates, **kw: rerank(candidates, evaluate_fn=evaluate)
+
+
+def test_failed_evaluations_are_not_stored_and_stay_pending(mm, adapter, monkeypatch):
+    from db import matchTable
+    monkeypatch.setattr(matchTable, "MATCH_TABLE_ENABLED", True)
+    adapter.upsert_json_docs("cv_collection", [_cv("a", "Backend"), _cv("b", "Data")])
+    adapter.upsert_json_docs("jd_collection", [({"title": "Dev"}, {"type": "jd", "filename": "jd.txt", "path": "jd.txt"})])
+    cv_b = adapter.get_docs("cv_collection", ["file:b/cv.pdf"], ("documents",))["documents"][0]
+    monkeypatch.setattr(mm, "rerank", _failing_rerank({cv_b}))
+
+    matchTable.take_pending(100)
+    matchTable.mark_pending("jd_collection", ["file:jd.txt"])
+    mm.refresh_pending()
+    assert matchTable.get_matches("file:jd.txt", 10) == []
+    assert matchTable.table_stats()["pending"] == 1  # đưa lại pending để worker thử lại
+
+    # CV mới: JD chấm lỗi không được add_match, CV quay lại pending
+    matchTable.put_jd("adhoc:x", "k", "jd", {}, adapter.encode_texts(["jd"])[0])
+    matchTable.take_pending(100)
+    with pytest.raises(RuntimeError):
+        mm.refresh_cv("file:b/cv.pdf")
+    assert matchTable.get_matches("adhoc:x", 10) == []
+
+    # JD ad-hoc (bài Mastodon): kết quả có lỗi → không lưu, lần sau vẫn tính lại
+    hits = [{"id": "file:a/cv.pdf", "metadata": {}}, {"id": "file:b/cv.pdf", "metadata": {}}]
+    results = mm.rerank([{"id": h["id"], "target": "cv.pdf", "similarity": 0.5, "jd_text": "jd", "cv_text": t}
+                         for h, t in zip(hits, ["cv a", cv_b])])
+    assert [r["evaluation"]["score"] for r in results] == [70, 0]
+    mm.remember("adhoc jd", {"title": "x"}, hits, results)
+    assert mm.lookup_matches("adhoc jd", 5) is None
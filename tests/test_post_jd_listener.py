@@ -0,0 +1,66 @@
+# Job JD trong worker: lỗi tạm thời (Chroma / Gemini) phải raise để job queue retry,
+# chỉ "không có hit" mới trả lời "Không tìm thấy ứng viên phù hợp.".
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("mastodon")
+from config import JOB_MAX_ATTEMPTS
+from listeners import postJDListener
+from logics import llmEvaluate, matchingLogic
+
+PAYLOAD = {"listen_hashtag": "hiring", "content": "<p>Backend Python #hiring</p>", "acct": "bob", "status_id": "9"}
+HIT = {"id": "file:a.pdf", "score": 0.8, "text": "cv a", "metadata": {"filename": "a.pdf"}, "data": {}}
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, acct, header, blocks, **kwargs):
+        self.sent.append(header)
+        return 1
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    d = FakeDispatcher()
+    monkeypatch.setattr(postJDListener, "get_dispatcher", lambda mastodon: d)
+    monkeypatch.setattr(matchingLogic, "parse_job_description", lambda text: {"title": "Backend"})
+    monkeypatch.setattr(matchingLogic, "lookup_matches", lambda *a: None)
+    monkeypatch.setattr(matchingLogic, "remember_matches", lambda *a: None)
+    monkeypatch.setattr(matchingLogic, "EVAL_BATCH_MODE", False)
+    return d
+
+
+def _retrieve(hits):
+    def retrieve(*args, **kwargs):
+        if isinstance(hits, Exception):
+            raise hits
+        return hits
+    return retrieve
+
+
+def test_retrieval_error_is_retried(dispatcher, monkeypatch):
+    monkeypatch.setattr(matchingLogic, "_retrieve_for_eval", _retrieve(RuntimeError("chroma down")))
+    with pytest.raises(RuntimeError):
+        postJDListener.handle_jd_job(None, PAYLOAD, attempt=1)
+    assert "Không tìm thấy ứng viên phù hợp." not in dispatcher.sent
+
+    postJDListener.handle_jd_job(None, PAYLOAD, attempt=JOB_MAX_ATTEMPTS)  # lần cuối → báo lỗi cho user
+    assert dispatcher.sent[-1] == "❌ Đã có lỗi xảy ra, vui lòng thử lại sau."
+
+
+def test_gemini_evaluation_failure_is_retried(dispatcher, monkeypatch):
+    # evaluate_match không raise mà trả _FailedResult khi Gemini lỗi
+    monkeypatch.setattr(matchingLogic, "_retrieve_for_eval", _retrieve([dict(HIT)]))
+    monkeypatch.setattr(matchingLogic, "evaluate_match", lambda jd, cv: llmEvaluate._failed("503 unavailable"))
+    with pytest.raises(RuntimeError):
+        postJDListener.handle_jd_job(None, PAYLOAD, attempt=1)
+    assert "Không tìm thấy ứng viên phù hợp." not in dispatcher.sent
+
+
+def test_no_hits_is_answered(dispatcher, monkeypatch):
+    monkeypatch.setattr(matchingLogic, "_retrieve_for_eval", _retrieve([]))
+    postJDListener.handle_jd_job(None, PAYLOAD, attempt=1)
+    assert dispatcher.sent[-1] == "Không tìm thấy ứng viên phù hợp."
+    assert matchingLogic.find_best_candidates("jd") == []  # caller khác (CLI) vẫn nhận [] như cũ
@@ -0,0 +1,65 @@
+# Test pre-rank cục bộ: thứ tự theo pre-ranker, cắt keep, resolve theo tên / callable, lỗi → giữ thứ tự retrieval.
+import sys
+import pytest
+from logics import preRanker
+from logics.preRanker import pre_rank, resolve_pre_ranker, FeaturePreRanker, CrossEncoderPreRanker
+
+JD = {"title": "Backend Developer", "tech_stack": ["Node.js", "SQL"], "requirements": ["Docker"],
+      "nice_to_have": ["AWS"], "years_of_experience": "2"}
+
+
+def _hit(i, score, skills, role="Backend Developer", years=3):
+    return {"id": f"cv{i}", "score": score, "text": f"cv {i}",
+            "data": {"skills": skills, "experiences": [{"role": role, "years": years}]}}
+
+
+def _hits():
+    # retrieval xếp cv0 đầu nhưng cv0 thiếu hết skill bắt buộc; cv2 đủ skill + nice-to-have + đúng chức danh
+    return [
+        _hit(0, 0.9, ["java"], role="Designer", years=0),
+        _hit(1, 0.8, ["node.js", "sql"], role="QA"),
+        _hit(2, 0.7, ["node.js", "sql", "docker", "aws"]),
+        _hit(3, 0.6, ["node.js", "docker"]),
+    ]
+
+
+def test_features_reorders_and_truncates_to_keep():
+    kept = pre_rank("backend node sql", JD, _hits(), keep=2, ranker="features")
+    assert [h["id"] for h in kept] == ["cv2", "cv3"]  # cv3: 2/3 skill bắt buộc + đúng chức danh > cv1 (QA)
+    assert kept[0]["prerank_score"] >= kept[1]["prerank_score"]
+
+
+def test_ties_keep_retrieval_order():
+    kept = pre_rank("q", JD, _hits(), keep=10, ranker=lambda q, d, hs: [1.0] * len(hs))
+    assert [h["id"] for h in kept] == ["cv0", "cv1", "cv2", "cv3"]
+
+
+def test_resolve_pre_ranker(monkeypatch):
+    assert resolve_pre_ranker("none") is None
+    assert resolve_pre_ranker("") is None
+    monkeypatch.setattr(preRanker, "PRERANK_MODE", "none")
+    assert resolve_pre_ranker(None) is None
+    assert isinstance(resolve_pre_ranker("features"), FeaturePreRanker)
+    assert resolve_pre_ranker("features") is resolve_pre_ranker("features")  # 1 instance / process
+
+    def fn(q, d, hs):
+        return [-h["score"] for h in hs]
+    assert resolve_pre_ranker(fn) is fn
+    assert [h["id"] for h in pre_rank("q", JD, _hits(), keep=2, ranker=fn)] == ["cv3", "cv2"]
+    with pytest.raises(ValueError):
+        resolve_pre_ranker("unknown")
+
+
+def test_none_keeps_retrieval_order():
+    assert [h["id"] for h in pre_rank("q", JD, _hits(), keep=3, ranker="none")] == ["cv0", "cv1", "cv2"]
+
+
+def test_cross_encoder_unavailable_falls_back_to_retrieval_order(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)  # import → ImportError
+    ranker = CrossEncoderPreRanker("missing/model")
+    before = {s["ranker"]: s["failed"] for s in preRanker.prerank_stats()}.get("cross-encoder", 0)
+    kept = pre_rank("q", JD, _hits(), keep=2, ranker=ranker)
+    assert [h["id"] for h in kept] == ["cv0", "cv1"]
+    assert all("prerank_score" not in h for h in kept)
+    after = {s["ranker"]: s["failed"] for s in preRanker.prerank_stats()}["cross-encoder"]
+    assert after == before + 1
@@ -0,0 +1,85 @@
+# Test re-rank song song với evaluate giả lập (không gọi Gemini).
+# Call "treo" chờ 1 Event thay vì sleep → không phụ thuộc tốc độ máy; Event được set lúc teardown để thread nền thoát.
+import threading
+import time
+import pytest
+from logics.reranker import rerank, rerank_batch
+
+
+@pytest.fixture
+def gate():
+    ev = threading.Event()
+    yield ev
+    ev.set()
+
+
+def _score(cv_text: str) -> dict:
+    return {"score": 100 - int(cv_text.split("_")[1]) * 7, "matched_skills": [], "missing_skills": [], "reason": "stub"}
+
+
+def make_evaluate(gate, started=None):
+    def evaluate(jd_text: str, cv_text: str) -> dict:
+        if started is not None:
+            started.append((cv_text, threading.current_thread()))
+        if cv_text == "cv_fail":
+            raise RuntimeError("simulated Gemini 500")
+        if cv_text == "cv_hang":
+            gate.wait()
+        return _score(cv_text)
+    return evaluate
+
+
+def _cands(cv_texts, similarity=0.5):
+    return [{"target": f"{t}.pdf", "similarity": similarity, "jd_text": "jd", "cv_text": t} for t in cv_texts]
+
+
+def test_rerank_sorted_and_skips_failures(gate):
+    cands = _cands([f"cv_{i}" for i in range(8)]) + _cands(["cv_fail", "cv_hang"], similarity=0.9)
+    out = rerank(cands, evaluate_fn=make_evaluate(gate), max_workers=4, timeout=0.2)
+    assert [r["target"] for r in out] == [f"cv_{i}.pdf" for i in range(8)]
+    assert not gate.is_set()  # trả về khi call treo vẫn còn chạy
+
+
+def test_rerank_overall_deadline_when_all_workers_hang(gate):
+    # 2 worker đều kẹt → 4 candidate còn lại không bao giờ bắt đầu; phải dừng theo deadline tổng và huỷ chúng
+    started = []
+    cands = _cands(["cv_hang"] * 2 + [f"cv_{i}" for i in range(4)])
+    out = rerank(cands, evaluate_fn=make_evaluate(gate, started), max_workers=2, timeout=0.1)
+    assert out == []
+    gate.set()
+    for _, th in started:
+        th.join(timeout=5)
+    assert [cv for cv, _ in started] == ["cv_hang", "cv_hang"]  # candidate đang chờ slot đã bị huỷ
+
+
+def test_rerank_respects_caller_deadline():
+    started = []
+    hold = threading.Event()
+
+    def evaluate(jd_text, cv_text):
+        started.append((cv_text, threading.current_thread()))
+        hold.wait()
+        return _score(cv_text)
+
+    cands = _cands([f"cv_{i}" for i in range(14)])
+    try:
+        out = rerank(cands, evaluate_fn=evaluate, max_workers=2, timeout=60, deadline=time.monotonic())
+    finally:
+        hold.set()
+    assert out == []
+    for _, th in started:
+        th.join(timeout=5)
+    assert len(started) <= 2
+
+
+def test_rerank_batch_groups_by_jd():
+    calls = []
+
+    def fake_batch(jd_text, cvs):
+        calls.append((jd_text, sorted(cvs)))
+        return {cid: {"score": 50 + int(cid)} for cid in cvs}
+
+    cands = _cands(["cv_1", "cv_2"]) + [{"target": "x.pdf", "similarity": 0.1, "jd_text": "jd2", "cv_text": "cv_3"}]
+    out = rerank_batch(cands, evaluate_batch_fn=fake_batch)
+    assert len(calls) == 2
+    assert [r["target"] for r in out] == ["x.pdf", "cv_2.pdf", "cv_1.pdf"]
@@ -0,0 +1,55 @@
+# Test extract text: TIFF nhiều trang, PDF scan, OCR song song giữ đúng thứ tự trang (tesseract được giả lập).
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("pytesseract")
+from PIL import Image
+from dataPreprocess import resumeParser
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    # "OCR" = đọc lại mức xám ở giữa trang (mỗi trang test tô 1 mức xám riêng)
+    def ocr(img, lang=None):
+        gray = img.convert("L").getpixel((img.size[0] // 2, img.size[1] // 2))
+        return f"page-{round(gray / 40)}"
+    monkeypatch.setattr(resumeParser.pytesseract, "image_to_string", ocr)
+
+
+def _pages(n):
+    return [Image.new("L", (120, 160), i * 40).convert("RGB") for i in range(n)]
+
+
+def test_multipage_tiff(tmp_path, fake_ocr):
+    path = tmp_path / "cv.tiff"
+    first, *rest = _pages(5)
+    first.save(path, save_all=True, append_images=rest)
+    text = resumeParser.extract_text(str(path), workers=3)
+    assert text.split("\n") == [f"page-{i}" for i in range(5)]
+
+
+def test_scanned_pdf_in_page_order(tmp_path, fake_ocr):
+    import fitz
+    doc = fitz.open()
+    for i, img in enumerate(_pages(4)):
+        img_path = tmp_path / f"p{i}.png"
+        img.save(img_path)
+        page = doc.new_page()
+        if i == 1:
+            page.insert_text((72, 72), "Text layer page with enough characters to skip OCR")
+        else:
+            page.insert_image(page.rect, filename=str(img_path))
+    pdf = tmp_path / "scan.pdf"
+    doc.save(pdf)
+    lines = [l for l in resumeParser.extract_text(str(pdf), workers=4).split("\n") if l]
+    assert lines[1].startswith("Text layer page")
+    assert [lines[0], lines[2], lines[3]] == ["page-0", "page-2", "page-3"]
+
+
+def test_ocr_pool_is_shared():
+    assert resumeParser._get_ocr_pool() is resumeParser._get_ocr_pool()
+
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError):
+        resumeParser.extract_text(str(tmp_path / "cv.docx"))
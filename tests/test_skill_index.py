@@ -0,0 +1,40 @@
+# Test skill index dùng chung qua SQLite: nhiều process ghi đồng thời không mất cập nhật.
+import multiprocessing
+from db import skillIndex
+
+
+def _writer(start):
+    for i in range(start, start + 25):
+        skillIndex.sync_upserts({f"cv{i}": ["python", "sql"] if i % 2 else ["python"]})
+
+
+def test_concurrent_writers_do_not_lose_updates(adapter):
+    skillIndex.get_skill_index()  # build (collection rỗng) trước khi fork
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_writer, args=(k * 25,)) for k in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+    idx = skillIndex.get_skill_index()
+    assert len(idx.intersect(["python"])) == 100
+    assert len(idx.intersect(["python", "sql"])) == 50
+
+
+def test_deletes_and_updates_apply_incrementally(adapter):
+    skillIndex.sync_upserts({"a": ["go"], "b": ["go", "rust"]})
+    idx = skillIndex.get_skill_index()
+    assert sorted(idx.intersect(["go"])) == ["a", "b"]
+    skillIndex.sync_deletes(["a"])
+    skillIndex.sync_upserts({"b": ["rust"]})
+    assert skillIndex.get_skill_index() is idx
+    assert idx.intersect(["go"]) == [] and idx.intersect(["rust"]) == ["b"]
+
+
+def test_build_from_existing_collection(adapter):
+    cv = {"summary": "x", "skills": ["Kotlin"], "experiences": []}
+    adapter.upsert_json_docs("cv_collection", [(cv, {"type": "cv", "filename": "k.pdf", "path": "k.pdf"})])
+    skillIndex._conn().execute("DELETE FROM skill_docs")  # như file index chưa từng được tạo
+    skillIndex._conn().execute("PRAGMA user_version = 0")
+    assert skillIndex.get_skill_index().intersect(["kotlin"]) == ["file:k.pdf"]